@@ -2,10 +2,19 @@ from __future__ import annotations
 
 import argparse
 import hashlib
+import io
 import json
+import os
+import shutil
 import tarfile
+import tempfile
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
+MARKER = ".reassembled.json"
+
 
 def sha256_file(path: Path) -> str:
     h = hashlib.sha256()
@@ -15,17 +24,87 @@ def sha256_file(path: Path) -> str:
     return h.hexdigest()
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Reassemble bge-m3 runtime from chunk files")
-    parser.add_argument("--chunks-dir", default="models/chunks/bge-m3", help="Chunk directory")
-    parser.add_argument("--output-dir", default="models/local", help="Reassembly output parent")
-    args = parser.parse_args()
+def read_part(chunks_dir: Path, part: dict) -> bytes:
+    part_file = chunks_dir / part["file"]
+    data = part_file.read_bytes()
+    if len(data) != part["size"] or hashlib.sha256(data).hexdigest() != part["sha256"]:
+        raise ValueError(f"Checksum mismatch for {part_file.name}")
+    return data
 
-    chunks_dir = Path(args.chunks_dir).resolve()
-    output_dir = Path(args.output_dir).resolve()
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    manifest = json.loads((chunks_dir / "manifest.json").read_text(encoding="utf-8"))
+def verified_parts(chunks_dir: Path, parts: list[dict], workers: int) -> Iterator[bytes]:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future[bytes]] = deque()
+        try:
+            for part in parts:
+                pending.append(pool.submit(read_part, chunks_dir, part))
+                if len(pending) > workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class HashingStream(io.RawIOBase):
+    def __init__(self, blocks: Iterator[bytes]) -> None:
+        self.blocks = blocks
+        self.buffer = memoryview(b"")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self.buffer:
+            block = next(self.blocks, None)
+            if block is None:
+                return 0
+            self.sha256.update(block)
+            self.size += len(block)
+            self.buffer = memoryview(block)
+        n = min(len(target), len(self.buffer))
+        target[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+
+def already_extracted(target: Path, bundle_sha: str) -> bool:
+    marker = target / MARKER
+    if not marker.exists():
+        return False
+    return json.loads(marker.read_text(encoding="utf-8")).get("sha256") == bundle_sha
+
+
+def write_marker(target: Path, bundle: dict) -> None:
+    (target / MARKER).write_text(
+        json.dumps({"sha256": bundle["sha256"], "size": bundle["size"]}), encoding="utf-8"
+    )
+
+
+def reassemble_stream(chunks_dir: Path, output_dir: Path, manifest: dict, workers: int) -> None:
+    bundle = manifest["bundle"]
+    target = output_dir / "bge-m3"
+    staging = Path(tempfile.mkdtemp(prefix=".bge-m3-", dir=output_dir))
+    try:
+        stream = HashingStream(verified_parts(chunks_dir, manifest["parts"], workers))
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            tar.extractall(path=staging, filter="data")
+        while stream.read(1024 * 1024):
+            pass
+        if stream.size != bundle["size"] or stream.sha256.hexdigest() != bundle["sha256"]:
+            raise ValueError("Reassembled bundle checksum mismatch")
+        write_marker(staging / "bge-m3", bundle)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(staging / "bge-m3", target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def reassemble_tar(chunks_dir: Path, output_dir: Path, manifest: dict) -> None:
     bundle = chunks_dir / manifest["bundle"]["file"]
 
     with bundle.open("wb") as out:
@@ -43,8 +122,41 @@ def main() -> None:
 
     with tarfile.open(bundle, "r") as tar:
         tar.extractall(path=output_dir, filter="data")
+    write_marker(output_dir / "bge-m3", manifest["bundle"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reassemble bge-m3 runtime from chunk files")
+    parser.add_argument("--chunks-dir", default="models/chunks/bge-m3", help="Chunk directory")
+    parser.add_argument("--output-dir", default="models/local", help="Reassembly output parent")
+    parser.add_argument(
+        "--mode",
+        choices=["stream", "tar"],
+        default="stream",
+        help="stream: extract straight from the parts; tar: write the full .tar first",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Parts read and verified ahead in parallel"
+    )
+    parser.add_argument("--force", action="store_true", help="Extract even if already verified")
+    args = parser.parse_args()
+
+    chunks_dir = Path(args.chunks_dir).resolve()
+    output_dir = Path(args.output_dir).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = json.loads((chunks_dir / "manifest.json").read_text(encoding="utf-8"))
+    target = output_dir / "bge-m3"
+    if not args.force and already_extracted(target, manifest["bundle"]["sha256"]):
+        print(f"Verified extraction already present at {target}")
+        return
+
+    if args.mode == "stream":
+        reassemble_stream(chunks_dir, output_dir, manifest, max(args.workers, 1))
+    else:
+        reassemble_tar(chunks_dir, output_dir, manifest)
 
-    print(f"Reassembled and extracted to {output_dir / 'bge-m3'}")
+    print(f"Reassembled and extracted to {target}")
 
 
 if __name__ == "__main__":
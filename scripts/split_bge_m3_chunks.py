@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import hashlib
+import io
 import json
 import tarfile
 from pathlib import Path
@@ -30,32 +31,106 @@ def split_file(source_tar: Path, out_dir: Path, chunk_size_bytes: int, prefix: s
     return parts
 
 
+class PartWriter(io.RawIOBase):
+    def __init__(self, out_dir: Path, chunk_size_bytes: int, prefix: str) -> None:
+        self.out_dir = out_dir
+        self.chunk_size_bytes = chunk_size_bytes
+        self.prefix = prefix
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.entries: list[dict] = []
+        self._part = None
+        self._part_sha = hashlib.sha256()
+        self._part_size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def _finish_part(self) -> None:
+        if self._part is None:
+            return
+        self._part.close()
+        self.entries.append(
+            {
+                "file": Path(self._part.name).name,
+                "size": self._part_size,
+                "sha256": self._part_sha.hexdigest(),
+            }
+        )
+        self._part = None
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            if self._part is None:
+                path = self.out_dir / f"{self.prefix}.part-{len(self.entries) + 1:05d}"
+                self._part = path.open("wb")
+                self._part_sha = hashlib.sha256()
+                self._part_size = 0
+            block = view[: self.chunk_size_bytes - self._part_size]
+            self._part.write(block)
+            self._part_sha.update(block)
+            self.sha256.update(block)
+            self._part_size += len(block)
+            self.size += len(block)
+            view = view[len(block) :]
+            if self._part_size == self.chunk_size_bytes:
+                self._finish_part()
+        return len(data)
+
+    def close(self) -> None:
+        self._finish_part()
+        super().close()
+
+
+def split_stream(source_dir: Path, out_dir: Path, chunk_size_bytes: int, prefix: str) -> dict:
+    writer = PartWriter(out_dir, chunk_size_bytes, prefix)
+    with writer, tarfile.open(fileobj=writer, mode="w|") as tar:
+        tar.add(source_dir, arcname="bge-m3")
+    bundle = {"file": f"{prefix}.tar", "size": writer.size, "sha256": writer.sha256.hexdigest()}
+    return {"bundle": bundle, "parts": writer.entries}
+
+
+def split_tar(source_dir: Path, out_dir: Path, chunk_size_bytes: int, prefix: str) -> dict:
+    bundle_tar = out_dir / f"{prefix}.tar"
+    with tarfile.open(bundle_tar, "w") as tar:
+        tar.add(source_dir, arcname="bge-m3")
+
+    parts = split_file(bundle_tar, out_dir, chunk_size_bytes, prefix)
+    part_entries = [
+        {"file": p.name, "size": p.stat().st_size, "sha256": sha256_file(p)} for p in parts
+    ]
+    bundle = {
+        "file": bundle_tar.name,
+        "size": bundle_tar.stat().st_size,
+        "sha256": sha256_file(bundle_tar),
+    }
+    return {"bundle": bundle, "parts": part_entries}
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Split bge-m3 runtime bundle into 45MiB chunks")
     parser.add_argument("--source-dir", required=True, help="Prepared bge-m3 runtime source directory")
     parser.add_argument("--output-dir", default="models/chunks/bge-m3", help="Output chunk directory")
     parser.add_argument("--prefix", default="bge-m3-runtime", help="Chunk prefix")
     parser.add_argument("--chunk-size-mib", type=int, default=45, help="Chunk size in MiB")
+    parser.add_argument(
+        "--mode",
+        choices=["stream", "tar"],
+        default="stream",
+        help="stream: write parts while archiving; tar: write the full .tar first",
+    )
     args = parser.parse_args()
 
     source_dir = Path(args.source_dir).resolve()
     out_dir = Path(args.output_dir).resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    bundle_tar = out_dir / f"{args.prefix}.tar"
-    with tarfile.open(bundle_tar, "w") as tar:
-        tar.add(source_dir, arcname="bge-m3")
-
     chunk_size_bytes = args.chunk_size_mib * 1024 * 1024
-    parts = split_file(bundle_tar, out_dir, chunk_size_bytes, args.prefix)
-
-    bundle_sha = sha256_file(bundle_tar)
-    sha_lines = []
-    part_entries = []
-    for p in parts:
-        part_sha = sha256_file(p)
-        sha_lines.append(f"{part_sha}  {p.name}")
-        part_entries.append({"file": p.name, "size": p.stat().st_size, "sha256": part_sha})
+    split = split_stream if args.mode == "stream" else split_tar
+    result = split(source_dir, out_dir, chunk_size_bytes, args.prefix)
+    part_entries = result["parts"]
+    sha_lines = [f"{p['sha256']}  {p['file']}" for p in part_entries]
 
     (out_dir / "SHA256SUMS").write_text("\n".join(sha_lines) + "\n", encoding="utf-8")
 
@@ -63,15 +138,11 @@ def main() -> None:
         "name": "bge-m3-runtime",
         "format": "tar+parts",
         "chunk_size_mib": args.chunk_size_mib,
-        "bundle": {
-            "file": bundle_tar.name,
-            "size": bundle_tar.stat().st_size,
-            "sha256": bundle_sha,
-        },
+        "bundle": result["bundle"],
         "parts": part_entries,
     }
     (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-    print(f"Created {len(parts)} parts in {out_dir}")
+    print(f"Created {len(part_entries)} parts in {out_dir}")
 
 
 if __name__ == "__main__":
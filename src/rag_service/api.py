@@ -1,23 +1,75 @@
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from rag_service.cache import get_query_cache, get_rerank_cache
+from rag_service.concurrency import Overloaded, run_inference
 from rag_service.config import get_settings
-from rag_service.ingest import IngestionService
-from rag_service.schemas import IngestRequest, IngestResponse, QueryRequest, QueryResponse
+from rag_service.engine import get_engine
+from rag_service.jobs import get_job_manager
+from rag_service.models import inference_stats
+from rag_service.schemas import (
+    BatchQueryRequest,
+    IngestJob,
+    IngestRequest,
+    QueryRequest,
+    QueryResponse,
+)
 from rag_service.service import RAGService
 
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI) -> None:
+    try:
+        timings = await run_inference(get_engine().warm_up)
+    except Exception as exc:  # pragma: no cover
+        logger.exception("Warm-up failed")
+        app.state.warmup = {"status": "failed", "detail": f"{type(exc).__name__}: {exc}"}
+        return
+    app.state.warmup = {"status": "ready", "timings_ms": timings}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if not get_settings().warmup_on_start:
+        get_engine().reload()
+        app.state.warmup = {"status": "ready"}
+        yield
+        return
+    app.state.warmup = {"status": "warming"}
+    task = asyncio.create_task(warm_up(app))
+    yield
+    task.cancel()
+
+
 app = FastAPI(
     title="Industrial Advanced RAG",
     version="0.1.0",
     docs_url="/swagger",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 
+@app.exception_handler(Overloaded)
+async def overloaded(_: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/")
 def root() -> RedirectResponse:
     return RedirectResponse(url="/swagger")
@@ -28,21 +80,91 @@ def health() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/ingest", response_model=IngestResponse)
-def ingest(req: IngestRequest) -> IngestResponse:
+@app.get("/ready")
+def ready(request: Request) -> JSONResponse:
+    state = request.app.state.warmup
+    return JSONResponse(status_code=200 if state["status"] == "ready" else 503, content=state)
+
+
+@app.get("/stats")
+def stats() -> dict:
+    return {
+        "inference": inference_stats(),
+        "cache": get_query_cache().stats(),
+        "rerank_cache": get_rerank_cache().stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.post("/ingest", response_model=IngestJob, status_code=202)
+def ingest(req: IngestRequest) -> IngestJob:
     source = Path(req.source_dir)
     if not source.exists() or not source.is_dir():
         raise HTTPException(status_code=400, detail="source_dir must exist and be a directory")
+    return get_job_manager().submit(req)
 
-    service = IngestionService()
-    docs, chunks = service.ingest(source_dir=source, glob_pattern=req.glob)
-    return IngestResponse(documents=docs, chunks=chunks, message="Ingestion completed")
+
+@app.get("/ingest", response_model=list[IngestJob])
+def ingest_jobs() -> list[IngestJob]:
+    return get_job_manager().list()
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJob)
+def ingest_job(job_id: str) -> IngestJob:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
+
+
+@app.delete("/ingest/{job_id}", response_model=IngestJob)
+def cancel_ingest_job(job_id: str) -> IngestJob:
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
 
 
 @app.post("/query", response_model=QueryResponse)
-def query(req: QueryRequest) -> QueryResponse:
+async def query(req: QueryRequest) -> QueryResponse:
+    service = RAGService()
+    return await service.aquery(req.query, req.filters, req.timings)
+
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest) -> StreamingResponse:
     service = RAGService()
-    return service.query(req.query)
+    hits = await service.aretrieve(req.query, req.filters)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, payload in service.astream(req.query, hits):
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        except Overloaded as exc:
+            yield f"event: error\ndata: {json.dumps({'detail': str(exc)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/query/batch")
+async def query_batch(req: BatchQueryRequest) -> StreamingResponse:
+    results = RAGService().abatch(req.queries, req.generate)
+    first = await anext(results)
+
+    async def lines() -> AsyncIterator[str]:
+        yield first.model_dump_json() + "\n"
+        async for result in results:
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 def run() -> None:
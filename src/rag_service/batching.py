@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher(Generic[T, R]):
+    def __init__(
+        self,
+        fn: Callable[[list[T]], list[R]],
+        max_batch: int,
+        max_wait_ms: float,
+        size: Callable[[T], int] = lambda _: 1,
+    ) -> None:
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.size = size
+        self._queue: queue.Queue[tuple[T, Future[R], float]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: T) -> Future[R]:
+        self._ensure_worker()
+        future: Future[R] = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> list[tuple[T, Future[R], float]]:
+        batch = [self._queue.get()]
+        filled = self.size(batch[0][0])
+        if self._queue.empty():
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while filled < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(entry)
+            filled += self.size(entry[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.queue_time_total += sum(waits)
+            self.queue_time_max = max(self.queue_time_max, *waits)
+            try:
+                results = self.fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Expected {len(batch)} results, got {len(results)}")
+                for (_, future, _), result in zip(batch, results, strict=True):
+                    future.set_result(result)
+            except Exception as exc:
+                logger.exception("Batch of %d items failed", len(batch))
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_ms": 1000.0 * self.queue_time_total / self.items if self.items else 0.0,
+            "max_queue_ms": 1000.0 * self.queue_time_max,
+        }
@@ -0,0 +1,243 @@
+import json
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from rag_service.chunk_store import ChunkStore
+from rag_service.chunking import chunk_document, chunking_strategy, get_splitter
+from rag_service.config import get_settings
+from rag_service.context import pack_context
+from rag_service.generation import completion_kwargs
+from rag_service.lexical import SparseBM25, tokenize
+from rag_service.loaders import iter_source_files, load_text_from_file
+from rag_service.models import get_embedder
+from rag_service.retrieval import HybridRetriever
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import get_vector_store
+
+STUB_ANSWER = "Benchmark stub answer."
+INGEST_STAGES = ("load", "chunk", "embed", "index")
+QUERY_STAGES = ("embed_query", "dense", "lexical", "fuse", "rerank", "generate")
+
+
+class LabeledQuery(NamedTuple):
+    query: str
+    sources: set[str]
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - started)
+
+    def summary(self, stage: str) -> dict:
+        samples = np.asarray(self.samples.get(stage, []), dtype=np.float64)
+        if not len(samples):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(samples * 1000.0, [50, 95, 99])
+        total = float(samples.sum())
+        return {
+            "count": len(samples),
+            "total_s": total,
+            "mean_ms": float(samples.mean() * 1000.0),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "qps": len(samples) / total if total else 0.0,
+        }
+
+
+def _word(rng: np.random.Generator, syllables: int) -> str:
+    parts = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "si", "de", "po", "zu", "fe"]
+    return "".join(rng.choice(parts, size=syllables).tolist())
+
+
+def synthetic_corpus(
+    root: Path, documents: int, queries: int, words: int, seed: int
+) -> list[LabeledQuery]:
+    rng = np.random.default_rng(seed)
+    vocab = [_word(rng, 2) for _ in range(2000)]
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    root.mkdir(parents=True, exist_ok=True)
+
+    facts: list[tuple[str, str]] = []
+    for i in range(documents):
+        component = f"{_word(rng, 3)}{i}"
+        value = int(rng.integers(10, 999))
+        fact = f"The rated torque of component {component} is {value} newton metres."
+        filler = rng.choice(vocab, size=words, p=weights).tolist()
+        at = int(rng.integers(0, len(filler) + 1))
+        text = " ".join([*filler[:at], fact, *filler[at:]])
+        path = root / f"doc-{i:06d}.txt"
+        path.write_text(text, encoding="utf-8")
+        facts.append((path.as_posix(), component))
+
+    picks = rng.choice(len(facts), size=min(queries, len(facts)), replace=False)
+    return [
+        LabeledQuery(
+            f"What is the torque of component {facts[i][1]} in newton metres?", {facts[i][0]}
+        )
+        for i in picks
+    ]
+
+
+def load_queries(path: Path) -> list[LabeledQuery]:
+    queries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        sources = item.get("sources") or [item["source"]]
+        queries.append(LabeledQuery(item["query"], set(sources)))
+    return queries
+
+
+def _relevant(source: str, labels: set[str]) -> bool:
+    return any(source == label or source.endswith(f"/{label}") for label in labels)
+
+
+def _rank_metrics(ranked: list[list[str]], queries: list[LabeledQuery], k: int) -> dict:
+    recalls, reciprocal = [], []
+    for sources, labeled in zip(ranked, queries, strict=True):
+        found = {label for label in labeled.sources for s in sources[:k] if _relevant(s, {label})}
+        recalls.append(len(found) / len(labeled.sources))
+        rank = next((i for i, s in enumerate(sources, 1) if _relevant(s, labeled.sources)), 0)
+        reciprocal.append(1.0 / rank if rank else 0.0)
+    return {
+        f"recall_at_{k}": float(np.mean(recalls)) if recalls else 0.0,
+        "mrr": float(np.mean(reciprocal)) if reciprocal else 0.0,
+    }
+
+
+def _unique_sources(hits: list[dict]) -> list[str]:
+    return list(dict.fromkeys(h["source"] for h in hits))
+
+
+def run_benchmark(
+    corpus: Path | None = None,
+    queries_file: Path | None = None,
+    documents: int = 200,
+    queries: int = 100,
+    words: int = 300,
+    k: int = 10,
+    seed: int = 0,
+) -> dict:
+    from litellm import completion
+
+    settings = get_settings()
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        workdir = Path(tmp)
+        if corpus is None:
+            corpus = workdir / "corpus"
+            labeled = synthetic_corpus(corpus, documents, queries, words, seed)
+        elif queries_file is not None:
+            labeled = load_queries(queries_file)[:queries]
+        else:
+            raise ValueError("A query file with labels is required when benchmarking a corpus")
+
+        split = get_splitter()
+        chunks: list[ChunkRecord] = []
+        for path in iter_source_files(corpus):
+            with timer.time("load"):
+                text = load_text_from_file(path).strip()
+            with timer.time("chunk"):
+                chunks.extend(chunk_document(path, text, split))
+
+        embedder = get_embedder()
+        vector_store = get_vector_store(f"{settings.chroma_collection}-bench")
+        vector_store.reset()
+        try:
+            batch_size = settings.embed_batch_size
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start : start + batch_size]
+                with timer.time("embed"):
+                    vectors = embedder.encode(
+                        [c.text for c in batch],
+                        batch_size=len(batch),
+                        normalize_embeddings=True,
+                        convert_to_numpy=True,
+                    )
+                with timer.time("index"):
+                    vector_store.upsert(batch, vectors)
+            with timer.time("index"):
+                vector_store.commit()
+                bm25 = SparseBM25.build([tokenize(c.text) for c in chunks])
+                chunk_path = workdir / "chunks.bin"
+                with chunk_path.open("wb") as f:
+                    ChunkStore.write(f, chunks)
+            retriever = HybridRetriever(ChunkStore.open(chunk_path), bm25, vector_store)
+
+            ranked: dict[str, list[list[str]]] = defaultdict(list)
+            context_tokens = {"retrieved": 0, "packed": 0}
+            for item in labeled:
+                with timer.time("embed_query"):
+                    qvec = retriever.embed(item.query)
+                with timer.time("dense"):
+                    dense = retriever._dense(item.query, qvec)
+                with timer.time("lexical"):
+                    lexical = retriever._lexical(item.query)
+                with timer.time("fuse"):
+                    fused = retriever._fuse(dense, lexical)
+                with timer.time("rerank"):
+                    hits = retriever.rerank(item.query, fused)
+                with timer.time("generate"):
+                    completion(**completion_kwargs(item.query, hits), mock_response=STUB_ANSWER)
+                _, retrieved_tokens, packed_tokens = pack_context(hits)
+                context_tokens["retrieved"] += retrieved_tokens
+                context_tokens["packed"] += packed_tokens
+                ranked["dense"].append(_unique_sources(dense))
+                ranked["lexical"].append(_unique_sources(lexical))
+                ranked["fused"].append(_unique_sources(fused))
+                ranked["reranked"].append(_unique_sources(hits))
+        finally:
+            vector_store.drop()
+
+    per_query = np.sum([timer.samples[s] for s in QUERY_STAGES], axis=0)
+    timer.samples["query"] = per_query.tolist()
+    return {
+        "config": {
+            "vector_backend": settings.vector_backend,
+            "embedding_model": settings.embedding_model,
+            "embedding_backend": settings.embedding_backend,
+            "reranker_model": settings.reranker_model,
+            "reranker_backend": settings.reranker_backend,
+            "chunking": chunking_strategy(),
+            "context_max_tokens": settings.context_max_tokens,
+            "top_k_dense": settings.top_k_dense,
+            "top_k_bm25": settings.top_k_bm25,
+            "top_k_final": settings.top_k_final,
+            "rrf_k": settings.rrf_k,
+            "k": k,
+            "seed": seed,
+        },
+        "corpus": {
+            "synthetic": queries_file is None,
+            "documents": len(timer.samples["load"]),
+            "chunks": len(chunks),
+            "queries": len(labeled),
+        },
+        "stages": {s: timer.summary(s) for s in (*INGEST_STAGES, *QUERY_STAGES, "query")},
+        "quality": {name: _rank_metrics(lists, labeled, k) for name, lists in ranked.items()},
+        "context": {
+            "retrieved_tokens": context_tokens["retrieved"],
+            "packed_tokens": context_tokens["packed"],
+            "saved_ratio": 1.0 - context_tokens["packed"] / context_tokens["retrieved"]
+            if context_tokens["retrieved"]
+            else 0.0,
+        },
+    }
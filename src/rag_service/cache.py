@@ -0,0 +1,202 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from rag_service.config import get_settings
+from rag_service.schemas import QueryResponse
+
+
+def normalize_query(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def query_hash(question: str) -> str:
+    return hashlib.sha1(" ".join(question.split()).encode("utf-8")).hexdigest()
+
+
+class _Entry(NamedTuple):
+    response: QueryResponse
+    vector: np.ndarray | None
+    expires_at: float
+    scope: str
+
+
+class QueryCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, semantic_threshold: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._generation = -1
+        self._lock = threading.Lock()
+        self._matrices: dict[str, tuple[list[str], np.ndarray]] = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _sync_generation(self, generation: int) -> None:
+        if generation != self._generation:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._matrices.clear()
+            self._generation = generation
+
+    def _live(self, key: str, entry: _Entry, now: float) -> bool:
+        if entry.expires_at > now:
+            return True
+        del self._entries[key]
+        self._matrices.clear()
+        self.evictions += 1
+        return False
+
+    def _key(self, question: str, scope: str) -> str:
+        query = normalize_query(question)
+        return f"{scope}\x1f{query}" if scope else query
+
+    def get(self, question: str, generation: int, scope: str = "") -> QueryResponse | None:
+        if not self.enabled:
+            return None
+        key = self._key(question, scope)
+        with self._lock:
+            self._sync_generation(generation)
+            entry = self._entries.get(key)
+            if entry is not None and self._live(key, entry, time.monotonic()):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response
+        return None
+
+    def get_semantic(
+        self, vector: list[float], generation: int, scope: str = ""
+    ) -> QueryResponse | None:
+        if not self.enabled or self.semantic_threshold > 1.0:
+            self.misses += 1
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._sync_generation(generation)
+            if scope not in self._matrices:
+                keyed = [
+                    (k, e.vector)
+                    for k, e in self._entries.items()
+                    if e.vector is not None and e.scope == scope
+                ]
+                if keyed:
+                    self._matrices[scope] = ([k for k, _ in keyed], np.stack([v for _, v in keyed]))
+            if scope in self._matrices:
+                keys, matrix = self._matrices[scope]
+                sims = matrix @ query
+                best = int(np.argmax(sims))
+                if sims[best] >= self.semantic_threshold:
+                    key = keys[best]
+                    entry = self._entries[key]
+                    if self._live(key, entry, time.monotonic()):
+                        self._entries.move_to_end(key)
+                        self.semantic_hits += 1
+                        return entry.response
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        question: str,
+        generation: int,
+        vector: list[float] | None,
+        response: QueryResponse,
+        scope: str = "",
+    ) -> None:
+        if not self.enabled:
+            return
+        key = self._key(question, scope)
+        stored = np.asarray(vector, dtype=np.float32) if vector is not None else None
+        with self._lock:
+            self._sync_generation(generation)
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[key] = _Entry(response, stored, expires_at, scope)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "generation": self._generation,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+class RerankScoreCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._scores: OrderedDict[tuple[str, str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: list[tuple[str, str, str]]) -> list[float | None]:
+        if self.max_entries <= 0:
+            self.misses += len(keys)
+            return [None] * len(keys)
+        found: list[float | None] = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                found.append(score)
+        hits = sum(1 for score in found if score is not None)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: list[tuple[tuple[str, str, str], float]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_rerank_cache() -> RerankScoreCache:
+    settings = get_settings()
+    return RerankScoreCache(max_entries=settings.rerank_cache_size)
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> QueryCache:
+    settings = get_settings()
+    return QueryCache(
+        max_entries=settings.query_cache_size,
+        ttl_seconds=settings.query_cache_ttl_seconds,
+        semantic_threshold=settings.query_cache_semantic_threshold,
+    )
@@ -0,0 +1,310 @@
+import json
+import mmap
+import shutil
+import tempfile
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+from rag_service.schemas import ChunkRecord
+
+MAGIC = b"RAGCHNK1"
+ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class ChunkStore:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        id_order: np.ndarray,
+        offsets: np.ndarray,
+        source_idx: np.ndarray,
+        sources: list[str],
+        blob: memoryview | bytes,
+        buffer: mmap.mmap | None = None,
+        source_ingested_at: list[int] | None = None,
+        source_tags: list[list[str]] | None = None,
+        dup_offsets: np.ndarray | None = None,
+        dup_idx: np.ndarray | None = None,
+        digests: np.ndarray | None = None,
+        simhashes: np.ndarray | None = None,
+    ) -> None:
+        self.ids = ids
+        self.id_order = id_order
+        self.offsets = offsets
+        self.source_idx = source_idx
+        self.sources = sources
+        n = len(offsets) - 1
+        self.dup_offsets = dup_offsets if dup_offsets is not None else np.zeros(n + 1, np.int64)
+        self.dup_idx = dup_idx if dup_idx is not None else np.empty(0, dtype=np.int32)
+        self.digests = digests if digests is not None else np.zeros(n, dtype=np.uint64)
+        self.simhashes = simhashes if simhashes is not None else np.zeros(n, dtype=np.uint64)
+        self._source_rows: dict[str, int] | None = None
+        ingested = source_ingested_at or [0] * len(sources)
+        self.source_ingested_at = np.asarray(ingested, dtype=np.int64)
+        self.source_tags = source_tags or [[] for _ in sources]
+        self._blob = memoryview(blob)
+        self._buffer = buffer
+
+    @classmethod
+    def empty(cls) -> "ChunkStore":
+        return cls(
+            ids=np.empty(0, dtype="S1"),
+            id_order=np.empty(0, dtype=np.int64),
+            offsets=np.zeros(1, dtype=np.int64),
+            source_idx=np.empty(0, dtype=np.int32),
+            sources=[],
+            blob=b"",
+        )
+
+    @classmethod
+    def open(cls, path: Path) -> "ChunkStore":
+        with path.open("rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a chunk store")
+        header_len = int.from_bytes(buffer[len(MAGIC) : len(MAGIC) + 8], "little")
+        header_start = len(MAGIC) + 8
+        header = json.loads(buffer[header_start : header_start + header_len])
+        data_start = _align(header_start + header_len)
+
+        def section(name: str) -> np.ndarray | None:
+            if name not in header["sections"]:
+                return None
+            offset, dtype, count = header["sections"][name]
+            return np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + offset)
+
+        text_offset, text_len = header["text"]
+        blob = memoryview(buffer)[data_start + text_offset : data_start + text_offset + text_len]
+        meta = header.get("source_meta", {})
+        return cls(
+            ids=section("ids"),
+            id_order=section("id_order"),
+            offsets=section("offsets"),
+            source_idx=section("source_idx"),
+            sources=header["sources"],
+            blob=blob,
+            buffer=buffer,
+            source_ingested_at=meta.get("ingested_at"),
+            source_tags=meta.get("tags"),
+            dup_offsets=section("dup_offsets"),
+            dup_idx=section("dup_idx"),
+            digests=section("digests"),
+            simhashes=section("simhashes"),
+        )
+
+    @staticmethod
+    def write(handle: BinaryIO, chunks: Iterable[ChunkRecord]) -> None:
+        with tempfile.TemporaryFile() as spill:
+            writer = ChunkWriter(spill)
+            for chunk in chunks:
+                writer.add(chunk)
+            writer.write(handle)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def touch(self) -> None:
+        if self._buffer is not None and hasattr(mmap, "MADV_WILLNEED"):
+            self._buffer.madvise(mmap.MADV_WILLNEED)
+
+    def __getitem__(self, row: int) -> ChunkRecord:
+        return self.occurrence(row, int(self.source_idx[row]))
+
+    def occurrence(self, row: int, idx: int) -> ChunkRecord:
+        return ChunkRecord(
+            chunk_id=self.chunk_id(row),
+            source=self.sources[idx],
+            text=self.text(row),
+            ingested_at=int(self.source_ingested_at[idx]),
+            tags=self.source_tags[idx],
+            digest=int(self.digests[row]),
+            simhash=int(self.simhashes[row]),
+        )
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return isinstance(chunk_id, str) and self.row_of(chunk_id) is not None
+
+    def chunk_id(self, row: int) -> str:
+        return self.ids[row].decode("ascii")
+
+    def source(self, row: int) -> str:
+        return self.sources[self.source_idx[row]]
+
+    def source_index(self, source: str) -> int | None:
+        if self._source_rows is None:
+            self._source_rows = {s: i for i, s in enumerate(self.sources)}
+        return self._source_rows.get(source)
+
+    def source_indexes(self, row: int) -> list[int]:
+        extra = self.dup_idx[self.dup_offsets[row] : self.dup_offsets[row + 1]]
+        return [int(self.source_idx[row]), *extra.tolist()]
+
+    def rows_in(self, allowed: np.ndarray) -> np.ndarray:
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        mask = allowed[self.source_idx]
+        if len(self.dup_idx):
+            owners = np.repeat(np.arange(len(self)), np.diff(self.dup_offsets))
+            mask[owners[allowed[self.dup_idx]]] = True
+        return mask
+
+    def raw(self, row: int) -> memoryview:
+        return self._blob[self.offsets[row] : self.offsets[row + 1]]
+
+    def text(self, row: int) -> str:
+        return str(self.raw(row), "utf-8")
+
+    def chunk_ids(self) -> list[str]:
+        return [i.decode("ascii") for i in self.ids.tolist()]
+
+    def row_of(self, chunk_id: str) -> int | None:
+        if not len(self):
+            return None
+        key = chunk_id.encode("ascii", errors="ignore")
+        pos = int(np.searchsorted(self.ids, key, sorter=self.id_order))
+        if pos < len(self) and self.ids[self.id_order[pos]] == key:
+            return int(self.id_order[pos])
+        return None
+
+    def get(self, chunk_id: str) -> ChunkRecord | None:
+        row = self.row_of(chunk_id)
+        return None if row is None else self[row]
+
+
+class ChunkWriter:
+    def __init__(self, spill: BinaryIO) -> None:
+        self.sources: dict[str, int] = {}
+        self.meta: dict[str, list] = {"ingested_at": [], "tags": []}
+        self.rows: dict[str, int] = {}
+        self.primary = array("i")
+        self.extra: dict[int, list[int]] = {}
+        self.offsets = array("q", [0])
+        self.digests = array("Q")
+        self.simhashes = array("Q")
+        self.width = 1
+        self.occurrences = 0
+        self._text = spill
+
+    def __len__(self) -> int:
+        return len(self.primary)
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self.rows
+
+    def add(self, chunk: ChunkRecord) -> bool:
+        self.occurrences += 1
+        idx = self._source(chunk.source, chunk.ingested_at, chunk.tags)
+        if self._seen(chunk.chunk_id, idx):
+            return False
+        self._append(chunk.chunk_id, idx, chunk.text.encode("utf-8"), chunk.digest, chunk.simhash)
+        return True
+
+    def carry(self, store: ChunkStore, source: str, chunk_ids: list[str]) -> list[tuple[int, int]]:
+        if not chunk_ids:
+            return []
+        old = store.source_index(source)
+        idx = self._source(source, int(store.source_ingested_at[old]), store.source_tags[old])
+        moved = []
+        for chunk_id in chunk_ids:
+            self.occurrences += 1
+            if self._seen(chunk_id, idx):
+                continue
+            row = store.row_of(chunk_id)
+            moved.append((row, len(self.primary)))
+            digest, simhash = int(store.digests[row]), int(store.simhashes[row])
+            self._append(chunk_id, idx, store.raw(row), digest, simhash)
+        return moved
+
+    def _source(self, source: str, ingested_at: int, tags: list[str]) -> int:
+        idx = self.sources.get(source)
+        if idx is None:
+            idx = self.sources[source] = len(self.sources)
+            self.meta["ingested_at"].append(ingested_at)
+            self.meta["tags"].append(tags)
+        return idx
+
+    def _seen(self, chunk_id: str, idx: int) -> bool:
+        row = self.rows.get(chunk_id)
+        if row is None:
+            return False
+        if idx != self.primary[row]:
+            extra = self.extra.setdefault(row, [])
+            if idx not in extra:
+                extra.append(idx)
+        return True
+
+    def _append(
+        self, chunk_id: str, idx: int, text: bytes | memoryview, digest: int, simhash: int
+    ) -> None:
+        self.rows[chunk_id] = len(self.primary)
+        self.primary.append(idx)
+        self._text.write(text)
+        self.offsets.append(self.offsets[-1] + len(text))
+        self.digests.append(digest)
+        self.simhashes.append(simhash)
+        self.width = max(self.width, len(chunk_id))
+
+    def write(self, handle: BinaryIO) -> None:
+        n = len(self)
+        ids = np.array([cid.encode("ascii") for cid in self.rows], dtype=f"S{self.width}")
+        extra_counts = np.zeros(n, dtype=np.int64)
+        for row, extra in self.extra.items():
+            extra_counts[row] = len(extra)
+        dup_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(extra_counts, out=dup_offsets[1:])
+        dup_idx = np.fromiter(
+            (i for row in sorted(self.extra) for i in self.extra[row]), dtype=np.int32
+        )
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+
+        arrays = {
+            "ids": ids,
+            "id_order": np.argsort(ids, kind="stable").astype(np.int64),
+            "offsets": offsets,
+            "source_idx": np.frombuffer(self.primary, dtype=np.int32),
+            "dup_offsets": dup_offsets,
+            "dup_idx": dup_idx,
+            "digests": np.frombuffer(self.digests, dtype=np.uint64),
+            "simhashes": np.frombuffer(self.simhashes, dtype=np.uint64),
+        }
+        sections: dict[str, list] = {}
+        cursor = 0
+        for name, arr in arrays.items():
+            sections[name] = [cursor, arr.dtype.str, int(arr.size)]
+            cursor = _align(cursor + arr.nbytes)
+        header = json.dumps(
+            {
+                "sections": sections,
+                "text": [cursor, int(offsets[-1])],
+                "sources": list(self.sources),
+                "source_meta": self.meta,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+        handle.write(MAGIC)
+        handle.write(len(header).to_bytes(8, "little"))
+        handle.write(header)
+        data_start = _align(len(MAGIC) + 8 + len(header))
+        handle.write(b"\0" * (data_start - len(MAGIC) - 8 - len(header)))
+        written = 0
+        for name, arr in arrays.items():
+            offset = sections[name][0]
+            handle.write(b"\0" * (offset - written))
+            handle.write(arr.tobytes())
+            written = offset + arr.nbytes
+        handle.write(b"\0" * (cursor - written))
+        self._text.seek(0)
+        shutil.copyfileobj(self._text, handle, 1024 * 1024)
@@ -1,8 +1,23 @@
 import hashlib
+import re
+from collections.abc import Callable
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import Any
 
+from rag_service.config import get_settings
+from rag_service.dedup import digest
+from rag_service.models import get_tokenizer
 from rag_service.schemas import ChunkRecord
 
+Splitter = Callable[[str], list[str]]
+
+PAGE_BREAK = "\f"
+HEADING = re.compile(r"^(?=#{1,6}\s)", re.MULTILINE)
+PARAGRAPH = re.compile(r"\n\s*\n")
+SENTENCE = re.compile(r"(?<=[.!?])\s+")
+MAX_REPORTED_LENGTH = 1_000_000
+
 
 def _hash_chunk(source: str, text: str, index: int) -> str:
     raw = f"{source}::{index}::{text}".encode("utf-8", errors="ignore")
@@ -28,10 +43,131 @@ def split_text(text: str, size: int, overlap: int) -> list[str]:
     return chunks
 
 
-def chunk_document(path: Path, text: str, size: int, overlap: int) -> list[ChunkRecord]:
+def split_sections(text: str) -> list[str]:
+    sections = []
+    for page in text.split(PAGE_BREAK):
+        sections.extend(s for s in HEADING.split(page) if s.strip())
+    return sections
+
+
+def split_units(section: str) -> list[str]:
+    units = []
+    for paragraph in PARAGRAPH.split(section):
+        for sentence in SENTENCE.split(paragraph):
+            unit = " ".join(sentence.split())
+            if unit:
+                units.append(unit)
+    return units
+
+
+class TokenSplitter:
+    def __init__(self, tokenizer: Any, max_tokens: int, overlap: int) -> None:
+        if max_tokens <= overlap:
+            raise ValueError("chunk token budget must be larger than overlap")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    def _lengths(self, units: list[str]) -> list[int]:
+        encoded = self.tokenizer(units, add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _pieces(self, unit: str) -> list[tuple[str, int]]:
+        encoded = self.tokenizer([unit], add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded["offset_mapping"][0]
+        pieces = []
+        step = self.max_tokens - self.overlap
+        for start in range(0, len(offsets), step):
+            window = offsets[start : start + self.max_tokens]
+            pieces.append((unit[window[0][0] : window[-1][1]].strip(), len(window)))
+            if start + self.max_tokens >= len(offsets):
+                break
+        return pieces
+
+    def _pack(self, pieces: list[tuple[str, int]]) -> list[str]:
+        chunks: list[str] = []
+        current: list[tuple[str, int]] = []
+        total = 0
+        for text, n in pieces:
+            if current and total + n > self.max_tokens:
+                chunks.append(" ".join(t for t, _ in current))
+                carried: list[tuple[str, int]] = []
+                kept = 0
+                for t, m in reversed(current):
+                    if kept + m > self.overlap or kept + m + n > self.max_tokens:
+                        break
+                    carried.insert(0, (t, m))
+                    kept += m
+                current, total = carried, kept
+            current.append((text, n))
+            total += n
+        if current:
+            chunks.append(" ".join(t for t, _ in current))
+        return chunks
+
+    def __call__(self, text: str) -> list[str]:
+        sections = [split_units(s) for s in split_sections(text)]
+        flat = [u for units in sections for u in units]
+        if not flat:
+            return []
+        lengths = iter(self._lengths(flat))
+        chunks = []
+        for units in sections:
+            pieces: list[tuple[str, int]] = []
+            for unit in units:
+                n = next(lengths)
+                pieces.extend(self._pieces(unit) if n > self.max_tokens else [(unit, n)])
+            chunks.extend(self._pack(pieces))
+        return chunks
+
+
+def token_budget() -> int:
+    settings = get_settings()
+    tokenizer = get_tokenizer()
+    limit = tokenizer.model_max_length - tokenizer.num_special_tokens_to_add()
+    if settings.chunk_max_tokens > 0:
+        return min(limit, settings.chunk_max_tokens)
+    if tokenizer.model_max_length > MAX_REPORTED_LENGTH:
+        raise ValueError(
+            f"{settings.embedding_model} reports no max sequence length; set CHUNK_MAX_TOKENS"
+        )
+    return limit
+
+
+def chunking_strategy() -> str:
+    settings = get_settings()
+    if settings.chunk_strategy == "words":
+        return f"words:{settings.chunk_size}:{settings.chunk_overlap}"
+    return f"tokens:{settings.embedding_model}:{token_budget()}:{settings.chunk_overlap_tokens}"
+
+
+@lru_cache(maxsize=1)
+def get_splitter() -> Splitter:
+    settings = get_settings()
+    if settings.chunk_strategy == "words":
+        return partial(split_text, size=settings.chunk_size, overlap=settings.chunk_overlap)
+    if settings.chunk_strategy != "tokens":
+        raise ValueError(f"Unsupported chunk strategy: {settings.chunk_strategy}")
+    return TokenSplitter(get_tokenizer(), token_budget(), settings.chunk_overlap_tokens)
+
+
+def chunk_document(
+    path: Path,
+    text: str,
+    split: Splitter,
+    ingested_at: int = 0,
+    tags: list[str] | None = None,
+) -> list[ChunkRecord]:
     source = str(path.as_posix())
-    parts = split_text(text=text, size=size, overlap=overlap)
+    parts = split(text)
     return [
-        ChunkRecord(chunk_id=_hash_chunk(source, part, i), source=source, text=part)
+        ChunkRecord(
+            chunk_id=_hash_chunk(source, part, i),
+            source=source,
+            text=part,
+            ingested_at=ingested_at,
+            tags=tags or [],
+            digest=digest(part),
+        )
         for i, part in enumerate(parts)
     ]
@@ -1,25 +1,175 @@
+import asyncio
+import json
+import sys
+from datetime import datetime
 from pathlib import Path
+from typing import Annotated
 
 import typer
 
-from rag_service.ingest import IngestionService
-from rag_service.service import RAGService
+from rag_service.schemas import BatchQueryItem, IngestProgress, QueryFilters
 
 app = typer.Typer(help="Industrial RAG CLI")
 
 
 @app.command()
-def ingest(source_dir: str, glob: str = "**/*") -> None:
+def ingest(
+    source_dir: str,
+    glob: str = "**/*",
+    incremental: bool = False,
+    resume: bool = True,
+    workers: int = 0,
+    tag: Annotated[
+        list[str] | None, typer.Option(help="Tag attached to every loaded document")
+    ] = None,
+) -> None:
+    from rag_service.ingest import IngestionService
+
     service = IngestionService()
-    docs, chunks = service.ingest(Path(source_dir), glob)
+
+    def progress(p: IngestProgress) -> None:
+        if p.phase != "loading":
+            typer.echo(
+                f"[{p.phase}] documents={p.documents} chunks={p.chunks} "
+                f"embedded={p.embedded} skipped={p.skipped} duplicates={p.duplicates}",
+                err=True,
+            )
+
+    docs, chunks = service.ingest(
+        Path(source_dir),
+        glob,
+        incremental=incremental,
+        resume=resume,
+        progress=progress,
+        workers=workers,
+        tags=tag,
+    )
     typer.echo(f"Ingested {docs} documents, {chunks} chunks")
 
 
 @app.command()
-def query(text: str) -> None:
+def query(
+    text: str,
+    stream: bool = False,
+    source_glob: Annotated[
+        str | None, typer.Option(help="Only search sources matching this glob")
+    ] = None,
+    file_type: Annotated[
+        list[str] | None, typer.Option(help="Only search these file types, e.g. pdf")
+    ] = None,
+    tag: Annotated[
+        list[str] | None, typer.Option(help="Only search documents carrying any of these tags")
+    ] = None,
+    ingested_after: Annotated[
+        datetime | None, typer.Option(help="Only search documents ingested since")
+    ] = None,
+    timings: Annotated[bool, typer.Option(help="Print per-stage latency in milliseconds")] = False,
+) -> None:
+    from rag_service.service import RAGService
+
+    filters = QueryFilters(
+        source_glob=source_glob,
+        file_types=file_type or [],
+        tags=tag or [],
+        ingested_after=ingested_after,
+    )
     service = RAGService()
-    result = service.query(text)
+    if stream:
+        for event, payload in service.stream(text, filters):
+            if event == "citations":
+                typer.echo("Citations:")
+                for c in payload["citations"]:
+                    typer.echo(f"- {c['source']} [{c['chunk_id']}] score={c['score']:.4f}")
+                typer.echo("")
+            elif event == "token":
+                typer.echo(payload["text"], nl=False)
+        typer.echo("")
+        return
+
+    result = service.query(text, filters, timings)
     typer.echo(result.answer)
     typer.echo("\nCitations:")
     for c in result.citations:
         typer.echo(f"- {c.source} [{c.chunk_id}] score={c.score:.4f}")
+    if result.timings:
+        typer.echo("\nTimings (ms):")
+        for name, ms in result.timings.items():
+            typer.echo(f"- {name}: {ms:.2f}")
+
+
+@app.command("query-file")
+def query_file(path: str, output: str = "", generate: bool = True) -> None:
+    from rag_service.service import RAGService
+
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    items = [BatchQueryItem.model_validate_json(line) for line in lines if line.strip()]
+    service = RAGService()
+
+    async def run(sink) -> None:
+        async for result in service.abatch(items, generate):
+            sink.write(result.model_dump_json() + "\n")
+            sink.flush()
+
+    if not output:
+        asyncio.run(run(sys.stdout))
+        return
+    with Path(output).open("w", encoding="utf-8") as sink:
+        asyncio.run(run(sink))
+
+
+@app.command()
+def parity(
+    embedding_backend: str = "openvino-int8",
+    reranker_backend: str = "openvino-int8",
+    queries_file: str = "",
+    sample: int = 2000,
+    k: int = 8,
+) -> None:
+    from rag_service.parity import backend_parity
+
+    queries = []
+    if queries_file:
+        lines = Path(queries_file).read_text(encoding="utf-8").splitlines()
+        queries = [line.strip() for line in lines if line.strip()]
+    report = backend_parity(embedding_backend, reranker_backend, queries, sample_size=sample, k=k)
+    typer.echo(json.dumps(report, indent=2))
+
+
+@app.command("vector-compare")
+def vector_compare(queries: int = 200, k: int = 10, noise: float = 0.05) -> None:
+    from rag_service.vector_compare import compare_vector_backends
+
+    report = compare_vector_backends(n_queries=queries, k=k, noise=noise)
+    typer.echo(json.dumps(report, indent=2))
+
+
+@app.command()
+def bench(
+    corpus: Annotated[
+        str, typer.Option(help="Directory to index instead of a synthetic corpus")
+    ] = "",
+    queries_file: Annotated[
+        str, typer.Option(help='JSONL of {"query": ..., "source": ...} labels')
+    ] = "",
+    documents: int = 200,
+    queries: int = 100,
+    words: int = 300,
+    k: int = 10,
+    seed: int = 0,
+    output: str = "",
+) -> None:
+    from rag_service.bench import run_benchmark
+
+    report = run_benchmark(
+        corpus=Path(corpus) if corpus else None,
+        queries_file=Path(queries_file) if queries_file else None,
+        documents=documents,
+        queries=queries,
+        words=words,
+        k=k,
+        seed=seed,
+    )
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+    typer.echo(text)
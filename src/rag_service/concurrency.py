@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import cache, lru_cache, partial
+from typing import Any, TypeVar
+
+from rag_service.config import get_settings
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str, retry_after: int) -> None:
+        super().__init__(f"{stage} stage is at capacity")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+@lru_cache(maxsize=1)
+def get_inference_executor() -> ThreadPoolExecutor:
+    settings = get_settings()
+    return ThreadPoolExecutor(
+        max_workers=settings.inference_threads, thread_name_prefix="inference"
+    )
+
+
+async def run_inference(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_inference_executor(), call)
+
+
+class StageLimiter:
+    def __init__(self, name: str, limit: int, queue_timeout_ms: float, retry_after: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.retry_after = retry_after
+        self._semaphore = asyncio.BoundedSemaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except TimeoutError:
+            raise Overloaded(self.name, self.retry_after) from None
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+@cache
+def get_limiter(stage: str) -> StageLimiter:
+    settings = get_settings()
+    limits = {
+        "retrieval": settings.retrieval_concurrency,
+        "rerank": settings.rerank_concurrency,
+        "generation": settings.generation_concurrency,
+    }
+    return StageLimiter(
+        name=stage,
+        limit=limits[stage],
+        queue_timeout_ms=settings.stage_queue_timeout_ms,
+        retry_after=settings.retry_after_seconds,
+    )
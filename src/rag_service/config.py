@@ -12,6 +12,27 @@ class Settings(BaseSettings):
     app_host: str = Field(default="0.0.0.0", alias="APP_HOST")
     app_port: int = Field(default=8000, alias="APP_PORT")
 
+    vector_backend: str = Field(default="chroma", alias="VECTOR_BACKEND")
+    vector_path: Path = Field(default=Path("./vector_index"), alias="VECTOR_PATH")
+    vector_dtype: str = Field(default="float32", alias="VECTOR_DTYPE")
+    vector_ivf_min_rows: int = Field(default=50000, alias="VECTOR_IVF_MIN_ROWS")
+    vector_ivf_lists: int = Field(default=0, alias="VECTOR_IVF_LISTS")
+    vector_ivf_probe: int = Field(default=8, alias="VECTOR_IVF_PROBE")
+    qdrant_url: str = Field(default="http://localhost:6333", alias="QDRANT_URL")
+    qdrant_api_key: str = Field(default="", alias="QDRANT_API_KEY")
+    qdrant_prefer_grpc: bool = Field(default=True, alias="QDRANT_PREFER_GRPC")
+    qdrant_grpc_port: int = Field(default=6334, alias="QDRANT_GRPC_PORT")
+    qdrant_pool_size: int = Field(default=8, alias="QDRANT_POOL_SIZE")
+    qdrant_timeout: int = Field(default=30, alias="QDRANT_TIMEOUT")
+    qdrant_upsert_batch: int = Field(default=256, alias="QDRANT_UPSERT_BATCH")
+    qdrant_upsert_parallel: int = Field(default=4, alias="QDRANT_UPSERT_PARALLEL")
+    qdrant_hnsw_m: int = Field(default=16, alias="QDRANT_HNSW_M")
+    qdrant_hnsw_ef_construct: int = Field(default=100, alias="QDRANT_HNSW_EF_CONSTRUCT")
+    qdrant_hnsw_ef: int = Field(default=128, alias="QDRANT_HNSW_EF")
+    qdrant_quantization: str = Field(default="none", alias="QDRANT_QUANTIZATION")
+    qdrant_oversampling: float = Field(default=2.0, alias="QDRANT_OVERSAMPLING")
+    qdrant_on_disk: bool = Field(default=False, alias="QDRANT_ON_DISK")
+
     chroma_path: Path = Field(default=Path("./chroma_db"), alias="CHROMA_PATH")
     chroma_collection: str = Field(default="industrial_rag", alias="CHROMA_COLLECTION")
 
@@ -20,18 +41,59 @@ class Settings(BaseSettings):
 
     embedding_model: str = Field(default="BAAI/bge-base-en-v1.5", alias="EMBEDDING_MODEL")
     reranker_model: str = Field(default="BAAI/bge-reranker-base", alias="RERANKER_MODEL")
+    reranker_fast_model: str = Field(default="", alias="RERANKER_FAST_MODEL")
+    rerank_cascade_keep: int = Field(default=12, alias="RERANK_CASCADE_KEEP")
+    rerank_skip_agreement: float = Field(default=0.0, alias="RERANK_SKIP_AGREEMENT")
+    rerank_cache_size: int = Field(default=50000, alias="RERANK_CACHE_SIZE")
+    embedding_backend: str = Field(default="torch", alias="EMBEDDING_BACKEND")
+    reranker_backend: str = Field(default="torch", alias="RERANKER_BACKEND")
+    inference_batch_wait_ms: float = Field(default=5.0, alias="INFERENCE_BATCH_WAIT_MS")
+    inference_max_batch: int = Field(default=32, alias="INFERENCE_MAX_BATCH")
+    rerank_max_batch_pairs: int = Field(default=256, alias="RERANK_MAX_BATCH_PAIRS")
+
+    warmup_on_start: bool = Field(default=True, alias="WARMUP_ON_START")
+    ingest_job_history: int = Field(default=100, alias="INGEST_JOB_HISTORY")
+    inference_threads: int = Field(default=32, alias="INFERENCE_THREADS")
+    retrieval_concurrency: int = Field(default=32, alias="RETRIEVAL_CONCURRENCY")
+    rerank_concurrency: int = Field(default=8, alias="RERANK_CONCURRENCY")
+    generation_concurrency: int = Field(default=16, alias="GENERATION_CONCURRENCY")
+    stage_queue_timeout_ms: float = Field(default=250.0, alias="STAGE_QUEUE_TIMEOUT_MS")
+    retry_after_seconds: int = Field(default=1, alias="RETRY_AFTER_SECONDS")
+
+    query_cache_size: int = Field(default=1024, alias="QUERY_CACHE_SIZE")
+    query_cache_ttl_seconds: float = Field(default=3600.0, alias="QUERY_CACHE_TTL_SECONDS")
+    query_cache_semantic_threshold: float = Field(
+        default=0.95, alias="QUERY_CACHE_SEMANTIC_THRESHOLD"
+    )
+    query_batch_size: int = Field(default=256, alias="QUERY_BATCH_SIZE")
+    query_batch_concurrency: int = Field(default=8, alias="QUERY_BATCH_CONCURRENCY")
+
+    loader_workers: int = Field(default=0, alias="LOADER_WORKERS")
+    loader_queue_size: int = Field(default=64, alias="LOADER_QUEUE_SIZE")
+    embed_batch_size: int = Field(default=64, alias="EMBED_BATCH_SIZE")
+    embed_window: int = Field(default=2048, alias="EMBED_WINDOW")
+    ingest_workers: int = Field(default=1, alias="INGEST_WORKERS")
 
+    chunk_strategy: str = Field(default="words", alias="CHUNK_STRATEGY")
+    chunk_max_tokens: int = Field(default=0, alias="CHUNK_MAX_TOKENS")
+    chunk_overlap_tokens: int = Field(default=32, alias="CHUNK_OVERLAP_TOKENS")
     chunk_size: int = Field(default=900, alias="CHUNK_SIZE")
     chunk_overlap: int = Field(default=180, alias="CHUNK_OVERLAP")
+    dedup_enabled: bool = Field(default=True, alias="DEDUP_ENABLED")
+    dedup_near_distance: int = Field(default=0, alias="DEDUP_NEAR_DISTANCE")
+    dedup_shingle_size: int = Field(default=3, alias="DEDUP_SHINGLE_SIZE")
     top_k_dense: int = Field(default=20, alias="TOP_K_DENSE")
     top_k_bm25: int = Field(default=20, alias="TOP_K_BM25")
     top_k_final: int = Field(default=8, alias="TOP_K_FINAL")
     rrf_k: int = Field(default=60, alias="RRF_K")
+    filter_pushdown_max_fraction: float = Field(default=0.2, alias="FILTER_PUSHDOWN_MAX_FRACTION")
 
     litellm_model: str = Field(default="gpt-4.1-mini", alias="LITELLM_MODEL")
     litellm_api_base: str = Field(default="", alias="LITELLM_API_BASE")
     litellm_temperature: float = Field(default=0.1, alias="LITELLM_TEMPERATURE")
     litellm_max_tokens: int = Field(default=700, alias="LITELLM_MAX_TOKENS")
+    context_max_tokens: int = Field(default=3000, alias="CONTEXT_MAX_TOKENS")
+    context_merge_min_overlap: int = Field(default=40, alias="CONTEXT_MERGE_MIN_OVERLAP")
 
 
 @lru_cache(maxsize=1)
@@ -40,4 +102,5 @@ def get_settings() -> Settings:
     settings.data_dir.mkdir(parents=True, exist_ok=True)
     settings.index_dir.mkdir(parents=True, exist_ok=True)
     settings.chroma_path.mkdir(parents=True, exist_ok=True)
+    settings.vector_path.mkdir(parents=True, exist_ok=True)
     return settings
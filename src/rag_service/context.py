@@ -0,0 +1,98 @@
+from dataclasses import dataclass, field
+
+from rag_service.config import get_settings
+from rag_service.metrics import CONTEXT_TOKENS
+
+
+@dataclass
+class Span:
+    source: str
+    text: str
+    rank: int
+    chunk_ids: list[str] = field(default_factory=list)
+
+    def as_chunk(self) -> dict:
+        return {"chunk_id": ", ".join(self.chunk_ids), "source": self.source, "text": self.text}
+
+
+def count_tokens(text: str) -> int:
+    from litellm import token_counter
+
+    return token_counter(model=get_settings().litellm_model, text=text)
+
+
+def _overlap(left: str, right: str, minimum: int) -> int:
+    head = right[:minimum]
+    if len(head) < minimum:
+        return 0
+    pos = left.find(head, max(0, len(left) - len(right)))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(head, pos + 1)
+    return 0
+
+
+def _merge(first: str, second: str, minimum: int) -> str | None:
+    if second in first:
+        return first
+    if first in second:
+        return second
+    k = _overlap(first, second, minimum)
+    if k:
+        return first + second[k:]
+    k = _overlap(second, first, minimum)
+    if k:
+        return second + first[k:]
+    return None
+
+
+def merge_hits(hits: list[dict], minimum: int) -> list[Span]:
+    spans: list[Span] = []
+    for rank, hit in enumerate(hits):
+        span = Span(hit["source"], hit["text"], rank, [hit["chunk_id"]])
+        merged = True
+        while merged:
+            merged = False
+            for other in spans:
+                if other.source != span.source:
+                    continue
+                text = _merge(other.text, span.text, minimum)
+                if text is None:
+                    continue
+                spans.remove(other)
+                ids = other.chunk_ids + span.chunk_ids
+                span = Span(span.source, text, min(other.rank, span.rank), ids)
+                merged = True
+                break
+        spans.append(span)
+    return sorted(spans, key=lambda s: s.rank)
+
+
+def _truncate(span: Span, budget: int, tokens: int) -> Span:
+    words = span.text.split()
+    keep = max(1, len(words) * budget // max(tokens, 1))
+    return Span(span.source, " ".join(words[:keep]), span.rank, span.chunk_ids)
+
+
+def pack_context(hits: list[dict]) -> tuple[list[dict], int, int]:
+    settings = get_settings()
+    budget = settings.context_max_tokens
+    counts = [count_tokens(hit["text"]) for hit in hits]
+    packed: list[Span] = []
+    used = 0
+    for span in merge_hits(hits, settings.context_merge_min_overlap):
+        tokens = counts[span.rank] if len(span.chunk_ids) == 1 else count_tokens(span.text)
+        if budget > 0 and used + tokens > budget:
+            if packed:
+                continue
+            span = _truncate(span, budget, tokens)
+            tokens = count_tokens(span.text)
+        packed.append(span)
+        used += tokens
+    return [span.as_chunk() for span in packed], sum(counts), used
+
+
+def record_savings(retrieved: int, packed: int) -> None:
+    CONTEXT_TOKENS.labels("retrieved").inc(retrieved)
+    CONTEXT_TOKENS.labels("packed").inc(packed)
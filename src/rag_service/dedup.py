@@ -0,0 +1,81 @@
+import hashlib
+import re
+
+import numpy as np
+
+from rag_service.chunk_store import ChunkStore
+from rag_service.metrics import DUPLICATES
+from rag_service.schemas import ChunkRecord
+
+WORD = re.compile(r"\w+")
+BITS = np.arange(64, dtype=np.uint64)
+
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def digest(text: str) -> int:
+    return _hash64(" ".join(text.lower().split()))
+
+
+def simhash(text: str, shingle: int) -> int:
+    words = WORD.findall(text.lower())
+    if not words:
+        return 0
+    grams = [" ".join(words[i : i + shingle]) for i in range(max(len(words) - shingle + 1, 1))]
+    hashes = np.fromiter((_hash64(g) for g in grams), dtype=np.uint64, count=len(grams))
+    votes = ((hashes[:, None] >> BITS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    return int(((votes * 2 > len(grams)).astype(np.uint64) << BITS).sum())
+
+
+class Deduplicator:
+    def __init__(self, max_distance: int, shingle: int, store: ChunkStore | None = None) -> None:
+        self.max_distance = max(max_distance, 0)
+        self.shingle = shingle
+        self.store = store or ChunkStore.empty()
+        self.width = 64 // (self.max_distance + 1)
+        bands = self.max_distance + 1 if self.max_distance else 0
+        self.buckets: list[dict[int, list[tuple[int, str]]]] = [{} for _ in range(bands)]
+        self.exact: dict[int, str] = {}
+        self.canonical: dict[str, tuple[int, int]] = {}
+        self.duplicates = 0
+        for row in range(len(self.store)):
+            d, s = int(self.store.digests[row]), int(self.store.simhashes[row])
+            if d or s:
+                self._register(self.store.chunk_id(row), d, s)
+
+    def _keys(self, value: int) -> list[int]:
+        mask = (1 << self.width) - 1
+        return [(value >> (band * self.width)) & mask for band in range(len(self.buckets))]
+
+    def _register(self, chunk_id: str, d: int, s: int) -> None:
+        self.exact.setdefault(d, chunk_id)
+        self.canonical[chunk_id] = (d, s)
+        for bucket, key in zip(self.buckets, self._keys(s), strict=True):
+            bucket.setdefault(key, []).append((s, chunk_id))
+
+    def _match(self, d: int, s: int) -> str | None:
+        chunk_id = self.exact.get(d)
+        if chunk_id is not None:
+            return chunk_id
+        for bucket, key in zip(self.buckets, self._keys(s), strict=True):
+            for other, chunk_id in bucket.get(key, ()):
+                if (other ^ s).bit_count() <= self.max_distance:
+                    return chunk_id
+        return None
+
+    def resolve(self, chunk: ChunkRecord) -> ChunkRecord:
+        d, s = chunk.digest or digest(chunk.text), simhash(chunk.text, self.shingle)
+        chunk_id = self._match(d, s)
+        if chunk_id is None:
+            self._register(chunk.chunk_id, d, s)
+            return chunk.model_copy(update={"digest": d, "simhash": s})
+        d, s = self.canonical[chunk_id]
+        row = self.store.row_of(chunk_id)
+        text = chunk.text if row is None else self.store.text(row)
+        self.duplicates += 1
+        DUPLICATES.inc()
+        return chunk.model_copy(
+            update={"chunk_id": chunk_id, "text": text, "digest": d, "simhash": s}
+        )
@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rag_service.metrics import EMBEDDED, observe, stage
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import VectorStore
+
+BatchEncoder = Callable[[list[list[str]]], Iterator[np.ndarray]]
+
+
+def local_encoder(embedder) -> BatchEncoder:
+    def encode(batches: list[list[str]]) -> Iterator[np.ndarray]:
+        for texts in batches:
+            yield embedder.encode(
+                texts,
+                batch_size=len(texts),
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            ).astype(np.float32, copy=False)
+
+    return encode
+
+
+_worker_model = None
+
+
+def _init_worker(threads: int) -> None:
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import torch
+
+    from rag_service.config import get_settings
+    from rag_service.models import load_embedder
+
+    torch.set_num_threads(threads)
+    _worker_model = load_embedder(get_settings().embedding_backend)
+
+
+def _encode_in_worker(texts: list[str]) -> np.ndarray:
+    return _worker_model.encode(
+        texts,
+        batch_size=len(texts),
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+    ).astype(np.float32, copy=False)
+
+
+class ProcessEncoder:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        )
+
+    def __call__(self, batches: list[list[str]]) -> Iterator[np.ndarray]:
+        return self.pool.map(_encode_in_worker, batches)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        encode: BatchEncoder,
+        vector_store: VectorStore,
+        batch_size: int,
+        window: int,
+        skip_existing: bool = False,
+        on_commit: Callable[["EmbeddingPipeline"], None] | None = None,
+    ) -> None:
+        self.encode = encode
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.window = max(window, batch_size)
+        self.skip_existing = skip_existing
+        self.on_commit = on_commit
+        self.pending: list[ChunkRecord] = []
+        self.queued = 0
+        self.embedded = 0
+        self.skipped = 0
+
+    def add(self, chunks: Iterable[ChunkRecord]) -> None:
+        before = len(self.pending)
+        self.pending.extend(chunks)
+        self.queued += len(self.pending) - before
+        if len(self.pending) >= self.window:
+            self.flush()
+
+    def flush(self) -> None:
+        pending, self.pending = self.pending, []
+        if self.skip_existing and pending:
+            stored = self.vector_store.existing_ids([c.chunk_id for c in pending])
+            self.skipped += len(stored)
+            pending = [c for c in pending if c.chunk_id not in stored]
+        if not pending:
+            return
+
+        pending.sort(key=lambda c: len(c.text))
+        batches = [
+            pending[start : start + self.batch_size]
+            for start in range(0, len(pending), self.batch_size)
+        ]
+        vectors = iter(self.encode([[c.text for c in batch] for batch in batches]))
+        for batch in batches:
+            started = time.perf_counter()
+            batch_vectors = next(vectors)
+            observe("embed", time.perf_counter() - started)
+            with stage("index"):
+                self.vector_store.upsert(chunks=batch, vectors=batch_vectors)
+            EMBEDDED.inc(len(batch))
+            self.embedded += len(batch)
+            if self.on_commit is not None:
+                self.on_commit(self)
@@ -0,0 +1,78 @@
+import importlib
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from rag_service.config import get_settings
+from rag_service.index_store import IndexStore
+from rag_service.models import get_embedder, get_fast_reranker, get_reranker
+from rag_service.retrieval import HybridRetriever
+from rag_service.vector_store import get_vector_store
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    generation: int
+    stamp: int
+    retriever: HybridRetriever
+
+
+class RetrievalEngine:
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        self.index_store = IndexStore(self.settings.index_dir)
+        self._lock = threading.Lock()
+        self._snapshot: IndexSnapshot | None = None
+
+    def _load(self) -> IndexSnapshot:
+        stamp = self.index_store.state_stamp()
+        state = self.index_store.load_state()
+        generation = state.generation if state else 0
+        vector_store = get_vector_store(state.collection if state else None)
+        retriever = HybridRetriever(
+            chunks=self.index_store.load_chunks(generation),
+            bm25=self.index_store.load_bm25(generation),
+            vector_store=vector_store,
+        )
+        return IndexSnapshot(generation=generation, stamp=stamp, retriever=retriever)
+
+    def reload(self) -> IndexSnapshot:
+        with self._lock:
+            snapshot = self._load()
+            self._snapshot = snapshot
+        return snapshot
+
+    def loaded(self) -> IndexSnapshot | None:
+        return self._snapshot
+
+    def current(self) -> IndexSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.stamp == self.index_store.state_stamp():
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.stamp != self.index_store.state_stamp():
+                snapshot = self._load()
+                self._snapshot = snapshot
+        return snapshot
+
+    def warm_up(self) -> dict[str, float]:
+        timings: dict[str, float] = {}
+
+        def step(name: str, fn: Callable[[], object]) -> None:
+            started = time.perf_counter()
+            fn()
+            timings[name] = (time.perf_counter() - started) * 1000.0
+
+        step("models", lambda: (get_embedder(), get_reranker(), get_fast_reranker()))
+        step("index", lambda: self.reload().retriever.chunks.touch())
+        step("inference", lambda: self.current().retriever.warm_up())
+        step("llm_client", lambda: importlib.import_module("litellm"))
+        return timings
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> RetrievalEngine:
+    return RetrievalEngine()
@@ -0,0 +1,61 @@
+from fnmatch import fnmatchcase
+from pathlib import PurePosixPath
+from typing import NamedTuple
+
+import numpy as np
+
+from rag_service.chunk_store import ChunkStore
+from rag_service.config import get_settings
+from rag_service.schemas import QueryFilters
+
+
+class FilterScope(NamedTuple):
+    sources: list[str]
+    where: dict | None
+    mask: np.ndarray
+    allowed: np.ndarray
+    fraction: float
+
+
+def file_type(source: str) -> str:
+    return PurePosixPath(source).suffix.lower().lstrip(".")
+
+
+def is_active(filters: QueryFilters | None) -> bool:
+    return filters is not None and bool(filters.model_dump(exclude_defaults=True))
+
+
+def filters_key(filters: QueryFilters | None) -> str:
+    return filters.model_dump_json(exclude_defaults=True) if is_active(filters) else ""
+
+
+def source_mask(chunks: ChunkStore, filters: QueryFilters) -> np.ndarray:
+    mask = np.ones(len(chunks.sources), dtype=bool)
+    if filters.source_glob:
+        mask &= [fnmatchcase(s, filters.source_glob) for s in chunks.sources]
+    if filters.file_types:
+        wanted = {t.lower().lstrip(".") for t in filters.file_types}
+        mask &= [file_type(s) in wanted for s in chunks.sources]
+    if filters.ingested_after is not None:
+        mask &= chunks.source_ingested_at >= int(filters.ingested_after.timestamp())
+    if filters.ingested_before is not None:
+        mask &= chunks.source_ingested_at <= int(filters.ingested_before.timestamp())
+    if filters.tags:
+        wanted = set(filters.tags)
+        mask &= [not wanted.isdisjoint(tags) for tags in chunks.source_tags]
+    return mask
+
+
+def build_scope(chunks: ChunkStore, filters: QueryFilters) -> FilterScope:
+    allowed = source_mask(chunks, filters)
+    mask = chunks.rows_in(allowed)
+    sources = [chunks.sources[i] for i in np.unique(chunks.source_idx[mask]).tolist()]
+    fraction = float(mask.mean()) if len(mask) else 0.0
+    pushdown = fraction <= get_settings().filter_pushdown_max_fraction
+    return FilterScope(
+        sources=sources,
+        where={"source": {"$in": sources}} if pushdown else None,
+        mask=mask,
+        allowed=allowed,
+        fraction=fraction,
+    )
@@ -1,7 +1,12 @@
-from litellm import completion
+import logging
+from collections.abc import AsyncIterator, Iterator
 
+from rag_service.concurrency import get_limiter, run_inference
 from rag_service.config import get_settings
+from rag_service.context import pack_context, record_savings
+from rag_service.metrics import record_usage, stage, traced
 
+logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = """You are an enterprise assistant.
 Use only the provided context to answer.
@@ -9,6 +14,9 @@ If information is missing, explicitly say you do not have enough context.
 Always be concise and factual.
 """
 
+FALLBACK_PREFIX = "LLM generation is not configured"
+FALLBACK_LOG = "LLM generation failed; answering from the retrieved context"
+
 
 def build_context(chunks: list[dict]) -> str:
     blocks = []
@@ -22,9 +30,11 @@ def build_context(chunks: list[dict]) -> str:
     return "\n".join(blocks)
 
 
-def generate_answer(query: str, chunks: list[dict]) -> str:
+def completion_kwargs(query: str, chunks: list[dict]) -> dict:
     settings = get_settings()
-    context = build_context(chunks)
+    packed, retrieved_tokens, packed_tokens = pack_context(chunks)
+    record_savings(retrieved_tokens, packed_tokens)
+    context = build_context(packed)
     user_prompt = (
         "Answer the question using the context below.\n\n"
         f"Question: {query}\n\n"
@@ -32,28 +42,90 @@ def generate_answer(query: str, chunks: list[dict]) -> str:
         "Provide a direct answer and mention uncertainty if needed."
     )
 
-    try:
-        completion_kwargs = {
-            "model": settings.litellm_model,
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
-            "temperature": settings.litellm_temperature,
-            "max_tokens": settings.litellm_max_tokens,
-        }
-        if settings.litellm_api_base:
-            completion_kwargs["api_base"] = settings.litellm_api_base
+    kwargs = {
+        "model": settings.litellm_model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ],
+        "temperature": settings.litellm_temperature,
+        "max_tokens": settings.litellm_max_tokens,
+    }
+    if settings.litellm_api_base:
+        kwargs["api_base"] = settings.litellm_api_base
+    return kwargs
+
+
+def _fallback_answer(chunks: list[dict], exc: Exception) -> str:
+    preview = chunks[0]["text"][:280] if chunks else ""
+    return (
+        f"{FALLBACK_PREFIX} (missing/invalid provider API key). "
+        "Set credentials in .env (e.g., OPENAI_API_KEY) and retry. "
+        f"Retrieved context preview: {preview}\n"
+        f"Technical detail: {type(exc).__name__}"
+    )
 
+
+@traced("generate")
+def generate_answer(query: str, chunks: list[dict]) -> str:
+    from litellm import completion
+
+    try:
         response = completion(
-            **completion_kwargs,
+            **completion_kwargs(query, chunks),
         )
+        record_usage(response)
         return response.choices[0].message.content or "No answer generated."
     except Exception as exc:  # pragma: no cover
-        preview = chunks[0]["text"][:280] if chunks else ""
-        return (
-            "LLM generation is not configured (missing/invalid provider API key). "
-            "Set credentials in .env (e.g., OPENAI_API_KEY) and retry. "
-            f"Retrieved context preview: {preview}\n"
-            f"Technical detail: {type(exc).__name__}"
-        )
+        logger.warning(FALLBACK_LOG, exc_info=True)
+        return _fallback_answer(chunks, exc)
+
+
+async def acomplete_answer(query: str, chunks: list[dict]) -> str:
+    from litellm import acompletion
+
+    with stage("generate"):
+        try:
+            kwargs = await run_inference(completion_kwargs, query, chunks)
+            response = await acompletion(**kwargs)
+            record_usage(response)
+            return response.choices[0].message.content or "No answer generated."
+        except Exception as exc:  # pragma: no cover
+            logger.warning(FALLBACK_LOG, exc_info=True)
+            return _fallback_answer(chunks, exc)
+
+
+async def agenerate_answer(query: str, chunks: list[dict]) -> str:
+    async with get_limiter("generation").slot():
+        return await acomplete_answer(query, chunks)
+
+
+def stream_answer(query: str, chunks: list[dict]) -> Iterator[str]:
+    from litellm import completion
+
+    with stage("generate"):
+        try:
+            for part in completion(**completion_kwargs(query, chunks), stream=True):
+                delta = part.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as exc:  # pragma: no cover
+            logger.warning(FALLBACK_LOG, exc_info=True)
+            yield _fallback_answer(chunks, exc)
+
+
+async def astream_answer(query: str, chunks: list[dict]) -> AsyncIterator[str]:
+    from litellm import acompletion
+
+    async with get_limiter("generation").slot():
+        with stage("generate"):
+            try:
+                kwargs = await run_inference(completion_kwargs, query, chunks)
+                response = await acompletion(**kwargs, stream=True)
+                async for part in response:
+                    delta = part.choices[0].delta.content
+                    if delta:
+                        yield delta
+            except Exception as exc:  # pragma: no cover
+                logger.warning(FALLBACK_LOG, exc_info=True)
+                yield _fallback_answer(chunks, exc)
@@ -1,35 +1,176 @@
 import json
-import pickle
+import os
+import tempfile
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
-from rank_bm25 import BM25Okapi
+from rag_service.chunk_store import ChunkStore, ChunkWriter
+from rag_service.lexical import SparseBM25, tokenize
+from rag_service.schemas import ChunkRecord, IndexState, IngestCheckpoint, SourceManifest
 
-from rag_service.schemas import ChunkRecord
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:  # pragma: no cover
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
 
 
 class IndexStore:
     def __init__(self, root: Path) -> None:
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
-        self.chunks_file = self.root / "chunks.json"
-        self.bm25_file = self.root / "bm25.pkl"
+        self.legacy_chunks_file = self.root / "chunks.json"
+        self.legacy_bm25_files = [self.root / "bm25.npz", self.root / "bm25.pkl"]
+        self.state_file = self.root / "state.json"
+        self.manifest_file = self.root / "manifest.json"
+        self.checkpoint_file = self.root / "ingest.checkpoint.json"
+        self.journal_file = self.root / "ingest.journal"
+        self.lock_file = self.root / ".ingest.lock"
+
+    def chunks_file(self, generation: int) -> Path:
+        return self.root / f"chunks-{generation:06d}.bin"
+
+    def bm25_file(self, generation: int) -> Path:
+        return self.root / f"bm25-{generation:06d}.npz"
+
+    @contextmanager
+    def lock(self, waiting: Callable[[], None] | None = None, poll: float = 0.2) -> Iterator[None]:
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while not _try_lock(fd):
+                if waiting is not None:
+                    waiting()
+                time.sleep(poll)
+            try:
+                yield
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def chunk_writer(self) -> Iterator[ChunkWriter]:
+        with tempfile.TemporaryFile(dir=self.root) as spill:
+            yield ChunkWriter(spill)
+
+    def write_chunks(self, writer: ChunkWriter, generation: int) -> None:
+        path = self.chunks_file(generation)
+        tmp = path.with_name(f"{path.name}.tmp")
+        with tmp.open("wb") as f:
+            writer.write(f)
+        os.replace(tmp, path)
+
+    def save_chunks(self, chunks: Iterable[ChunkRecord], generation: int) -> None:
+        with self.chunk_writer() as writer:
+            for chunk in chunks:
+                writer.add(chunk)
+            self.write_chunks(writer, generation)
+
+    def load_chunks(self, generation: int) -> ChunkStore:
+        path = self.chunks_file(generation)
+        if not path.exists() and self.legacy_chunks_file.exists():
+            payload = json.loads(self.legacy_chunks_file.read_text(encoding="utf-8"))
+            self.save_chunks([ChunkRecord(**item) for item in payload], generation)
+        if not path.exists():
+            return ChunkStore.empty()
+        return ChunkStore.open(path)
 
-    def save_chunks(self, chunks: list[ChunkRecord]) -> None:
-        payload = [chunk.model_dump() for chunk in chunks]
-        self.chunks_file.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    def save_bm25(self, bm25: SparseBM25, generation: int) -> None:
+        _atomic_write(self.bm25_file(generation), bm25.to_bytes())
 
-    def load_chunks(self) -> list[ChunkRecord]:
-        if not self.chunks_file.exists():
+    def load_bm25(self, generation: int) -> SparseBM25 | None:
+        path = self.bm25_file(generation)
+        if path.exists():
+            return SparseBM25.load(path)
+        chunks = self.load_chunks(generation)
+        if not len(chunks):
+            return None
+        bm25 = SparseBM25.build(tokenize(chunks.text(row)) for row in range(len(chunks)))
+        self.save_bm25(bm25, generation)
+        return bm25
+
+    def prune(self, keep: set[int]) -> None:
+        names = {self.chunks_file(g).name for g in keep} | {self.bm25_file(g).name for g in keep}
+        stale = [*self.root.glob("chunks-*.bin"), *self.root.glob("bm25-*.npz")]
+        stale += [self.legacy_chunks_file, *self.legacy_bm25_files]
+        for path in stale:
+            if path.name in names:
+                continue
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def save_manifest(self, manifest: SourceManifest) -> None:
+        _atomic_write(self.manifest_file, manifest.model_dump_json().encode("utf-8"))
+
+    def load_manifest(self) -> SourceManifest | None:
+        if not self.manifest_file.exists():
+            return None
+        return SourceManifest.model_validate_json(self.manifest_file.read_text(encoding="utf-8"))
+
+    def save_checkpoint(self, checkpoint: IngestCheckpoint) -> None:
+        _atomic_write(self.checkpoint_file, checkpoint.model_dump_json().encode("utf-8"))
+
+    def load_checkpoint(self) -> IngestCheckpoint | None:
+        if not self.checkpoint_file.exists():
+            return None
+        return IngestCheckpoint.model_validate_json(
+            self.checkpoint_file.read_text(encoding="utf-8")
+        )
+
+    def clear_checkpoint(self) -> None:
+        self.checkpoint_file.unlink(missing_ok=True)
+        self.journal_file.unlink(missing_ok=True)
+
+    def journal(self, chunk_ids: list[str]) -> None:
+        if not chunk_ids:
+            return
+        with self.journal_file.open("a", encoding="utf-8") as f:
+            f.write("".join(f"{cid}\n" for cid in chunk_ids))
+
+    def load_journal(self) -> list[str]:
+        if not self.journal_file.exists():
             return []
-        payload = json.loads(self.chunks_file.read_text(encoding="utf-8"))
-        return [ChunkRecord(**item) for item in payload]
+        return self.journal_file.read_text(encoding="utf-8").splitlines()
 
-    def save_bm25(self, bm25: BM25Okapi) -> None:
-        with self.bm25_file.open("wb") as f:
-            pickle.dump(bm25, f)
+    def save_state(self, state: IndexState) -> None:
+        _atomic_write(self.state_file, state.model_dump_json().encode("utf-8"))
 
-    def load_bm25(self) -> BM25Okapi | None:
-        if not self.bm25_file.exists():
+    def load_state(self) -> IndexState | None:
+        if not self.state_file.exists():
             return None
-        with self.bm25_file.open("rb") as f:
-            return pickle.load(f)
+        return IndexState.model_validate_json(self.state_file.read_text(encoding="utf-8"))
+
+    def state_stamp(self) -> int:
+        try:
+            return self.state_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
@@ -1,48 +1,294 @@
+import time
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
 from pathlib import Path
 
-from rank_bm25 import BM25Okapi
+import numpy as np
 
-from rag_service.chunking import chunk_document
+from rag_service.chunk_store import ChunkStore, ChunkWriter
+from rag_service.chunking import chunk_document, chunking_strategy, get_splitter
 from rag_service.config import get_settings
+from rag_service.dedup import Deduplicator
+from rag_service.embedding import EmbeddingPipeline, ProcessEncoder, local_encoder
 from rag_service.index_store import IndexStore
-from rag_service.loaders import collect_documents
+from rag_service.lexical import BM25Builder, tokenize
+from rag_service.loaders import iter_source_files, stream_documents
+from rag_service.metrics import CHUNKS, DOCUMENTS, observe, stage
 from rag_service.models import get_embedder
-from rag_service.schemas import ChunkRecord
-from rag_service.vector_store import VectorStore
+from rag_service.schemas import (
+    ChunkRecord,
+    IndexState,
+    IngestCheckpoint,
+    IngestProgress,
+    SourceFile,
+    SourceManifest,
+)
+from rag_service.vector_store import generation_collection, get_vector_store
 
 
 class IngestionService:
     def __init__(self) -> None:
         self.settings = get_settings()
         self.index_store = IndexStore(self.settings.index_dir)
-        self.embedder = get_embedder()
-        self.vector_store = VectorStore()
-
-    def ingest(self, source_dir: Path, glob_pattern: str = "**/*") -> tuple[int, int]:
-        docs = collect_documents(source_dir=source_dir, glob_pattern=glob_pattern)
-
-        all_chunks: list[ChunkRecord] = []
-        for path, text in docs:
-            all_chunks.extend(
-                chunk_document(
-                    path=path,
-                    text=text,
-                    size=self.settings.chunk_size,
-                    overlap=self.settings.chunk_overlap,
-                )
+
+    @property
+    def embedder(self):
+        return get_embedder()
+
+    def _reusable_manifest(self, existing: ChunkStore) -> dict[str, SourceFile]:
+        manifest = self.index_store.load_manifest()
+        if manifest is None:
+            return {}
+        if manifest.chunking != chunking_strategy():
+            return {}
+        return {f.path: f for f in manifest.files if all(cid in existing for cid in f.chunk_ids)}
+
+    def _scan(
+        self,
+        source_dir: Path,
+        glob_pattern: str,
+        known: dict[str, SourceFile],
+        tags: list[str],
+        dedup: Deduplicator | None,
+        chunking: Callable[[], None],
+    ) -> Iterator[tuple[SourceFile, list[ChunkRecord] | None]]:
+        ingested_at = int(time.time())
+        split = get_splitter()
+        files = (
+            (path, known.get(path.as_posix()))
+            for path in iter_source_files(source_dir, glob_pattern)
+        )
+        for doc in stream_documents(
+            files,
+            workers=self.settings.loader_workers,
+            queue_size=self.settings.loader_queue_size,
+        ):
+            source = doc.path.as_posix()
+            chunks = None
+            if doc.text is None:
+                chunk_ids = known[source].chunk_ids
+            else:
+                observe("load", doc.elapsed)
+                DOCUMENTS.inc()
+                chunking()
+                with stage("chunk"):
+                    chunks = chunk_document(
+                        path=doc.path,
+                        text=doc.text,
+                        split=split,
+                        ingested_at=ingested_at,
+                        tags=tags,
+                    )
+                CHUNKS.inc(len(chunks))
+                if dedup is not None:
+                    chunks = [dedup.resolve(c) for c in chunks]
+                chunk_ids = [c.chunk_id for c in chunks]
+            yield (
+                SourceFile(
+                    path=source,
+                    mtime_ns=doc.mtime_ns,
+                    size=doc.size,
+                    sha256=doc.sha256,
+                    chunk_ids=chunk_ids,
+                ),
+                chunks,
+            )
+
+    def _checkpoint(
+        self,
+        source_dir: Path,
+        glob_pattern: str,
+        incremental: bool,
+        resume: bool,
+        previous: IndexState | None,
+    ) -> tuple[IngestCheckpoint, bool]:
+        base_generation = previous.generation if previous else 0
+        collection = generation_collection(self.settings.chroma_collection, base_generation + 1)
+        fresh = IngestCheckpoint(
+            base_generation=base_generation,
+            generation=base_generation + 1,
+            collection=previous.collection if incremental else collection,
+            source_dir=source_dir.as_posix(),
+            glob=glob_pattern,
+            incremental=incremental,
+            chunking=chunking_strategy(),
+        )
+        saved = self.index_store.load_checkpoint()
+        if saved is None:
+            return fresh, False
+        if resume and saved.model_dump(exclude={"embedded"}) == fresh.model_dump(
+            exclude={"embedded"}
+        ):
+            return saved, True
+        self._settle(saved, previous)
+        return fresh, False
+
+    def _settle(self, checkpoint: IngestCheckpoint, state: IndexState | None) -> None:
+        served = self.index_store.load_chunks(state.generation) if state else ChunkStore.empty()
+        committed = state is not None and state.generation == checkpoint.generation
+        candidates = [np.array(self.index_store.load_journal(), dtype="S")]
+        if committed and checkpoint.incremental:
+            candidates.append(self.index_store.load_chunks(checkpoint.base_generation).ids)
+        ids = np.concatenate(candidates)
+        stale = np.unique(ids[~np.isin(ids, served.ids)])
+        vector_store = get_vector_store(checkpoint.collection)
+        if state is not None and checkpoint.collection == state.collection:
+            vector_store.delete([cid.decode("ascii") for cid in stale.tolist()])
+            vector_store.commit()
+        else:
+            vector_store.drop()
+        self.index_store.clear_checkpoint()
+
+    def ingest(
+        self,
+        source_dir: Path,
+        glob_pattern: str = "**/*",
+        incremental: bool = False,
+        resume: bool = True,
+        progress: Callable[[IngestProgress], None] | None = None,
+        workers: int | None = None,
+        tags: list[str] | None = None,
+    ) -> tuple[int, int]:
+        workers = workers or self.settings.ingest_workers
+        tags = sorted(set(tags or []))
+        report = progress or (lambda _: None)
+        with ExitStack() as stack:
+            stack.enter_context(
+                self.index_store.lock(lambda: report(IngestProgress(phase="waiting")))
+            )
+            encoder = None
+            if workers > 1:
+                encoder = ProcessEncoder(workers)
+                stack.callback(encoder.close)
+            writer = stack.enter_context(self.index_store.chunk_writer())
+            return self._ingest(
+                source_dir, glob_pattern, incremental, resume, progress, encoder, tags, writer
+            )
+
+    def _ingest(
+        self,
+        source_dir: Path,
+        glob_pattern: str,
+        incremental: bool,
+        resume: bool,
+        progress: Callable[[IngestProgress], None] | None,
+        encoder: ProcessEncoder | None,
+        tags: list[str],
+        writer: ChunkWriter,
+    ) -> tuple[int, int]:
+        report = progress or (lambda _: None)
+        previous = self.index_store.load_state()
+        incremental = incremental and previous is not None
+        existing = (
+            self.index_store.load_chunks(previous.generation) if incremental else ChunkStore.empty()
+        )
+        known = self._reusable_manifest(existing) if incremental else {}
+
+        checkpoint, resumed = self._checkpoint(
+            source_dir, glob_pattern, incremental, resume, previous
+        )
+        generation, collection = checkpoint.generation, checkpoint.collection
+        vector_store = get_vector_store(collection)
+        if not resumed and not incremental:
+            vector_store.reset()
+        self.index_store.save_checkpoint(checkpoint)
+
+        files: list[SourceFile] = []
+        bm25 = BM25Builder()
+        carried: list[tuple[int, int]] = []
+        queued: set[str] = set()
+        dedup = None
+        if self.settings.dedup_enabled:
+            dedup = Deduplicator(
+                self.settings.dedup_near_distance, self.settings.dedup_shingle_size, existing
+            )
+
+        def status(phase: str) -> IngestProgress:
+            return IngestProgress(
+                phase=phase,
+                documents=len(files),
+                chunks=writer.occurrences,
+                queued=pipeline.queued,
+                embedded=pipeline.embedded,
+                skipped=pipeline.skipped,
+                duplicates=dedup.duplicates if dedup else 0,
             )
 
-        if not all_chunks:
-            self.index_store.save_chunks([])
-            return len(docs), 0
+        def committed(pipeline: EmbeddingPipeline) -> None:
+            checkpoint.embedded = pipeline.embedded
+            self.index_store.save_checkpoint(checkpoint)
+            report(status("embedding"))
 
-        texts = [c.text for c in all_chunks]
-        vectors = self.embedder.encode(texts, normalize_embeddings=True).tolist()
-        self.vector_store.replace_all(chunks=all_chunks, vectors=vectors)
+        batch_size = self.settings.embed_batch_size
+        window = self.settings.embed_window
+        if encoder is not None:
+            window = max(window, batch_size * encoder.workers * 2)
+        pipeline = EmbeddingPipeline(
+            encode=encoder or local_encoder(self.embedder),
+            vector_store=vector_store,
+            batch_size=batch_size,
+            window=window,
+            skip_existing=resumed,
+            on_commit=committed,
+        )
 
-        tokenized = [t.split() for t in texts]
-        bm25 = BM25Okapi(tokenized)
+        def fresh(chunks: list[ChunkRecord]) -> list[ChunkRecord]:
+            todo = []
+            for chunk in chunks:
+                if chunk.chunk_id in queued:
+                    continue
+                queued.add(chunk.chunk_id)
+                row = existing.row_of(chunk.chunk_id)
+                if row is None or int(existing.digests[row]) not in (0, chunk.digest):
+                    todo.append(chunk)
+            self.index_store.journal([c.chunk_id for c in todo])
+            return todo
 
-        self.index_store.save_chunks(all_chunks)
-        self.index_store.save_bm25(bm25)
-        return len(docs), len(all_chunks)
+        scan = self._scan(
+            source_dir, glob_pattern, known, tags, dedup, lambda: report(status("chunking"))
+        )
+        for entry, chunks in scan:
+            files.append(entry)
+            if chunks is None:
+                for row, doc in writer.carry(existing, entry.path, entry.chunk_ids):
+                    bm25.reserve()
+                    carried.append((row, doc))
+                chunks = []
+            for chunk in chunks:
+                if writer.add(chunk):
+                    bm25.add(tokenize(chunk.text))
+            pipeline.add(fresh(chunks))
+            report(status("loading"))
+        pipeline.flush()
+
+        report(status("indexing"))
+        if carried:
+            rows, docs = np.array(carried, dtype=np.int64).T
+            if not bm25.carry(self.index_store.bm25_file(previous.generation), rows, docs):
+                for row, doc in carried:
+                    bm25.add(tokenize(existing.text(row)), doc)
+
+        vector_store.commit()
+        self.index_store.write_chunks(writer, generation)
+        if len(bm25):
+            self.index_store.save_bm25(bm25.build(), generation)
+        self.index_store.save_manifest(SourceManifest(chunking=chunking_strategy(), files=files))
+
+        state = IndexState(generation=generation, collection=collection)
+        self.index_store.save_state(state)
+        self._settle(checkpoint, state)
+        keep = {collection, previous.collection} if previous else {collection}
+        vector_store.prune_generations(keep=keep)
+        self.index_store.prune(keep={generation, previous.generation} if previous else {generation})
+        documents = sum(1 for f in files if f.chunk_ids)
+        report(
+            IngestProgress(
+                phase="done",
+                documents=documents,
+                chunks=len(writer),
+                embedded=pipeline.embedded,
+                skipped=pipeline.skipped,
+                duplicates=dedup.duplicates if dedup else 0,
+            )
+        )
+        return documents, len(writer)
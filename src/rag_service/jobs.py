@@ -0,0 +1,142 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import UTC, datetime
+from functools import lru_cache
+from pathlib import Path
+
+from rag_service.config import get_settings
+from rag_service.loaders import iter_source_files
+from rag_service.schemas import IngestJob, IngestProgress, IngestRequest, IngestResponse
+
+FINISHED = {"succeeded", "failed", "cancelled"}
+
+logger = logging.getLogger(__name__)
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+class JobManager:
+    def __init__(self, history: int) -> None:
+        self.history = max(history, 1)
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, request: IngestRequest) -> IngestJob:
+        job = IngestJob(id=uuid.uuid4().hex, request=request, created_at=datetime.now(UTC))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+            snapshot = job.model_copy(deep=True)
+        self._queue.put(job.id)
+        return snapshot
+
+    def get(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def list(self) -> list[IngestJob]:
+        with self._lock:
+            return [job.model_copy(deep=True) for job in reversed(self._jobs.values())]
+
+    def cancel(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == "queued":
+                job.status, job.finished_at = "cancelled", datetime.now(UTC)
+            elif job.status == "running":
+                job.cancel_requested = True
+            return job.model_copy(deep=True)
+
+    def _trim(self) -> None:
+        finished = [jid for jid, job in self._jobs.items() if job.status in FINISHED]
+        for jid in finished[: max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[jid]
+
+    def _run(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != "queued":
+                    continue
+                job.status, job.started_at = "running", datetime.now(UTC)
+            try:
+                result = self._ingest(job)
+            except IngestCancelled:
+                self._finish(job, "cancelled")
+            except Exception as exc:  # pragma: no cover
+                logger.exception("Ingest job %s failed", job.id)
+                self._finish(job, "failed", error=f"{type(exc).__name__}: {exc}")
+            else:
+                self._finish(job, "succeeded", result=result)
+
+    def _finish(
+        self,
+        job: IngestJob,
+        status: str,
+        result: IngestResponse | None = None,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            job.status, job.result, job.error = status, result, error
+            job.finished_at = datetime.now(UTC)
+            if status == "succeeded":
+                job.eta_seconds = 0.0
+
+    def _ingest(self, job: IngestJob) -> IngestResponse:
+        from rag_service.engine import get_engine
+        from rag_service.ingest import IngestionService
+
+        request = job.request
+        source = Path(request.source_dir)
+        total = sum(1 for _ in iter_source_files(source, request.glob))
+        started = time.monotonic()
+        with self._lock:
+            job.total_documents = total
+
+        def progress(p: IngestProgress) -> None:
+            with self._lock:
+                if job.cancel_requested and p.phase != "done":
+                    raise IngestCancelled
+                elapsed = max(time.monotonic() - started, 1e-9)
+                job.progress = p
+                job.documents_per_second = p.documents / elapsed
+                job.chunks_per_second = p.chunks / elapsed
+                job.embedded_per_second = p.embedded / elapsed
+                remaining = total - p.documents
+                if p.phase == "done":
+                    job.eta_seconds = 0.0
+                elif remaining <= 0 and p.embedded:
+                    pending = max(p.queued - p.embedded - p.skipped, 0)
+                    job.eta_seconds = pending / job.embedded_per_second
+                elif remaining > 0 and p.documents:
+                    job.eta_seconds = remaining / job.documents_per_second
+                else:
+                    job.eta_seconds = None
+
+        documents, chunks = IngestionService().ingest(
+            source_dir=source,
+            glob_pattern=request.glob,
+            incremental=request.incremental,
+            progress=progress,
+            tags=request.tags,
+        )
+        get_engine().reload()
+        return IngestResponse(documents=documents, chunks=chunks, message="Ingestion completed")
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    return JobManager(get_settings().ingest_job_history)
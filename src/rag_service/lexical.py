@@ -0,0 +1,223 @@
+import io
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+
+
+def tokenize(text: str) -> list[str]:
+    return text.split()
+
+
+class BM25Builder:
+    def __init__(self) -> None:
+        self.vocab: dict[str, int] = {}
+        self.terms = array("i")
+        self.docs = array("i")
+        self.freqs = array("f")
+        self.doc_len = array("f")
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def reserve(self) -> int:
+        self.doc_len.append(0)
+        return len(self.doc_len) - 1
+
+    def add(self, tokens: list[str], doc: int | None = None) -> None:
+        doc_idx = self.reserve() if doc is None else doc
+        self.doc_len[doc_idx] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            self.terms.append(self.vocab.setdefault(term, len(self.vocab)))
+            self.docs.append(doc_idx)
+            self.freqs.append(tf)
+
+    def carry(self, path: Path, rows: np.ndarray, docs: np.ndarray) -> bool:
+        if not path.exists():
+            return False
+        with np.load(path) as data:
+            if "tf" not in data:
+                return False
+            vocab_blob = data["vocab_blob"].tobytes()
+            vocab_offsets = data["vocab_offsets"]
+            indptr, old_docs = data["indptr"], data["doc_ids"]
+            tf, doc_len = data["tf"], data["doc_len"]
+        remap = np.full(len(doc_len), -1, dtype=np.int64)
+        remap[rows] = docs
+        old_terms = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        new_docs = remap[old_docs]
+        keep = new_docs >= 0
+        used = np.unique(old_terms[keep])
+        term_map = np.full(len(indptr) - 1, -1, dtype=np.int32)
+        for term in used.tolist():
+            text = vocab_blob[vocab_offsets[term] : vocab_offsets[term + 1]].decode("utf-8")
+            term_map[term] = self.vocab.setdefault(text, len(self.vocab))
+        self.terms.frombytes(term_map[old_terms[keep]].tobytes())
+        self.docs.frombytes(new_docs[keep].astype(np.int32).tobytes())
+        self.freqs.frombytes(tf[keep].astype(np.float32).tobytes())
+        lengths = np.frombuffer(self.doc_len, dtype=np.float32)
+        lengths[docs] = doc_len[rows]
+        del lengths
+        return True
+
+    def build(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> "SparseBM25":
+        vocab = self.vocab
+        doc_len = np.frombuffer(self.doc_len, dtype=np.float32)
+        term_arr = np.frombuffer(self.terms, dtype=np.int32)
+        order = np.argsort(term_arr, kind="stable")
+        doc_ids = np.frombuffer(self.docs, dtype=np.int32)[order]
+        tf = np.frombuffer(self.freqs, dtype=np.float32)[order]
+
+        n_docs = len(doc_len)
+        df = np.bincount(term_arr, minlength=len(vocab))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.sum() / len(idf)
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        norm = k1 * (1 - b + b * doc_len[doc_ids] / max(avgdl, 1e-9))
+        term_idf = np.repeat(idf, df)
+        weights = (term_idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+        return SparseBM25(
+            vocab=vocab,
+            indptr=indptr,
+            doc_ids=doc_ids,
+            weights=weights,
+            n_docs=n_docs,
+            tf=tf,
+            doc_len=doc_len,
+        )
+
+
+class SparseBM25:
+    def __init__(
+        self,
+        vocab: dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        n_docs: int,
+        tf: np.ndarray | None = None,
+        doc_len: np.ndarray | None = None,
+    ) -> None:
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+        self.tf = tf
+        self.doc_len = doc_len
+
+    @classmethod
+    def build(
+        cls,
+        corpus: Iterable[list[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "SparseBM25":
+        builder = BM25Builder()
+        for tokens in corpus:
+            builder.add(tokens)
+        return builder.build(k1, b, epsilon)
+
+    def _postings(self, tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        term_ids = [self.vocab[t] for t in tokens if t in self.vocab]
+        if not term_ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        spans = [(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[lo:hi] for lo, hi in spans])
+        weights = np.concatenate([self.weights[lo:hi] for lo, hi in spans])
+        return docs, weights
+
+    def top_k(
+        self, tokens: list[str], k: int, mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        docs, weights = self._postings(tokens)
+        if mask is not None and len(docs):
+            keep = mask[docs]
+            docs, weights = docs[keep], weights[keep]
+        if not len(docs) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top].astype(np.int64), scores[top]
+
+    def top_k_many(
+        self, queries: list[list[str]], k: int, mask: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        postings = [self._postings(tokens) for tokens in queries]
+        owners = np.repeat(np.arange(len(queries), dtype=np.int64), [len(d) for d, _ in postings])
+        if not len(owners) or k <= 0:
+            return [empty for _ in queries]
+        docs = np.concatenate([d for d, _ in postings]).astype(np.int64)
+        weights = np.concatenate([w for _, w in postings])
+        if mask is not None:
+            keep = mask[docs]
+            owners, docs, weights = owners[keep], docs[keep], weights[keep]
+
+        keys, inverse = np.unique(owners * self.n_docs + docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        bounds = np.searchsorted(keys // self.n_docs, np.arange(len(queries) + 1))
+        results = []
+        for lo, hi in pairwise(bounds):
+            if lo == hi:
+                results.append(empty)
+                continue
+            span = scores[lo:hi]
+            if len(span) > k:
+                top = np.argpartition(-span, k - 1)[:k]
+            else:
+                top = np.arange(len(span))
+            top = top[np.argsort(-span[top], kind="stable")]
+            results.append((keys[lo:hi][top] % self.n_docs, span[top]))
+        return results
+
+    def to_bytes(self) -> bytes:
+        terms = sorted(self.vocab, key=self.vocab.__getitem__)
+        encoded = [t.encode("utf-8") for t in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in encoded], out=offsets[1:])
+        postings = {}
+        if self.tf is not None and self.doc_len is not None:
+            postings = {"tf": self.tf, "doc_len": self.doc_len}
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            vocab_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            vocab_offsets=offsets,
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            n_docs=np.array(self.n_docs, dtype=np.int64),
+            **postings,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, path: Path) -> "SparseBM25":
+        with np.load(path) as data:
+            blob = data["vocab_blob"].tobytes()
+            offsets = data["vocab_offsets"]
+            vocab = {
+                blob[offsets[i] : offsets[i + 1]].decode("utf-8"): i
+                for i in range(len(offsets) - 1)
+            }
+            return cls(
+                vocab=vocab,
+                indptr=data["indptr"],
+                doc_ids=data["doc_ids"],
+                weights=data["weights"],
+                n_docs=int(data["n_docs"]),
+            )
@@ -1,10 +1,27 @@
+import hashlib
 import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 
-from pypdf import PdfReader
-
+from rag_service.schemas import SourceFile
 
 SUPPORTED_EXTENSIONS = {".txt", ".md", ".json", ".pdf"}
+PROCESS_EXTENSIONS = {".pdf"}
+
+
+class LoadedFile(NamedTuple):
+    path: Path
+    mtime_ns: int
+    size: int
+    sha256: str
+    text: str | None
+    elapsed: float = 0.0
 
 
 def load_text_from_file(path: Path) -> str:
@@ -20,19 +37,66 @@ def load_text_from_file(path: Path) -> str:
         return json.dumps(raw, ensure_ascii=False, indent=2)
 
     if ext == ".pdf":
+        from pypdf import PdfReader
+
         reader = PdfReader(str(path))
         pages = [page.extract_text() or "" for page in reader.pages]
-        return "\n".join(pages)
+        return "\f".join(pages)
 
     return ""
 
 
-def collect_documents(source_dir: Path, glob_pattern: str = "**/*") -> list[tuple[Path, str]]:
-    docs: list[tuple[Path, str]] = []
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def iter_source_files(source_dir: Path, glob_pattern: str = "**/*") -> Iterator[Path]:
     for path in source_dir.glob(glob_pattern):
-        if not path.is_file() or path.suffix.lower() not in SUPPORTED_EXTENSIONS:
-            continue
-        text = load_text_from_file(path).strip()
-        if text:
-            docs.append((path, text))
-    return docs
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            yield path
+
+
+def _load_file(path: Path, known: SourceFile | None) -> LoadedFile:
+    started = time.perf_counter()
+    stat = path.stat()
+    if known is not None and (known.mtime_ns, known.size) == (stat.st_mtime_ns, stat.st_size):
+        return LoadedFile(path, stat.st_mtime_ns, stat.st_size, known.sha256, None)
+    digest = file_sha256(path)
+    if known is not None and known.sha256 == digest:
+        return LoadedFile(path, stat.st_mtime_ns, stat.st_size, digest, None)
+    text = load_text_from_file(path).strip()
+    elapsed = time.perf_counter() - started
+    return LoadedFile(path, stat.st_mtime_ns, stat.st_size, digest, text, elapsed)
+
+
+def stream_documents(
+    files: Iterable[tuple[Path, SourceFile | None]],
+    workers: int = 0,
+    queue_size: int = 64,
+) -> Iterator[LoadedFile]:
+    workers = workers or os.cpu_count() or 1
+    threads = ThreadPoolExecutor(max_workers=workers)
+    processes: ProcessPoolExecutor | None = None
+    pending: deque[Future[LoadedFile]] = deque()
+    try:
+        for path, known in files:
+            if path.suffix.lower() in PROCESS_EXTENSIONS:
+                if processes is None:
+                    processes = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                pending.append(processes.submit(_load_file, path, known))
+            else:
+                pending.append(threads.submit(_load_file, path, known))
+            if len(pending) >= queue_size:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
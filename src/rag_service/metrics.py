@@ -0,0 +1,157 @@
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, TypeVar
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+T = TypeVar("T")
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=BUCKETS
+)
+QUERY_SECONDS = Histogram(
+    "rag_query_seconds", "End-to-end query latency", ["endpoint"], buckets=BUCKETS
+)
+DOCUMENTS = Counter("rag_ingested_documents", "Documents loaded by ingest")
+CHUNKS = Counter("rag_ingested_chunks", "Chunks produced by ingest")
+DUPLICATES = Counter("rag_duplicate_chunks", "Chunks folded into an existing identical chunk")
+EMBEDDED = Counter("rag_embedded_chunks", "Chunks embedded and written to the vector store")
+CONTEXT_TOKENS = Counter("rag_context_tokens", "Context tokens before and after packing", ["kind"])
+TOKENS = Counter("rag_llm_tokens", "Tokens reported by the LLM provider", ["kind"])
+
+_trace: ContextVar[dict[str, float] | None] = ContextVar("rag_trace", default=None)
+_stage_children: dict[str, Any] = {}
+
+
+def observe(name: str, seconds: float) -> None:
+    child = _stage_children.get(name)
+    if child is None:
+        child = _stage_children.setdefault(name, STAGE_SECONDS.labels(name))
+    child.observe(seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace[name] = trace.get(name, 0.0) + seconds * 1000.0
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+def traced(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    trace: dict[str, float] = {}
+    token = _trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+        trace["total"] = (time.perf_counter() - started) * 1000.0
+
+
+@contextmanager
+def trace_request(endpoint: str) -> Iterator[dict[str, float]]:
+    try:
+        with collect_timings() as trace:
+            yield trace
+    finally:
+        QUERY_SECONDS.labels(endpoint).observe(trace["total"] / 1000.0)
+
+
+def record_usage(response: Any) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = getattr(usage, kind, None)
+        if count:
+            TOKENS.labels(kind.removesuffix("_tokens")).inc(count)
+
+
+class _StatsCollector:
+    def describe(self) -> list:
+        return []
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        from rag_service.cache import get_query_cache, get_rerank_cache
+        from rag_service.engine import get_engine
+        from rag_service.models import inference_stats
+
+        query = get_query_cache().stats()
+        rerank = get_rerank_cache().stats()
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        hits.add_metric(["query_exact"], query["exact_hits"])
+        hits.add_metric(["query_semantic"], query["semantic_hits"])
+        hits.add_metric(["rerank"], rerank["hits"])
+        yield hits
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        misses.add_metric(["query"], query["misses"])
+        misses.add_metric(["rerank"], rerank["misses"])
+        yield misses
+        entries = GaugeMetricFamily("rag_cache_entries", "Cached entries", labels=["cache"])
+        entries.add_metric(["query"], query["entries"])
+        entries.add_metric(["rerank"], rerank["entries"])
+        yield entries
+
+        batches = CounterMetricFamily(
+            "rag_inference_batches", "Micro-batches run", labels=["model"]
+        )
+        items = CounterMetricFamily(
+            "rag_inference_items", "Requests served by micro-batches", labels=["model"]
+        )
+        waited = CounterMetricFamily(
+            "rag_inference_queue_seconds",
+            "Time requests waited for a micro-batch",
+            labels=["model"],
+        )
+        largest = GaugeMetricFamily(
+            "rag_inference_max_batch_size", "Largest micro-batch run", labels=["model"]
+        )
+        for model, stats in inference_stats().items():
+            batches.add_metric([model], stats["batches"])
+            items.add_metric([model], stats["items"])
+            waited.add_metric([model], stats["avg_queue_ms"] * stats["items"] / 1000.0)
+            largest.add_metric([model], stats["max_batch_size"])
+        yield batches
+        yield items
+        yield waited
+        yield largest
+
+        snapshot = get_engine().loaded()
+        if snapshot is None:
+            return
+        yield GaugeMetricFamily(
+            "rag_index_generation", "Index generation being served", value=snapshot.generation
+        )
+        yield GaugeMetricFamily(
+            "rag_index_chunks", "Chunks in the served index", value=len(snapshot.retriever.chunks)
+        )
+
+
+REGISTRY.register(_StatsCollector())
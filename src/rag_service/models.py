@@ -1,17 +1,143 @@
+from __future__ import annotations
+
 from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-from sentence_transformers import CrossEncoder, SentenceTransformer
+import numpy as np
 
+from rag_service.batching import MicroBatcher
 from rag_service.config import get_settings
 
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+    from transformers import PreTrainedTokenizerBase
+
+OPENVINO_FILES = {
+    "openvino": "openvino/openvino_model.xml",
+    "openvino-int8": "openvino/openvino_model_qint8_quantized.xml",
+}
+
+
+class BatchedEmbedder:
+    def __init__(self, model: SentenceTransformer, max_batch: int, max_wait_ms: float) -> None:
+        self.model = model
+        self.batcher: MicroBatcher[str, np.ndarray] = MicroBatcher(
+            self._encode_batch, max_batch=max_batch, max_wait_ms=max_wait_ms
+        )
+
+    def _encode_batch(self, texts: list[str]) -> list[np.ndarray]:
+        return list(self.model.encode(texts, normalize_embeddings=True))
+
+    def encode(self, sentences: str | list[str], **kwargs: Any) -> np.ndarray:
+        if isinstance(sentences, str) and kwargs.get("normalize_embeddings") is True:
+            return self.batcher.submit(sentences).result()
+        return self.model.encode(sentences, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class BatchedReranker:
+    def __init__(self, model: CrossEncoder, max_batch: int, max_wait_ms: float) -> None:
+        self.model = model
+        self.batcher: MicroBatcher[list[list[str]], np.ndarray] = MicroBatcher(
+            self._predict_batch, max_batch=max_batch, max_wait_ms=max_wait_ms, size=len
+        )
+
+    def _predict_batch(self, requests: list[list[list[str]]]) -> list[np.ndarray]:
+        flat = [pair for pairs in requests for pair in pairs]
+        scores = np.asarray(self.model.predict(flat))
+        bounds = np.cumsum([len(pairs) for pairs in requests])[:-1]
+        return np.split(scores, bounds)
+
+    def predict(self, pairs: list[list[str]], **kwargs: Any) -> np.ndarray:
+        if kwargs or not pairs:
+            return self.model.predict(pairs, **kwargs)
+        return self.batcher.submit(pairs).result()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+def _backend_kwargs(backend: str) -> dict:
+    if backend == "torch":
+        return {}
+    if backend not in OPENVINO_FILES:
+        raise ValueError(f"Unsupported inference backend: {backend}")
+    return {"backend": "openvino", "model_kwargs": {"file_name": OPENVINO_FILES[backend]}}
+
+
+def load_embedder(backend: str) -> SentenceTransformer:
+    from sentence_transformers import SentenceTransformer
+
+    settings = get_settings()
+    return SentenceTransformer(settings.embedding_model, **_backend_kwargs(backend))
+
+
+def load_reranker(backend: str, model_name: str | None = None) -> CrossEncoder:
+    from sentence_transformers import CrossEncoder
+
+    settings = get_settings()
+    return CrossEncoder(model_name or settings.reranker_model, **_backend_kwargs(backend))
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> SentenceTransformer | BatchedEmbedder:
+    settings = get_settings()
+    model = load_embedder(settings.embedding_backend)
+    if settings.inference_batch_wait_ms <= 0:
+        return model
+    return BatchedEmbedder(
+        model,
+        max_batch=settings.inference_max_batch,
+        max_wait_ms=settings.inference_batch_wait_ms,
+    )
+
 
 @lru_cache(maxsize=1)
-def get_embedder() -> SentenceTransformer:
+def get_tokenizer() -> PreTrainedTokenizerBase:
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(get_settings().embedding_model)
+
+
+def _batched_reranker(model: CrossEncoder) -> CrossEncoder | BatchedReranker:
     settings = get_settings()
-    return SentenceTransformer(settings.embedding_model)
+    if settings.inference_batch_wait_ms <= 0:
+        return model
+    return BatchedReranker(
+        model,
+        max_batch=settings.rerank_max_batch_pairs,
+        max_wait_ms=settings.inference_batch_wait_ms,
+    )
 
 
 @lru_cache(maxsize=1)
-def get_reranker() -> CrossEncoder:
+def get_reranker() -> CrossEncoder | BatchedReranker:
     settings = get_settings()
-    return CrossEncoder(settings.reranker_model)
+    return _batched_reranker(load_reranker(settings.reranker_backend))
+
+
+@lru_cache(maxsize=1)
+def get_fast_reranker() -> CrossEncoder | BatchedReranker | None:
+    settings = get_settings()
+    if not settings.reranker_fast_model:
+        return None
+    model = load_reranker(settings.reranker_backend, settings.reranker_fast_model)
+    return _batched_reranker(model)
+
+
+def inference_stats() -> dict:
+    stats: dict[str, dict] = {}
+    getters = (
+        ("embedder", get_embedder),
+        ("reranker", get_reranker),
+        ("fast_reranker", get_fast_reranker),
+    )
+    for name, getter in getters:
+        if getter.cache_info().currsize == 0:
+            continue
+        model = getter()
+        if isinstance(model, BatchedEmbedder | BatchedReranker):
+            stats[name] = model.batcher.stats()
+    return stats
@@ -0,0 +1,442 @@
+import json
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from rag_service.config import get_settings
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import VectorStore
+
+BLOCK_ROWS = 65536
+
+
+def train_ivf(sample: np.ndarray, n_lists: int, iterations: int = 10) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(min=1e-12)
+    return centroids
+
+
+def _encode(values: list[str]) -> np.ndarray:
+    if not values:
+        return np.empty(0, dtype="S1")
+    return np.array([v.encode("utf-8") for v in values], dtype="S")
+
+
+class _Index(NamedTuple):
+    ids: np.ndarray
+    source_idx: np.ndarray | None
+    source_names: np.ndarray | None
+    vectors: np.ndarray
+    matrix: np.ndarray
+    scales: np.ndarray | None
+    centroids: np.ndarray | None
+    offsets: np.ndarray | None
+
+    def source(self, row: int) -> str:
+        if self.source_idx is None:
+            return ""
+        return self.source_names[self.source_idx[row]].decode("utf-8")
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(
+        self,
+        collection_name: str | None = None,
+        dtype: str | None = None,
+        ivf_min_rows: int | None = None,
+    ) -> None:
+        self.settings = get_settings()
+        self.collection_name = collection_name or self.settings.chroma_collection
+        self.dtype = dtype or self.settings.vector_dtype
+        self.ivf_min_rows = (
+            self.settings.vector_ivf_min_rows if ivf_min_rows is None else ivf_min_rows
+        )
+        if self.dtype not in {"float32", "float16", "int8"}:
+            raise ValueError(f"Unsupported vector dtype: {self.dtype}")
+        self.root = self.settings.vector_path / self.collection_name
+        self._index: _Index | None = None
+        self._loaded = False
+
+    def _file(self, name: str) -> Path:
+        return self.root / name
+
+    def _version_file(self, version: int, name: str) -> Path:
+        return self.root / f"v{version:06d}.{name}.npy"
+
+    def _current(self) -> dict | None:
+        path = self._file("current.json")
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _load(self) -> _Index | None:
+        current = self._current()
+        if current is None or not current["count"]:
+            return None
+        version = current["version"]
+
+        def load(name: str) -> np.ndarray:
+            return np.load(self._version_file(version, name), mmap_mode="r")
+
+        vectors = load("vectors")
+        quantized = current["dtype"] != "float32"
+        has_sources = self._version_file(version, "source_idx").exists()
+        return _Index(
+            ids=load("ids"),
+            source_idx=load("source_idx") if has_sources else None,
+            source_names=load("source_names") if has_sources else None,
+            vectors=vectors,
+            matrix=load("q") if quantized else vectors,
+            scales=load("scales") if current["dtype"] == "int8" else None,
+            centroids=load("centroids") if current["ivf"] else None,
+            offsets=load("offsets") if current["ivf"] else None,
+        )
+
+    def _open(self) -> _Index | None:
+        if not self._loaded:
+            self._index = self._load()
+            self._loaded = True
+        return self._index
+
+    def _staged(self) -> tuple[list[str], list[str], np.ndarray | None]:
+        ids_file, vectors_file = self._file("staging.ids"), self._file("staging.f32")
+        sources_file = self._file("staging.sources")
+        if not ids_file.exists() or not vectors_file.exists() or not sources_file.exists():
+            return [], [], None
+        dim = json.loads(self._file("staging.json").read_text(encoding="utf-8"))["dim"]
+        ids = ids_file.read_text(encoding="utf-8").splitlines()
+        sources = sources_file.read_text(encoding="utf-8").splitlines()
+        rows = min(len(ids), len(sources), vectors_file.stat().st_size // (4 * dim))
+        if not rows:
+            return [], [], None
+        vectors = np.memmap(vectors_file, dtype=np.float32, mode="r", shape=(rows, dim))
+        return ids[:rows], sources[:rows], vectors
+
+    def _deleted(self) -> set[str]:
+        path = self._file("deleted.ids")
+        if not path.exists():
+            return set()
+        return set(path.read_text(encoding="utf-8").splitlines())
+
+    def reset(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index = None
+        self._loaded = False
+
+    def upsert(self, chunks: list[ChunkRecord], vectors: np.ndarray | list[list[float]]) -> None:
+        if not chunks:
+            return
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta = self._file("staging.json")
+        if not meta.exists():
+            meta.write_text(json.dumps({"dim": int(matrix.shape[1])}), encoding="utf-8")
+        with self._file("staging.f32").open("ab") as f:
+            f.write(matrix.tobytes())
+        with self._file("staging.sources").open("a", encoding="utf-8") as f:
+            f.write("".join(f"{c.source}\n" for c in chunks))
+        with self._file("staging.ids").open("a", encoding="utf-8") as f:
+            f.write("".join(f"{c.chunk_id}\n" for c in chunks))
+        deleted = self._deleted()
+        if deleted:
+            remaining = deleted - {c.chunk_id for c in chunks}
+            if len(remaining) < len(deleted):
+                self._file("deleted.ids").write_text(
+                    "".join(f"{cid}\n" for cid in sorted(remaining)), encoding="utf-8"
+                )
+
+    def existing_ids(self, chunk_ids: list[str]) -> set[str]:
+        if not chunk_ids:
+            return set()
+        staged, _, _ = self._staged()
+        found = set(chunk_ids) & set(staged)
+        current = self._load()
+        if current is not None:
+            query = np.array([cid.encode("utf-8") for cid in chunk_ids])
+            mask = np.isin(query, current.ids)
+            found |= {cid for cid, hit in zip(chunk_ids, mask, strict=True) if hit}
+        return found
+
+    def delete(self, chunk_ids: list[str]) -> None:
+        if not chunk_ids:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._file("deleted.ids").open("a", encoding="utf-8") as f:
+            f.write("".join(f"{cid}\n" for cid in chunk_ids))
+
+    def commit(self) -> None:
+        current = self._current()
+        base = self._load()
+        staged_ids, staged_sources, staged = self._staged()
+        deleted = self._deleted()
+        if current is not None and not staged_ids and not deleted:
+            return
+
+        base_ids = base.ids if base is not None else np.empty(0, dtype="S1")
+        combined = np.concatenate([base_ids, _encode(staged_ids)])
+        if base is not None and base.source_idx is not None:
+            base_sources = base.source_names[base.source_idx]
+        else:
+            base_sources = np.full(len(base_ids), b"", dtype="S1")
+        combined_sources = np.concatenate([base_sources, _encode(staged_sources)])
+        reversed_first = np.unique(combined[::-1], return_index=True)[1]
+        keep = np.sort(len(combined) - 1 - reversed_first)
+        if deleted:
+            gone = _encode(sorted(deleted))
+            keep = keep[~np.isin(combined[keep], gone)]
+
+        n_base = len(base_ids)
+        if base is not None:
+            dim = base.vectors.shape[1]
+        elif staged is not None:
+            dim = staged.shape[1]
+        else:
+            dim = 0
+
+        def gather(rows: np.ndarray) -> np.ndarray:
+            out = np.empty((len(rows), dim), dtype=np.float32)
+            from_base = rows < n_base
+            if from_base.any():
+                out[from_base] = base.vectors[rows[from_base]]
+            if (~from_base).any():
+                out[~from_base] = staged[rows[~from_base] - n_base]
+            return out
+
+        version = (current["version"] if current else 0) + 1
+        n = len(keep)
+        ivf = n >= max(self.ivf_min_rows, 1)
+        if ivf:
+            n_lists = min(self.settings.vector_ivf_lists or int(np.sqrt(n)), n)
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(
+                rng.choice(keep, size=min(n, max(n_lists * 64, 10000)), replace=False)
+            )
+            centroids = train_ivf(gather(sample_rows), n_lists)
+            assign = np.empty(n, dtype=np.int32)
+            for lo in range(0, n, BLOCK_ROWS):
+                block = gather(keep[lo : lo + BLOCK_ROWS])
+                assign[lo : lo + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            keep = keep[order]
+            offsets = np.zeros(n_lists + 1, dtype=np.int64)
+            np.cumsum(np.bincount(assign, minlength=n_lists), out=offsets[1:])
+            np.save(self._version_file(version, "centroids"), centroids.astype(np.float32))
+            np.save(self._version_file(version, "offsets"), offsets)
+
+        np.save(self._version_file(version, "ids"), combined[keep])
+        source_names, source_idx = np.unique(combined_sources[keep], return_inverse=True)
+        np.save(self._version_file(version, "source_names"), source_names)
+        np.save(self._version_file(version, "source_idx"), source_idx.astype(np.int32))
+        if n:
+            vectors = open_memmap(
+                self._version_file(version, "vectors"), mode="w+", dtype=np.float32, shape=(n, dim)
+            )
+            quantized = None
+            scales = None
+            if self.dtype == "float16":
+                quantized = open_memmap(
+                    self._version_file(version, "q"), mode="w+", dtype=np.float16, shape=(n, dim)
+                )
+            elif self.dtype == "int8":
+                quantized = open_memmap(
+                    self._version_file(version, "q"), mode="w+", dtype=np.int8, shape=(n, dim)
+                )
+                scales = open_memmap(
+                    self._version_file(version, "scales"), mode="w+", dtype=np.float32, shape=(n,)
+                )
+            for lo in range(0, n, BLOCK_ROWS):
+                block = gather(keep[lo : lo + BLOCK_ROWS])
+                hi = lo + len(block)
+                vectors[lo:hi] = block
+                if self.dtype == "float16":
+                    quantized[lo:hi] = block.astype(np.float16)
+                elif self.dtype == "int8":
+                    scale = np.abs(block).max(axis=1).clip(min=1e-12) / 127.0
+                    scales[lo:hi] = scale
+                    quantized[lo:hi] = np.round(block / scale[:, None]).astype(np.int8)
+            for arr in (vectors, quantized, scales):
+                if arr is not None:
+                    arr.flush()
+            del vectors, quantized, scales
+
+        staged = None
+        payload = {"version": version, "count": n, "dim": int(dim), "dtype": self.dtype, "ivf": ivf}
+        tmp = self._file("current.json.tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self._file("current.json"))
+
+        for name in (
+            "staging.ids",
+            "staging.sources",
+            "staging.f32",
+            "staging.json",
+            "deleted.ids",
+        ):
+            self._file(name).unlink(missing_ok=True)
+        for path in self.root.glob("v*.npy"):
+            if not path.name.startswith(f"v{version:06d}."):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        self._index = None
+        self._loaded = False
+
+    def drop(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._index = None
+        self._loaded = False
+
+    def prune_generations(self, keep: set[str]) -> None:
+        base = self.settings.chroma_collection
+        for path in self.settings.vector_path.iterdir():
+            name = path.name
+            if not path.is_dir() or name in keep:
+                continue
+            if name == base or name.startswith(f"{base}-g"):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _allowed(self, index: _Index, where: dict | None) -> np.ndarray | None:
+        if not where:
+            return None
+        if set(where) != {"source"}:
+            raise ValueError("The numpy vector backend only filters on source")
+        if index.source_idx is None:
+            raise ValueError("Vector index predates source filters; run a full ingest")
+        condition = where["source"]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if set(condition) == {"$eq"}:
+            values = [condition["$eq"]]
+        elif set(condition) == {"$in"}:
+            values = condition["$in"]
+        else:
+            raise ValueError(f"Unsupported source filter: {condition}")
+        return np.isin(index.source_names, _encode(list(values)))
+
+    def _score(
+        self,
+        index: _Index,
+        lo: int,
+        hi: int,
+        query: np.ndarray,
+        allowed: np.ndarray | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        rows = np.arange(lo, hi)
+        block = index.matrix[lo:hi]
+        scales = index.scales[lo:hi] if index.scales is not None else None
+        if allowed is not None:
+            keep = allowed[index.source_idx[lo:hi]]
+            rows, block = rows[keep], block[keep]
+            scales = scales[keep] if scales is not None else None
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        scores = block @ query
+        if scales is not None:
+            scores *= scales if scores.ndim == 1 else scales[:, None]
+        return rows, scores
+
+    @staticmethod
+    def _hits(index: _Index, rows: np.ndarray, scores: np.ndarray, limit: int) -> list[dict]:
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "chunk_id": index.ids[rows[i]].decode("utf-8"),
+                "source": index.source(rows[i]),
+                "text": "",
+                "score": float(scores[i]),
+            }
+            for i in top
+        ]
+
+    def search(
+        self, query_vector: list[float], limit: int, where: dict | None = None
+    ) -> list[dict]:
+        index = self._open()
+        if index is None or limit <= 0:
+            return []
+        allowed = self._allowed(index, where)
+        if allowed is not None and not allowed.any():
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if index.centroids is not None:
+            probe = min(self.settings.vector_ivf_probe, len(index.centroids))
+            lists = np.argpartition(-(index.centroids @ query), probe - 1)[:probe]
+            ranges = [(int(index.offsets[i]), int(index.offsets[i + 1])) for i in lists]
+        else:
+            ranges = [(0, len(index.ids))]
+
+        rows: list[np.ndarray] = []
+        scores: list[np.ndarray] = []
+        for lo, hi in ranges:
+            for start in range(lo, hi, BLOCK_ROWS):
+                block_rows, block_scores = self._score(
+                    index, start, min(hi, start + BLOCK_ROWS), query, allowed
+                )
+                rows.append(block_rows)
+                scores.append(block_scores)
+        if not rows:
+            return []
+        return self._hits(index, np.concatenate(rows), np.concatenate(scores), limit)
+
+    def search_many(
+        self, query_vectors: list[list[float]], limit: int, where: dict | None = None
+    ) -> list[list[dict]]:
+        index = self._open()
+        if index is None or limit <= 0 or not query_vectors:
+            return [[] for _ in query_vectors]
+        if index.centroids is not None:
+            return [self.search(q, limit, where) for q in query_vectors]
+        allowed = self._allowed(index, where)
+        if allowed is not None and not allowed.any():
+            return [[] for _ in query_vectors]
+        queries = np.asarray(query_vectors, dtype=np.float32).T
+
+        rows: list[np.ndarray] = []
+        scores: list[np.ndarray] = []
+        for start in range(0, len(index.ids), BLOCK_ROWS):
+            block_rows, block_scores = self._score(
+                index, start, min(len(index.ids), start + BLOCK_ROWS), queries, allowed
+            )
+            if len(block_rows) > limit:
+                top = np.argpartition(-block_scores, limit - 1, axis=0)[:limit]
+                rows.append(block_rows[top])
+                scores.append(np.take_along_axis(block_scores, top, axis=0))
+            else:
+                rows.append(np.repeat(block_rows[:, None], len(query_vectors), axis=1))
+                scores.append(block_scores)
+        all_rows, all_scores = np.concatenate(rows), np.concatenate(scores)
+        return [
+            self._hits(index, all_rows[:, j], all_scores[:, j], limit)
+            for j in range(len(query_vectors))
+        ]
+
+    def export(self, batch_size: int = 4096) -> Iterator[tuple[list[str], np.ndarray]]:
+        index = self._open()
+        if index is None:
+            return
+        for lo in range(0, len(index.ids), batch_size):
+            ids = [i.decode("utf-8") for i in index.ids[lo : lo + batch_size].tolist()]
+            yield ids, np.asarray(index.vectors[lo : lo + batch_size], dtype=np.float32)
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from rag_service.config import get_settings
+from rag_service.index_store import IndexStore
+from rag_service.models import load_embedder, load_reranker
+
+
+def _recall(reference: np.ndarray, candidate: np.ndarray) -> float:
+    hits = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference, candidate, strict=True)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def _dense_top(model, texts: list[str], queries: list[str], k: int) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    docs = model.encode(texts, normalize_embeddings=True)
+    qvecs = model.encode(queries, normalize_embeddings=True)
+    elapsed = time.perf_counter() - started
+    return np.argsort(-(qvecs @ docs.T), axis=1)[:, :k], elapsed
+
+
+def _rerank_top(model, pairs: list[list[list[str]]], k: int) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    scores = [np.asarray(model.predict(p)) for p in pairs]
+    elapsed = time.perf_counter() - started
+    return np.array([np.argsort(-s)[:k] for s in scores]), elapsed
+
+
+def backend_parity(
+    embedding_backend: str,
+    reranker_backend: str,
+    queries: list[str],
+    sample_size: int = 2000,
+    k: int = 8,
+) -> dict:
+    settings = get_settings()
+    index_store = IndexStore(settings.index_dir)
+    state = index_store.load_state()
+    chunks = index_store.load_chunks(state.generation if state else 0)
+    if not len(chunks):
+        raise ValueError("Index is empty; ingest documents before running a parity check")
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(chunks), size=min(sample_size, len(chunks)), replace=False)
+    texts = [chunks.text(int(r)) for r in rows]
+    if not queries:
+        queries = [" ".join(t.split()[:12]) for t in texts[:50]]
+    k = min(k, len(texts))
+
+    report: dict[str, dict] = {"sample": {"chunks": len(texts), "queries": len(queries), "k": k}}
+
+    baseline_top, baseline_s = _dense_top(load_embedder("torch"), texts, queries, k * 3)
+    candidate_top, candidate_s = _dense_top(load_embedder(embedding_backend), texts, queries, k)
+    report["embedding"] = {
+        "backend": embedding_backend,
+        "recall_at_k": _recall(baseline_top[:, :k], candidate_top),
+        "torch_seconds": baseline_s,
+        "backend_seconds": candidate_s,
+    }
+
+    pairs = [[[q, texts[i]] for i in top] for q, top in zip(queries, baseline_top, strict=True)]
+    baseline_rr, baseline_s = _rerank_top(load_reranker("torch"), pairs, k)
+    candidate_rr, candidate_s = _rerank_top(load_reranker(reranker_backend), pairs, k)
+    report["reranker"] = {
+        "backend": reranker_backend,
+        "recall_at_k": _recall(baseline_rr, candidate_rr),
+        "torch_seconds": baseline_s,
+        "backend_seconds": candidate_s,
+    }
+    return report
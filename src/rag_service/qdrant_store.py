@@ -0,0 +1,286 @@
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from rag_service.config import get_settings
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import VectorStore
+
+RANGE_OPS = {"$gt": "gt", "$gte": "gte", "$lt": "lt", "$lte": "lte"}
+
+
+@lru_cache(maxsize=1)
+def get_qdrant_client() -> QdrantClient:
+    settings = get_settings()
+    if settings.qdrant_url == ":memory:":
+        return QdrantClient(location=":memory:")
+    return QdrantClient(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key or None,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        timeout=settings.qdrant_timeout,
+        pool_size=settings.qdrant_pool_size,
+    )
+
+
+def point_id(chunk_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, chunk_id))
+
+
+def where_to_filter(where: dict | None) -> models.Filter | None:
+    if not where:
+        return None
+    must: list = []
+    must_not: list = []
+    for key, value in where.items():
+        if key == "$and":
+            must.extend(where_to_filter(clause) for clause in value)
+            continue
+        if key == "$or":
+            must.append(models.Filter(should=[where_to_filter(clause) for clause in value]))
+            continue
+        ops = value if isinstance(value, dict) else {"$eq": value}
+        for op, operand in ops.items():
+            if op == "$eq":
+                must.append(models.FieldCondition(key=key, match=models.MatchValue(value=operand)))
+            elif op == "$ne":
+                must_not.append(
+                    models.FieldCondition(key=key, match=models.MatchValue(value=operand))
+                )
+            elif op == "$in":
+                must.append(
+                    models.FieldCondition(key=key, match=models.MatchAny(any=list(operand)))
+                )
+            elif op == "$nin":
+                match = models.MatchAny(any=list(operand))
+                must_not.append(models.FieldCondition(key=key, match=match))
+            elif op in RANGE_OPS:
+                bound = models.Range(**{RANGE_OPS[op]: operand})
+                must.append(models.FieldCondition(key=key, range=bound))
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+    return models.Filter(must=must or None, must_not=must_not or None)
+
+
+class QdrantVectorStore(VectorStore):
+    def __init__(self, collection_name: str | None = None) -> None:
+        self.settings = get_settings()
+        self.client = get_qdrant_client()
+        self.remote = self.settings.qdrant_url != ":memory:"
+        self.collection_name = collection_name or self.settings.chroma_collection
+        self._ready = False
+        self._buffer: list[models.PointStruct] = []
+        self._inflight: deque[Future] = deque()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _quantization(self) -> models.ScalarQuantization | models.BinaryQuantization | None:
+        mode = self.settings.qdrant_quantization
+        if mode == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if mode == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        if mode in {"", "none"}:
+            return None
+        raise ValueError(f"Unsupported Qdrant quantization: {mode}")
+
+    def _ensure_collection(self, dim: int) -> None:
+        if self._ready:
+            return
+        if not self.client.collection_exists(self.collection_name):
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(
+                    size=dim,
+                    distance=models.Distance.COSINE,
+                    on_disk=self.settings.qdrant_on_disk,
+                ),
+                hnsw_config=models.HnswConfigDiff(
+                    m=self.settings.qdrant_hnsw_m,
+                    ef_construct=self.settings.qdrant_hnsw_ef_construct,
+                ),
+                quantization_config=self._quantization(),
+            )
+            for field in ("source", "chunk_id") if self.remote else ():
+                self.client.create_payload_index(
+                    self.collection_name, field, field_schema=models.PayloadSchemaType.KEYWORD
+                )
+        self._ready = True
+
+    def _exists(self) -> bool:
+        if not self._ready:
+            self._ready = self.client.collection_exists(self.collection_name)
+        return self._ready
+
+    def _send(self, points: list[models.PointStruct]) -> None:
+        self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+
+    def _submit(self) -> None:
+        points, self._buffer = self._buffer, []
+        if not points:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.settings.qdrant_upsert_parallel,
+                thread_name_prefix="qdrant-upsert",
+            )
+        while len(self._inflight) >= self.settings.qdrant_upsert_parallel * 2:
+            self._inflight.popleft().result()
+        self._inflight.append(self._executor.submit(self._send, points))
+
+    def _drain(self) -> None:
+        self._submit()
+        while self._inflight:
+            self._inflight.popleft().result()
+
+    def reset(self) -> None:
+        self._buffer = []
+        self._inflight.clear()
+        self.drop()
+
+    def upsert(self, chunks: list[ChunkRecord], vectors: np.ndarray | list[list[float]]) -> None:
+        if not chunks:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self._ensure_collection(int(matrix.shape[1]))
+        for chunk, vector in zip(chunks, matrix.tolist(), strict=True):
+            self._buffer.append(
+                models.PointStruct(
+                    id=point_id(chunk.chunk_id),
+                    vector=vector,
+                    payload={
+                        "chunk_id": chunk.chunk_id,
+                        "source": chunk.source,
+                        "text": chunk.text,
+                    },
+                )
+            )
+            if len(self._buffer) >= self.settings.qdrant_upsert_batch:
+                self._submit()
+
+    def existing_ids(self, chunk_ids: list[str]) -> set[str]:
+        self._drain()
+        if not chunk_ids or not self._exists():
+            return set()
+        points = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[point_id(cid) for cid in chunk_ids],
+            with_payload=["chunk_id"],
+            with_vectors=False,
+        )
+        return {p.payload["chunk_id"] for p in points}
+
+    def delete(self, chunk_ids: list[str]) -> None:
+        self._drain()
+        if not chunk_ids or not self._exists():
+            return
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=[point_id(cid) for cid in chunk_ids]),
+            wait=True,
+        )
+
+    def flush(self) -> None:
+        self._drain()
+
+    def commit(self) -> None:
+        self._drain()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def drop(self) -> None:
+        if self.client.collection_exists(self.collection_name):
+            self.client.delete_collection(self.collection_name)
+        self._ready = False
+
+    def prune_generations(self, keep: set[str]) -> None:
+        base = self.settings.chroma_collection
+        for item in self.client.get_collections().collections:
+            name = item.name
+            if name in keep:
+                continue
+            if name == base or name.startswith(f"{base}-g"):
+                self.client.delete_collection(name)
+
+    def _search_params(self) -> models.SearchParams | None:
+        if not self.remote:
+            return None
+        params = models.SearchParams(hnsw_ef=self.settings.qdrant_hnsw_ef)
+        if self.settings.qdrant_quantization not in {"", "none"}:
+            params.quantization = models.QuantizationSearchParams(
+                rescore=True, oversampling=self.settings.qdrant_oversampling
+            )
+        return params
+
+    @staticmethod
+    def _hits(points: list[models.ScoredPoint]) -> list[dict]:
+        return [
+            {
+                "chunk_id": (p.payload or {}).get("chunk_id", ""),
+                "source": (p.payload or {}).get("source", ""),
+                "text": (p.payload or {}).get("text", ""),
+                "score": float(p.score),
+            }
+            for p in points
+        ]
+
+    def search(
+        self, query_vector: list[float], limit: int, where: dict | None = None
+    ) -> list[dict]:
+        if not self._exists():
+            return []
+        result = self.client.query_points(
+            collection_name=self.collection_name,
+            query=list(query_vector),
+            query_filter=where_to_filter(where),
+            search_params=self._search_params(),
+            limit=limit,
+            with_payload=True,
+        )
+        return self._hits(result.points)
+
+    def search_many(
+        self, query_vectors: list[list[float]], limit: int, where: dict | None = None
+    ) -> list[list[dict]]:
+        if not self._exists() or not query_vectors:
+            return [[] for _ in query_vectors]
+        query_filter = where_to_filter(where)
+        params = self._search_params()
+        requests = [
+            models.QueryRequest(
+                query=list(q), filter=query_filter, params=params, limit=limit, with_payload=True
+            )
+            for q in query_vectors
+        ]
+        responses = self.client.query_batch_points(self.collection_name, requests=requests)
+        return [self._hits(r.points) for r in responses]
+
+    def export(self, batch_size: int = 4096) -> Iterator[tuple[list[str], np.ndarray]]:
+        if not self._exists():
+            return
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["chunk_id"],
+                with_vectors=True,
+            )
+            if points:
+                ids = [p.payload["chunk_id"] for p in points]
+                yield ids, np.asarray([p.vector for p in points], dtype=np.float32)
+            if offset is None:
+                return
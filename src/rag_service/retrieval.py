@@ -1,11 +1,23 @@
-from collections import defaultdict
+import asyncio
+import math
+import threading
+from collections import OrderedDict, defaultdict
 
-from rank_bm25 import BM25Okapi
+import numpy as np
 
+from rag_service.cache import get_rerank_cache, query_hash
+from rag_service.chunk_store import ChunkStore
+from rag_service.concurrency import get_limiter, run_inference
 from rag_service.config import get_settings
-from rag_service.models import get_embedder, get_reranker
-from rag_service.schemas import ChunkRecord
-from rag_service.vector_store import VectorStore
+from rag_service.filters import FilterScope, build_scope, filters_key
+from rag_service.lexical import SparseBM25, tokenize
+from rag_service.metrics import stage, traced
+from rag_service.models import get_embedder, get_fast_reranker, get_reranker
+from rag_service.schemas import QueryFilters
+from rag_service.vector_store import VectorStore, get_vector_store
+
+SCOPE_CACHE_SIZE = 128
+WARMUP_QUERY = "warm up"
 
 
 def reciprocal_rank_fusion(rank_lists: list[list[str]], k: int) -> dict[str, float]:
@@ -17,39 +29,118 @@ def reciprocal_rank_fusion(rank_lists: list[list[str]], k: int) -> dict[str, flo
 
 
 class HybridRetriever:
-    def __init__(self, chunks: list[ChunkRecord], bm25: BM25Okapi | None) -> None:
+    def __init__(
+        self,
+        chunks: ChunkStore,
+        bm25: SparseBM25 | None,
+        vector_store: VectorStore | None = None,
+    ) -> None:
         self.settings = get_settings()
         self.chunks = chunks
-        self.chunk_map = {c.chunk_id: c for c in chunks}
         self.bm25 = bm25
-        self.vector_store = VectorStore()
+        self.vector_store = vector_store or get_vector_store()
         self.embedder = get_embedder()
         self.reranker = get_reranker()
+        self.fast_reranker = get_fast_reranker()
+        self.rerank_cache = get_rerank_cache()
+        self._scopes: OrderedDict[str, FilterScope] = OrderedDict()
+        self._scope_lock = threading.Lock()
+
+    def scope(self, filters: QueryFilters | None) -> FilterScope | None:
+        key = filters_key(filters)
+        if not key:
+            return None
+        with self._scope_lock:
+            cached = self._scopes.get(key)
+            if cached is not None:
+                self._scopes.move_to_end(key)
+                return cached
+        scope = build_scope(self.chunks, filters)
+        with self._scope_lock:
+            self._scopes[key] = scope
+            while len(self._scopes) > SCOPE_CACHE_SIZE:
+                self._scopes.popitem(last=False)
+        return scope
+
+    def warm_up(self) -> None:
+        qvec = self.embedder.encode(WARMUP_QUERY, normalize_embeddings=True)
+        self.vector_store.search(query_vector=qvec.tolist(), limit=1)
+        if self.bm25 is not None:
+            self.bm25.top_k(tokenize(WARMUP_QUERY), 1)
+        for model in (self.reranker, self.fast_reranker):
+            if model is not None:
+                model.predict([[WARMUP_QUERY, WARMUP_QUERY]])
 
-    def _dense(self, query: str) -> list[dict]:
-        qvec = self.embedder.encode(query, normalize_embeddings=True).tolist()
-        return self.vector_store.search(query_vector=qvec, limit=self.settings.top_k_dense)
+    @traced("embed_query")
+    def embed(self, query: str) -> list[float]:
+        return self.embedder.encode(query, normalize_embeddings=True).tolist()
 
-    def _lexical(self, query: str) -> list[dict]:
-        if self.bm25 is None or not self.chunks:
+    @traced("embed_query")
+    def embed_many(self, queries: list[str]) -> list[list[float]]:
+        if not queries:
             return []
-        tokens = query.split()
-        scores = self.bm25.get_scores(tokens)
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[: self.settings.top_k_bm25]
-        return [
-            {
-                "chunk_id": self.chunks[idx].chunk_id,
-                "source": self.chunks[idx].source,
-                "text": self.chunks[idx].text,
-                "score": float(score),
-            }
-            for idx, score in ranked
-        ]
+        vectors = self.embedder.encode(
+            queries, batch_size=len(queries), normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.tolist()
+
+    def _dense_limit(self, scope: FilterScope | None) -> int:
+        limit = self.settings.top_k_dense
+        if scope is None or scope.where is not None:
+            return limit
+        return math.ceil(limit / max(scope.fraction, 1e-9))
+
+    @traced("dense")
+    def _dense(
+        self, query: str, qvec: list[float] | None = None, scope: FilterScope | None = None
+    ) -> list[dict]:
+        if qvec is None:
+            qvec = self.embed(query)
+        hits = self.vector_store.search(
+            query_vector=qvec,
+            limit=self._dense_limit(scope),
+            where=scope.where if scope else None,
+        )
+        return self._hydrate(hits, scope)
+
+    def _hit(self, row: int, score: float, scope: FilterScope | None) -> dict:
+        indexes = self.chunks.source_indexes(row)
+        if scope is not None:
+            indexes.sort(key=lambda i: not scope.allowed[i])
+        sources = [self.chunks.sources[i] for i in indexes]
+        return {
+            "chunk_id": self.chunks.chunk_id(row),
+            "source": sources[0],
+            "duplicates": sources[1:],
+            "text": self.chunks.text(row),
+            "score": float(score),
+        }
+
+    def _hydrate(self, hits: list[dict], scope: FilterScope | None = None) -> list[dict]:
+        hydrated = []
+        for hit in hits:
+            row = self.chunks.row_of(hit["chunk_id"])
+            if row is not None and (scope is None or scope.mask[row]):
+                hydrated.append(self._hit(row, hit["score"], scope))
+        return hydrated
+
+    @traced("lexical")
+    def _lexical(self, query: str, scope: FilterScope | None = None) -> list[dict]:
+        if self.bm25 is None or not len(self.chunks):
+            return []
+        doc_idx, scores = self.bm25.top_k(
+            tokenize(query), self.settings.top_k_bm25, scope.mask if scope else None
+        )
+        return self._lexical_hits(doc_idx, scores, scope)
 
-    def retrieve(self, query: str) -> list[dict]:
-        dense_hits = self._dense(query)
-        lexical_hits = self._lexical(query)
+    def _lexical_hits(
+        self, doc_idx: np.ndarray, scores: np.ndarray, scope: FilterScope | None = None
+    ) -> list[dict]:
+        ranked = zip(doc_idx.tolist(), scores.tolist(), strict=True)
+        return [self._hit(idx, score, scope) for idx, score in ranked]
 
+    @traced("fuse")
+    def _fuse(self, dense_hits: list[dict], lexical_hits: list[dict]) -> list[dict]:
         dense_ids = [h["chunk_id"] for h in dense_hits]
         lexical_ids = [h["chunk_id"] for h in lexical_hits]
         fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=self.settings.rrf_k)
@@ -58,26 +149,127 @@ class HybridRetriever:
         for hit in dense_hits + lexical_hits:
             merged[hit["chunk_id"]] = hit
 
-        candidates = [
-            {
-                "chunk_id": chunk_id,
-                "source": merged.get(chunk_id, {}).get("source", self.chunk_map.get(chunk_id, ChunkRecord(chunk_id=chunk_id, source="", text="")).source),
-                "text": merged.get(chunk_id, {}).get("text", self.chunk_map.get(chunk_id, ChunkRecord(chunk_id=chunk_id, source="", text="")).text),
-                "score": score,
-            }
+        return [
+            {**merged[chunk_id], "score": score}
             for chunk_id, score in sorted(fused.items(), key=lambda x: x[1], reverse=True)
         ]
 
+    def _confident(self, dense_hits: list[dict], lexical_hits: list[dict]) -> bool:
+        threshold = self.settings.rerank_skip_agreement
+        n = self.settings.top_k_final
+        if threshold <= 0 or len(dense_hits) < n or len(lexical_hits) < n:
+            return False
+        dense_ids = {h["chunk_id"] for h in dense_hits[:n]}
+        lexical_ids = {h["chunk_id"] for h in lexical_hits[:n]}
+        return len(dense_ids & lexical_ids) / n >= threshold
+
+    def _scores(self, model, tier: str, query: str, candidates: list[dict]) -> np.ndarray:
+        qhash = query_hash(query)
+        keys = [(tier, qhash, c["chunk_id"]) for c in candidates]
+        scores = self.rerank_cache.get_many(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = model.predict([[query, candidates[i]["text"]] for i in missing])
+            for i, score in zip(missing, fresh, strict=True):
+                scores[i] = float(score)
+            self.rerank_cache.put_many([(keys[i], scores[i]) for i in missing])
+        return np.asarray(scores, dtype=np.float64)
+
+    @traced("rerank")
+    def rerank(self, query: str, candidates: list[dict], confident: bool = False) -> list[dict]:
         if not candidates:
             return []
 
-        pairs = [[query, c["text"]] for c in candidates[: max(self.settings.top_k_final * 3, 10)]]
-        rerank_scores = self.reranker.predict(pairs)
+        candidates = candidates[: max(self.settings.top_k_final * 3, 10)]
+        if confident:
+            return candidates[: self.settings.top_k_final]
+
+        if self.fast_reranker is not None and len(candidates) > self.settings.rerank_cascade_keep:
+            fast_scores = self._scores(self.fast_reranker, "fast", query, candidates)
+            survivors = np.argsort(-fast_scores, kind="stable")[: self.settings.rerank_cascade_keep]
+            candidates = [candidates[i] for i in survivors]
+
+        rerank_scores = self._scores(self.reranker, "full", query, candidates)
 
         reranked = []
-        for item, rr_score in zip(candidates, rerank_scores, strict=False):
+        for item, rr_score in zip(candidates, rerank_scores, strict=True):
             item = {**item, "score": float(rr_score)}
             reranked.append(item)
 
         reranked.sort(key=lambda x: x["score"], reverse=True)
         return reranked[: self.settings.top_k_final]
+
+    def candidates_many(
+        self,
+        queries: list[str],
+        qvecs: list[list[float]],
+        filters: list[QueryFilters | None],
+    ) -> list[tuple[list[dict], bool]]:
+        groups: dict[str, list[int]] = {}
+        for i, f in enumerate(filters):
+            groups.setdefault(filters_key(f), []).append(i)
+
+        results: list[tuple[list[dict], bool]] = [([], False)] * len(queries)
+        for members in groups.values():
+            scope = self.scope(filters[members[0]])
+            if scope is not None and not scope.sources:
+                continue
+            with stage("dense"):
+                dense = self.vector_store.search_many(
+                    [qvecs[i] for i in members],
+                    limit=self._dense_limit(scope),
+                    where=scope.where if scope else None,
+                )
+            if self.bm25 is None or not len(self.chunks):
+                lexical = [[] for _ in members]
+            else:
+                with stage("lexical"):
+                    ranked = self.bm25.top_k_many(
+                        [tokenize(queries[i]) for i in members],
+                        self.settings.top_k_bm25,
+                        scope.mask if scope else None,
+                    )
+                    lexical = [
+                        self._lexical_hits(doc_idx, scores, scope) for doc_idx, scores in ranked
+                    ]
+            for i, dense_hits, lexical_hits in zip(members, dense, lexical, strict=True):
+                dense_hits = self._hydrate(dense_hits, scope)
+                results[i] = (
+                    self._fuse(dense_hits, lexical_hits),
+                    self._confident(dense_hits, lexical_hits),
+                )
+        return results
+
+    def retrieve(
+        self,
+        query: str,
+        qvec: list[float] | None = None,
+        filters: QueryFilters | None = None,
+    ) -> list[dict]:
+        scope = self.scope(filters)
+        if scope is not None and not scope.sources:
+            return []
+        dense_hits, lexical_hits = self._dense(query, qvec, scope), self._lexical(query, scope)
+        candidates = self._fuse(dense_hits, lexical_hits)
+        return self.rerank(query, candidates, self._confident(dense_hits, lexical_hits))
+
+    async def aretrieve(
+        self,
+        query: str,
+        qvec: list[float] | None = None,
+        filters: QueryFilters | None = None,
+    ) -> list[dict]:
+        async with get_limiter("retrieval").slot():
+            scope = await run_inference(self.scope, filters)
+            if scope is not None and not scope.sources:
+                return []
+            dense_hits, lexical_hits = await asyncio.gather(
+                run_inference(self._dense, query, qvec, scope),
+                run_inference(self._lexical, query, scope),
+            )
+        candidates = self._fuse(dense_hits, lexical_hits)
+        confident = self._confident(dense_hits, lexical_hits)
+        if confident:
+            return self.rerank(query, candidates, confident)
+        async with get_limiter("rerank").slot():
+            return await run_inference(self.rerank, query, candidates)
@@ -1,9 +1,13 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field
 
 
 class IngestRequest(BaseModel):
     source_dir: str
     glob: str = "**/*"
+    incremental: bool = False
+    tags: list[str] = Field(default_factory=list)
 
 
 class IngestResponse(BaseModel):
@@ -12,23 +16,112 @@ class IngestResponse(BaseModel):
     message: str
 
 
+class QueryFilters(BaseModel):
+    source_glob: str | None = None
+    file_types: list[str] = Field(default_factory=list)
+    ingested_after: datetime | None = None
+    ingested_before: datetime | None = None
+    tags: list[str] = Field(default_factory=list)
+
+
 class QueryRequest(BaseModel):
     query: str = Field(min_length=1)
+    filters: QueryFilters | None = None
+    timings: bool = False
+
+
+class BatchQueryItem(QueryRequest):
+    id: str | None = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: list[BatchQueryItem] = Field(min_length=1)
+    generate: bool = True
 
 
 class Citation(BaseModel):
     source: str
     chunk_id: str
     score: float
+    duplicates: list[str] = Field(default_factory=list)
 
 
 class QueryResponse(BaseModel):
     answer: str
     citations: list[Citation]
     retrieved_chunks: int
+    timings: dict[str, float] | None = None
+
+
+class BatchQueryResult(QueryResponse):
+    index: int
+    id: str | None = None
+    query: str
+    error: str | None = None
 
 
 class ChunkRecord(BaseModel):
     chunk_id: str
     source: str
     text: str
+    ingested_at: int = 0
+    tags: list[str] = Field(default_factory=list)
+    digest: int = 0
+    simhash: int = 0
+
+
+class IndexState(BaseModel):
+    generation: int
+    collection: str
+
+
+class SourceFile(BaseModel):
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    chunk_ids: list[str]
+
+
+class SourceManifest(BaseModel):
+    chunking: str = ""
+    files: list[SourceFile]
+
+
+class IngestCheckpoint(BaseModel):
+    base_generation: int
+    generation: int
+    collection: str
+    source_dir: str
+    glob: str
+    incremental: bool
+    chunking: str = ""
+    embedded: int = 0
+
+
+class IngestProgress(BaseModel):
+    phase: str
+    documents: int = 0
+    chunks: int = 0
+    queued: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+
+
+class IngestJob(BaseModel):
+    id: str
+    status: str = "queued"
+    request: IngestRequest
+    progress: IngestProgress = Field(default_factory=lambda: IngestProgress(phase="queued"))
+    total_documents: int | None = None
+    documents_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+    embedded_per_second: float = 0.0
+    eta_seconds: float | None = None
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    result: IngestResponse | None = None
+    error: str | None = None
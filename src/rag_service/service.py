@@ -1,31 +1,260 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+
+from rag_service.cache import QueryCache, get_query_cache
+from rag_service.concurrency import Overloaded, get_limiter, run_inference
 from rag_service.config import get_settings
-from rag_service.generation import generate_answer
-from rag_service.index_store import IndexStore
-from rag_service.retrieval import HybridRetriever
-from rag_service.schemas import Citation, QueryResponse
+from rag_service.engine import RetrievalEngine, get_engine
+from rag_service.filters import filters_key
+from rag_service.generation import (
+    FALLBACK_PREFIX,
+    agenerate_answer,
+    astream_answer,
+    generate_answer,
+    stream_answer,
+)
+from rag_service.metrics import collect_timings, trace_request
+from rag_service.schemas import (
+    BatchQueryItem,
+    BatchQueryResult,
+    Citation,
+    QueryFilters,
+    QueryResponse,
+)
+
+NO_KNOWLEDGE = "No relevant knowledge found. Please ingest documents first."
 
 
 class RAGService:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        engine: RetrievalEngine | None = None,
+        cache: QueryCache | None = None,
+    ) -> None:
         self.settings = get_settings()
-        self.index_store = IndexStore(self.settings.index_dir)
+        self.engine = engine or get_engine()
+        self.cache = cache or get_query_cache()
+
+    def _citations(self, hits: list[dict]) -> list[Citation]:
+        return [
+            Citation(
+                source=h["source"],
+                chunk_id=h["chunk_id"],
+                score=float(h["score"]),
+                duplicates=h.get("duplicates", []),
+            )
+            for h in hits
+        ]
+
+    def _response(self, answer: str, hits: list[dict]) -> QueryResponse:
+        return QueryResponse(
+            answer=answer, citations=self._citations(hits), retrieved_chunks=len(hits)
+        )
+
+    def _citation_event(self, hits: list[dict]) -> tuple[str, dict]:
+        citations = [c.model_dump() for c in self._citations(hits)]
+        return "citations", {"citations": citations, "retrieved_chunks": len(hits)}
 
-    def query(self, question: str) -> QueryResponse:
-        chunks = self.index_store.load_chunks()
-        bm25 = self.index_store.load_bm25()
-        retriever = HybridRetriever(chunks=chunks, bm25=bm25)
+    def _remember(
+        self,
+        question: str,
+        generation: int,
+        qvec: list[float],
+        response: QueryResponse,
+        scope: str,
+    ) -> None:
+        if response.retrieved_chunks and not response.answer.startswith(FALLBACK_PREFIX):
+            self.cache.put(question, generation, qvec, response, scope)
 
-        hits = retriever.retrieve(question)
+    def query(
+        self, question: str, filters: QueryFilters | None = None, timings: bool = False
+    ) -> QueryResponse:
+        with trace_request("query") as trace:
+            response = self._query(question, filters)
+        return response.model_copy(update={"timings": trace}) if timings else response
+
+    def _query(self, question: str, filters: QueryFilters | None) -> QueryResponse:
+        snapshot = self.engine.current()
+        scope = filters_key(filters)
+        cached = self.cache.get(question, snapshot.generation, scope)
+        if cached is not None:
+            return cached
+
+        retriever = snapshot.retriever
+        qvec = retriever.embed(question)
+        cached = self.cache.get_semantic(qvec, snapshot.generation, scope)
+        if cached is not None:
+            return cached
+
+        hits = retriever.retrieve(question, qvec, filters)
         if not hits:
-            return QueryResponse(
-                answer="No relevant knowledge found. Please ingest documents first.",
-                citations=[],
-                retrieved_chunks=0,
-            )
+            return self._response(NO_KNOWLEDGE, hits)
 
-        answer = generate_answer(question, hits)
-        citations = [
-            Citation(source=h["source"], chunk_id=h["chunk_id"], score=float(h["score"]))
-            for h in hits
+        response = self._response(generate_answer(question, hits), hits)
+        self._remember(question, snapshot.generation, qvec, response, scope)
+        return response
+
+    def stream(
+        self, question: str, filters: QueryFilters | None = None
+    ) -> Iterator[tuple[str, dict]]:
+        hits = self.engine.current().retriever.retrieve(question, filters=filters)
+        yield self._citation_event(hits)
+        tokens = stream_answer(question, hits) if hits else iter([NO_KNOWLEDGE])
+        for token in tokens:
+            yield "token", {"text": token}
+        yield "done", {}
+
+    async def aretrieve(self, question: str, filters: QueryFilters | None = None) -> list[dict]:
+        snapshot = await run_inference(self.engine.current)
+        return await snapshot.retriever.aretrieve(question, filters=filters)
+
+    async def aquery(
+        self, question: str, filters: QueryFilters | None = None, timings: bool = False
+    ) -> QueryResponse:
+        with trace_request("query") as trace:
+            response = await self._aquery(question, filters)
+        return response.model_copy(update={"timings": trace}) if timings else response
+
+    async def _aquery(self, question: str, filters: QueryFilters | None) -> QueryResponse:
+        snapshot = await run_inference(self.engine.current)
+        scope = filters_key(filters)
+        cached = self.cache.get(question, snapshot.generation, scope)
+        if cached is not None:
+            return cached
+
+        retriever = snapshot.retriever
+        qvec = await run_inference(retriever.embed, question)
+        cached = self.cache.get_semantic(qvec, snapshot.generation, scope)
+        if cached is not None:
+            return cached
+
+        hits = await retriever.aretrieve(question, qvec, filters)
+        if not hits:
+            return self._response(NO_KNOWLEDGE, hits)
+
+        response = self._response(await agenerate_answer(question, hits), hits)
+        self._remember(question, snapshot.generation, qvec, response, scope)
+        return response
+
+    async def astream(self, question: str, hits: list[dict]) -> AsyncIterator[tuple[str, dict]]:
+        yield self._citation_event(hits)
+        if not hits:
+            yield "token", {"text": NO_KNOWLEDGE}
+        else:
+            async for token in astream_answer(question, hits):
+                yield "token", {"text": token}
+        yield "done", {}
+
+    async def abatch(
+        self, items: list[BatchQueryItem], generate: bool = True
+    ) -> AsyncIterator[BatchQueryResult]:
+        size = max(self.settings.query_batch_size, 1)
+        semaphore = asyncio.Semaphore(self.settings.query_batch_concurrency)
+        for start in range(0, len(items), size):
+            batch = items[start : start + size]
+            try:
+                async for result in self._abatch(batch, start, generate, semaphore):
+                    yield result
+            except Overloaded as exc:
+                if start == 0:
+                    raise
+                for i, item in enumerate(batch):
+                    yield self._overloaded(start + i, item, exc)
+
+    def _overloaded(self, index: int, item: BatchQueryItem, exc: Overloaded) -> BatchQueryResult:
+        return BatchQueryResult(
+            answer="",
+            citations=[],
+            retrieved_chunks=0,
+            index=index,
+            id=item.id,
+            query=item.query,
+            error=str(exc),
+        )
+
+    async def _abatch(
+        self,
+        items: list[BatchQueryItem],
+        offset: int,
+        generate: bool,
+        semaphore: asyncio.Semaphore,
+    ) -> AsyncIterator[BatchQueryResult]:
+        snapshot = await run_inference(self.engine.current)
+        retriever = snapshot.retriever
+        scopes = [filters_key(item.filters) for item in items]
+
+        def result(
+            i: int, response: QueryResponse, trace: dict[str, float] | None = None
+        ) -> BatchQueryResult:
+            item = items[i]
+            fields = response.model_dump()
+            fields.update(index=offset + i, id=item.id, query=item.query)
+            if item.timings:
+                own = trace or {"total": 0.0}
+                fields["timings"] = shared | own | {"total": shared["total"] + own["total"]}
+            return BatchQueryResult(**fields)
+
+        cached: dict[int, QueryResponse] = {}
+        todo: list[int] = []
+        with collect_timings() as shared:
+            async with get_limiter("retrieval").slot():
+                qvecs = await run_inference(retriever.embed_many, [item.query for item in items])
+                for i, item in enumerate(items):
+                    hit = None
+                    if generate:
+                        hit = self.cache.get(item.query, snapshot.generation, scopes[i])
+                        if hit is None:
+                            hit = self.cache.get_semantic(qvecs[i], snapshot.generation, scopes[i])
+                    if hit is not None:
+                        cached[i] = hit
+                    else:
+                        todo.append(i)
+                candidates = []
+                if todo:
+                    candidates = await run_inference(
+                        retriever.candidates_many,
+                        [items[i].query for i in todo],
+                        [qvecs[i] for i in todo],
+                        [items[i].filters for i in todo],
+                    )
+        for i, response in cached.items():
+            yield result(i, response)
+        if not todo:
+            return
+
+        async def rerank(question: str, pool: list[dict], confident: bool) -> list[dict]:
+            if confident:
+                return await run_inference(retriever.rerank, question, pool, confident)
+            async with get_limiter("rerank").slot():
+                return await run_inference(retriever.rerank, question, pool)
+
+        async def respond(question: str, pool: list[dict], confident: bool) -> QueryResponse:
+            hits = await rerank(question, pool, confident)
+            if not hits:
+                return self._response(NO_KNOWLEDGE if generate else "", hits)
+            if not generate:
+                return self._response("", hits)
+            return self._response(await agenerate_answer(question, hits), hits)
+
+        async def answer(i: int, pool: list[dict], confident: bool) -> BatchQueryResult:
+            question = items[i].query
+            try:
+                async with semaphore:
+                    with collect_timings() as trace:
+                        response = await respond(question, pool, confident)
+            except Overloaded as exc:
+                return self._overloaded(offset + i, items[i], exc)
+            if generate:
+                self._remember(question, snapshot.generation, qvecs[i], response, scopes[i])
+            return result(i, response, trace)
+
+        tasks = [
+            asyncio.ensure_future(answer(i, pool, confident))
+            for i, (pool, confident) in zip(todo, candidates, strict=True)
         ]
-        return QueryResponse(answer=answer, citations=citations, retrieved_chunks=len(hits))
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
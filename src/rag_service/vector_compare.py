@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+
+from rag_service.config import get_settings
+from rag_service.index_store import IndexStore
+from rag_service.numpy_store import NumpyVectorStore
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import VectorStore, get_vector_store
+
+
+def _recall(reference: list[list[str]], candidate: list[list[str]]) -> float:
+    hits = [
+        len(set(ref) & set(cand)) / len(ref)
+        for ref, cand in zip(reference, candidate, strict=True)
+        if ref
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def _load(store: VectorStore, ids: list[str], vectors: np.ndarray, batch_size: int = 4096) -> float:
+    started = time.perf_counter()
+    store.reset()
+    for lo in range(0, len(ids), batch_size):
+        chunks = [
+            ChunkRecord(chunk_id=cid, source="", text="") for cid in ids[lo : lo + batch_size]
+        ]
+        store.upsert(chunks, vectors[lo : lo + batch_size])
+    store.commit()
+    return time.perf_counter() - started
+
+
+def _measure(store: VectorStore, queries: np.ndarray, k: int) -> tuple[list[list[str]], float]:
+    store.search(queries[0].tolist(), k)
+    started = time.perf_counter()
+    results = [[h["chunk_id"] for h in store.search(q.tolist(), k)] for q in queries]
+    elapsed = time.perf_counter() - started
+    return results, len(queries) / elapsed if elapsed else 0.0
+
+
+def compare_vector_backends(n_queries: int = 200, k: int = 10, noise: float = 0.05) -> dict:
+    settings = get_settings()
+    state = IndexStore(settings.index_dir).load_state()
+    source = get_vector_store(state.collection if state else None)
+
+    ids: list[str] = []
+    blocks: list[np.ndarray] = []
+    for batch_ids, batch in source.export():
+        ids.extend(batch_ids)
+        blocks.append(batch)
+    if not ids:
+        raise ValueError("Index is empty; ingest documents before comparing vector backends")
+    vectors = np.concatenate(blocks)
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(ids), size=n_queries, replace=True)
+    queries = vectors[rows] + noise * rng.standard_normal((len(rows), vectors.shape[1])).astype(
+        np.float32
+    )
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+    k = min(k, len(ids))
+
+    started = time.perf_counter()
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    exact_qps = len(queries) / (time.perf_counter() - started)
+    reference = [[ids[i] for i in row] for row in top]
+
+    base = settings.chroma_collection
+    candidates: dict[str, VectorStore] = {
+        "chroma": get_vector_store(f"{base}-compare-chroma", backend="chroma"),
+        "numpy-float32": NumpyVectorStore(
+            f"{base}-compare-f32", dtype="float32", ivf_min_rows=len(ids) + 1
+        ),
+        "numpy-float16": NumpyVectorStore(
+            f"{base}-compare-f16", dtype="float16", ivf_min_rows=len(ids) + 1
+        ),
+        "numpy-int8": NumpyVectorStore(
+            f"{base}-compare-i8", dtype="int8", ivf_min_rows=len(ids) + 1
+        ),
+        "numpy-ivf": NumpyVectorStore(
+            f"{base}-compare-ivf", dtype=settings.vector_dtype, ivf_min_rows=0
+        ),
+    }
+    if settings.vector_backend == "qdrant":
+        candidates["qdrant"] = get_vector_store(f"{base}-compare-qdrant", backend="qdrant")
+
+    report: dict[str, dict] = {
+        "sample": {
+            "vectors": len(ids),
+            "dim": int(vectors.shape[1]),
+            "queries": len(queries),
+            "k": k,
+        },
+        "exact": {"qps_batched": exact_qps},
+    }
+    for name, store in candidates.items():
+        try:
+            build_s = _load(store, ids, vectors)
+            results, qps = _measure(store, queries, k)
+            report[name] = {
+                "recall_at_k": _recall(reference, results),
+                "qps": qps,
+                "build_seconds": build_s,
+            }
+        finally:
+            store.drop()
+    return report
@@ -1,63 +1,200 @@
-import chromadb
-from chromadb.api.models.Collection import Collection
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+import numpy as np
 
 from rag_service.config import get_settings
 from rag_service.schemas import ChunkRecord
 
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+
+def generation_collection(base: str, generation: int) -> str:
+    return f"{base}-g{generation:06d}"
+
+
+class VectorStore(ABC):
+    collection_name: str
+
+    @abstractmethod
+    def reset(self) -> None: ...
+
+    @abstractmethod
+    def upsert(
+        self, chunks: list[ChunkRecord], vectors: np.ndarray | list[list[float]]
+    ) -> None: ...
+
+    @abstractmethod
+    def existing_ids(self, chunk_ids: list[str]) -> set[str]: ...
+
+    @abstractmethod
+    def delete(self, chunk_ids: list[str]) -> None: ...
+
+    def flush(self) -> None:
+        return None
+
+    def commit(self) -> None:
+        return None
+
+    @abstractmethod
+    def drop(self) -> None: ...
+
+    @abstractmethod
+    def prune_generations(self, keep: set[str]) -> None: ...
+
+    @abstractmethod
+    def search(
+        self, query_vector: list[float], limit: int, where: dict | None = None
+    ) -> list[dict]: ...
+
+    def search_many(
+        self, query_vectors: list[list[float]], limit: int, where: dict | None = None
+    ) -> list[list[dict]]:
+        return [self.search(q, limit, where) for q in query_vectors]
+
+    @abstractmethod
+    def export(self, batch_size: int = 4096) -> Iterator[tuple[list[str], np.ndarray]]: ...
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, collection_name: str | None = None) -> None:
+        import chromadb
 
-class VectorStore:
-    def __init__(self) -> None:
         self.settings = get_settings()
         self.client = chromadb.PersistentClient(path=str(self.settings.chroma_path))
+        self.collection_name = collection_name or self.settings.chroma_collection
+        self._collection: Collection | None = None
 
     def _get_or_create_collection(self) -> Collection:
         return self.client.get_or_create_collection(
-            name=self.settings.chroma_collection,
+            name=self.collection_name,
             metadata={"hnsw:space": "cosine"},
         )
 
-    def replace_all(self, chunks: list[ChunkRecord], vectors: list[list[float]]) -> None:
+    def _get_collection(self) -> Collection | None:
+        if self._collection is None:
+            try:
+                self._collection = self.client.get_collection(name=self.collection_name)
+            except Exception:
+                return None
+        return self._collection
+
+    def reset(self) -> None:
         try:
-            self.client.get_collection(name=self.settings.chroma_collection)
-            self.client.delete_collection(name=self.settings.chroma_collection)
+            self.client.get_collection(name=self.collection_name)
+            self.client.delete_collection(name=self.collection_name)
         except Exception:
             pass
-        collection = self._get_or_create_collection()
+        self._collection = self._get_or_create_collection()
 
+    def upsert(self, chunks: list[ChunkRecord], vectors: np.ndarray | list[list[float]]) -> None:
         if not chunks:
             return
-
+        collection = self._get_or_create_collection()
+        self._collection = collection
         ids = [c.chunk_id for c in chunks]
         documents = [c.text for c in chunks]
         metadatas = [{"source": c.source, "chunk_id": c.chunk_id} for c in chunks]
-        collection.add(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+        collection.upsert(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+
+    def existing_ids(self, chunk_ids: list[str]) -> set[str]:
+        collection = self._get_collection()
+        if collection is None or not chunk_ids:
+            return set()
+        return set(collection.get(ids=chunk_ids, include=[])["ids"])
 
-    def search(self, query_vector: list[float], limit: int) -> list[dict]:
+    def delete(self, chunk_ids: list[str]) -> None:
+        collection = self._get_collection()
+        if collection is None or not chunk_ids:
+            return
+        collection.delete(ids=chunk_ids)
+
+    def drop(self) -> None:
         try:
-            collection = self.client.get_collection(name=self.settings.chroma_collection)
+            self.client.delete_collection(name=self.collection_name)
         except Exception:
-            return []
+            pass
+        self._collection = None
+
+    def prune_generations(self, keep: set[str]) -> None:
+        base = self.settings.chroma_collection
+        for item in self.client.list_collections():
+            name = getattr(item, "name", item)
+            if name in keep:
+                continue
+            if name == base or name.startswith(f"{base}-g"):
+                self.client.delete_collection(name=name)
+
+    def search(
+        self, query_vector: list[float], limit: int, where: dict | None = None
+    ) -> list[dict]:
+        return self.search_many([query_vector], limit, where)[0]
+
+    def search_many(
+        self, query_vectors: list[list[float]], limit: int, where: dict | None = None
+    ) -> list[list[dict]]:
+        collection = self._get_collection()
+        if collection is None or not query_vectors:
+            return [[] for _ in query_vectors]
 
         result = collection.query(
-            query_embeddings=[query_vector],
+            query_embeddings=query_vectors,
             n_results=limit,
+            where=where or None,
             include=["metadatas", "documents", "distances"],
         )
 
-        metadatas = (result.get("metadatas") or [[]])[0]
-        documents = (result.get("documents") or [[]])[0]
-        distances = (result.get("distances") or [[]])[0]
-
-        hits: list[dict] = []
-        for metadata, doc, distance in zip(metadatas, documents, distances, strict=False):
-            md = metadata or {}
-            dist = float(distance) if distance is not None else 1.0
-            hits.append(
-                {
-                    "chunk_id": md.get("chunk_id", ""),
-                    "source": md.get("source", ""),
-                    "text": doc or "",
-                    "score": 1.0 - dist,
-                }
-            )
-        return hits
+        empty = [[] for _ in query_vectors]
+        rows = zip(
+            result.get("metadatas") or empty,
+            result.get("documents") or empty,
+            result.get("distances") or empty,
+            strict=True,
+        )
+        results: list[list[dict]] = []
+        for metadatas, documents, distances in rows:
+            hits: list[dict] = []
+            for metadata, doc, distance in zip(metadatas, documents, distances, strict=False):
+                md = metadata or {}
+                dist = float(distance) if distance is not None else 1.0
+                hits.append(
+                    {
+                        "chunk_id": md.get("chunk_id", ""),
+                        "source": md.get("source", ""),
+                        "text": doc or "",
+                        "score": 1.0 - dist,
+                    }
+                )
+            results.append(hits)
+        return results
+
+    def export(self, batch_size: int = 4096) -> Iterator[tuple[list[str], np.ndarray]]:
+        collection = self._get_collection()
+        if collection is None:
+            return
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], np.asarray(page["embeddings"], dtype=np.float32)
+            offset += len(page["ids"])
+
+
+def get_vector_store(collection_name: str | None = None, backend: str | None = None) -> VectorStore:
+    backend = backend or get_settings().vector_backend
+    if backend == "chroma":
+        return ChromaVectorStore(collection_name)
+    if backend == "numpy":
+        from rag_service.numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore(collection_name)
+    if backend == "qdrant":
+        from rag_service.qdrant_store import QdrantVectorStore
+
+        return QdrantVectorStore(collection_name)
+    raise ValueError(f"Unsupported vector backend: {backend}")
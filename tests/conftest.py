@@ -0,0 +1,71 @@
+import hashlib
+import sys
+
+import numpy as np
+import pytest
+
+from rag_service.config import get_settings
+
+
+class HashEmbedder:
+    dim = 64
+
+    def encode(self, sentences, **_) -> np.ndarray:
+        texts = [sentences] if isinstance(sentences, str) else sentences
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                slot = hashlib.blake2b(word.encode(), digest_size=2).digest()
+                vectors[row, int.from_bytes(slot, "little") % self.dim] += 1
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+
+class OverlapReranker:
+    def predict(self, pairs, **_) -> np.ndarray:
+        return np.array([len(set(q.split()) & set(d.split())) for q, d in pairs], dtype=float)
+
+
+def clear_caches() -> None:
+    for name, module in list(sys.modules.items()):
+        if name.startswith("rag_service"):
+            for value in list(vars(module).values()):
+                if callable(getattr(value, "cache_clear", None)):
+                    value.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path, monkeypatch):
+    for name, path in {
+        "DATA_DIR": "data",
+        "INDEX_DIR": "index",
+        "CHROMA_PATH": "chroma_db",
+        "VECTOR_PATH": "vector_index",
+    }.items():
+        monkeypatch.setenv(name, str(tmp_path / path))
+    clear_caches()
+    yield get_settings()
+    clear_caches()
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    def apply(**values) -> None:
+        for name, value in values.items():
+            monkeypatch.setenv(name, str(value))
+        clear_caches()
+
+    return apply
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    from rag_service import engine, ingest, retrieval
+
+    embedder = HashEmbedder()
+    for module in (engine, ingest, retrieval):
+        monkeypatch.setattr(module, "get_embedder", lambda: embedder)
+    for module in (engine, retrieval):
+        monkeypatch.setattr(module, "get_reranker", OverlapReranker)
+        monkeypatch.setattr(module, "get_fast_reranker", lambda: None)
+    return embedder
@@ -0,0 +1,129 @@
+import json
+import sys
+import time
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+from rag_service import engine
+from rag_service.concurrency import get_limiter
+from rag_service.ingest import IngestionService
+
+DOCS = {
+    "pump.txt": "The hydraulic pump is inspected weekly and the oil level is checked.",
+    "belts.txt": "Conveyor belts are cleaned after every shift and greased monthly.",
+    "valves.txt": "Pressure relief valves protect the hydraulic circuit from spikes.",
+}
+
+
+@pytest.fixture
+def client(configure, fake_models, tmp_path):
+    configure(VECTOR_BACKEND="numpy", WARMUP_ON_START="false", QUERY_CACHE_SIZE=0)
+    from rag_service import api
+
+    source = tmp_path / "docs"
+    source.mkdir()
+    for name, text in DOCS.items():
+        (source / name).write_text(text, encoding="utf-8")
+    IngestionService().ingest(source)
+    with TestClient(api.app) as client:
+        yield client
+
+
+def metric(body: str, name: str) -> float | None:
+    for line in body.splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.split()[1])
+    return None
+
+
+def test_metrics_report_the_loaded_index(client):
+    body = client.get("/metrics").text
+    assert metric(body, "rag_index_generation") == 1.0
+    assert "rag_cache_hits_total" in body
+
+
+def test_metrics_scrape_does_not_load_an_index():
+    from rag_service import api
+
+    body = TestClient(api.app).get("/metrics").text
+    assert metric(body, "rag_index_generation") is None
+    assert engine.get_engine().loaded() is None
+
+
+def test_batch_streams_one_line_per_query(client):
+    queries = [
+        {"id": "a", "query": "hydraulic pump oil"},
+        {"id": "b", "query": "conveyor belts", "filters": {"source_glob": "*belts.txt"}},
+        {"id": "c", "query": "relief valves"},
+    ]
+    response = client.post("/query/batch", json={"queries": queries, "generate": False})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = sorted(
+        (json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"]
+    )
+    assert [r["id"] for r in rows] == ["a", "b", "c"]
+    assert all(r["error"] is None and r["answer"] == "" for r in rows)
+    assert rows[0]["citations"][0]["source"].endswith("pump.txt")
+    assert {c["source"].rsplit("/", 1)[-1] for c in rows[1]["citations"]} == {"belts.txt"}
+
+
+def test_batch_reports_timings_per_item(client):
+    queries = [
+        {"id": "a", "query": "hydraulic pump", "timings": True},
+        {"id": "b", "query": "belts"},
+    ]
+    response = client.post("/query/batch", json={"queries": queries, "generate": False})
+    rows = {row["id"]: row for row in map(json.loads, response.text.splitlines())}
+    assert {"embed_query", "dense", "lexical", "rerank", "total"} <= set(rows["a"]["timings"])
+    assert rows["a"]["timings"]["total"] >= rows["a"]["timings"]["rerank"]
+    assert rows["b"]["timings"] is None
+
+
+def test_batch_is_refused_when_retrieval_is_saturated(client, configure):
+    configure(RETRIEVAL_CONCURRENCY=1, STAGE_QUEUE_TIMEOUT_MS=10, RETRY_AFTER_SECONDS=4)
+    limiter = get_limiter("retrieval")
+
+    async def hold() -> None:
+        await limiter._semaphore.acquire()
+
+    client.portal.call(hold)
+    response = client.post("/query/batch", json={"queries": [{"query": "pump"}]})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "4"
+
+
+def test_ready_reports_warm_up(configure, fake_models, monkeypatch):
+    configure(VECTOR_BACKEND="numpy", WARMUP_ON_START="true")
+    monkeypatch.setitem(sys.modules, "litellm", types.ModuleType("litellm"))
+    from rag_service import api
+
+    with TestClient(api.app) as client:
+        deadline = time.monotonic() + 5
+        while (response := client.get("/ready")).status_code == 503:
+            assert response.json()["status"] == "warming"
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    body = response.json()
+    assert body["status"] == "ready"
+    assert set(body["timings_ms"]) == {"models", "index", "inference", "llm_client"}
+
+
+def test_ready_reports_a_failed_warm_up(configure, monkeypatch):
+    configure(WARMUP_ON_START="true")
+
+    def broken() -> None:
+        raise OSError("model files missing")
+
+    monkeypatch.setattr(engine, "get_embedder", broken)
+    from rag_service import api
+
+    with TestClient(api.app) as client:
+        deadline = time.monotonic() + 5
+        while (response := client.get("/ready")).json()["status"] == "warming":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    assert response.status_code == 503
+    assert response.json()["detail"] == "OSError: model files missing"
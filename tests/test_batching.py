@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from rag_service.batching import MicroBatcher
+
+
+def test_concurrent_submits_share_a_batch():
+    calls: list[list[int]] = []
+    release = threading.Event()
+
+    def double(items: list[int]) -> list[int]:
+        release.wait(1)
+        calls.append(items)
+        return [2 * i for i in items]
+
+    batcher = MicroBatcher(double, max_batch=8, max_wait_ms=50)
+    first = batcher.submit(0)
+    futures = [batcher.submit(i) for i in range(1, 5)]
+    release.set()
+    assert first.result(1) == 0
+    assert [f.result(1) for f in futures] == [2, 4, 6, 8]
+    assert sum(len(c) for c in calls) == 5
+    assert batcher.stats()["max_batch_size"] > 1
+
+
+def test_batch_closes_once_item_sizes_fill_it():
+    calls: list[list[str]] = []
+    started, release = threading.Event(), threading.Event()
+
+    def run(items: list[str]) -> list[int]:
+        started.set()
+        release.wait(1)
+        calls.append(items)
+        return [len(i) for i in items]
+
+    batcher = MicroBatcher(run, max_batch=4, max_wait_ms=20, size=len)
+    busy = batcher.submit("x")
+    started.wait(1)
+    futures = [batcher.submit(item) for item in ["aaa", "bb", "c"]]
+    release.set()
+    assert busy.result(1) == 1
+    assert [f.result(1) for f in futures] == [3, 2, 1]
+    assert calls == [["x"], ["aaa", "bb"], ["c"]]
+
+
+def test_idle_submit_runs_without_waiting():
+    batcher = MicroBatcher(lambda items: items, max_batch=8, max_wait_ms=60_000)
+    assert batcher.submit(3).result(1) == 3
+    assert batcher.submit(4).result(1) == 4
+    assert batcher.stats()["batches"] == 2
+
+
+def test_stats_are_exported_to_prometheus(monkeypatch):
+    from prometheus_client import generate_latest
+
+    from rag_service import metrics, models
+
+    batcher = MicroBatcher(lambda items: items, max_batch=8, max_wait_ms=0)
+    batcher.submit(1).result(1)
+    monkeypatch.setattr(models, "inference_stats", lambda: {"embedder": batcher.stats()})
+    body = generate_latest(metrics.REGISTRY).decode()
+    assert 'rag_inference_batches_total{model="embedder"} 1.0' in body
+    assert 'rag_inference_items_total{model="embedder"} 1.0' in body
+    assert 'rag_inference_max_batch_size{model="embedder"} 1.0' in body
+
+
+@pytest.mark.parametrize(
+    "fn",
+    [
+        lambda items: (_ for _ in ()).throw(RuntimeError("model failed")),
+        lambda items: items[:-1],
+    ],
+    ids=["raises", "short"],
+)
+def test_failed_batch_fails_its_futures_and_worker_survives(fn):
+    broken = {"on": True}
+
+    def run(items: list[int]) -> list[int]:
+        if broken["on"]:
+            return fn(items)
+        return items
+
+    batcher = MicroBatcher(run, max_batch=4, max_wait_ms=5)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises((RuntimeError, ValueError)):
+            future.result(1)
+    broken["on"] = False
+    assert batcher.submit(7).result(1) == 7
+    assert batcher._thread.is_alive()
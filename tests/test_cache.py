@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from rag_service import cache as cache_module
+from rag_service.cache import QueryCache
+from rag_service.schemas import QueryResponse
+
+
+def response(answer: str) -> QueryResponse:
+    return QueryResponse(answer=answer, citations=[], retrieved_chunks=1)
+
+
+def unit(*values: float) -> list[float]:
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_exact_hit_ignores_case_and_spacing():
+    cache = QueryCache(max_entries=4, ttl_seconds=60, semantic_threshold=0.95)
+    cache.put("How do I reset the pump?", 1, None, response("a"))
+    assert cache.get("how do i   reset the PUMP?", 1).answer == "a"
+    assert cache.get("how do i reset the valve?", 1) is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = QueryCache(max_entries=4, ttl_seconds=60, semantic_threshold=0.95)
+    cache.put("reset the pump", 1, unit(1, 0, 0), response("pump"))
+    assert cache.get_semantic(unit(1, 0.1, 0), 1).answer == "pump"
+    assert cache.get_semantic(unit(1, 1, 0), 1) is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(max_entries=4, ttl_seconds=10, semantic_threshold=0.9)
+    cache.put("q", 1, unit(0, 1), response("a"))
+    clock[0] += 9
+    assert cache.get("q", 1) is not None
+    clock[0] += 2
+    assert cache.get("q", 1) is None
+    assert cache.get_semantic(unit(0, 1), 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_new_generation_clears_entries():
+    cache = QueryCache(max_entries=4, ttl_seconds=60, semantic_threshold=0.9)
+    cache.put("q", 1, unit(1, 0), response("old"))
+    assert cache.get("q", 2) is None
+    assert cache.get_semantic(unit(1, 0), 2) is None
+    assert cache.stats()["generation"] == 2
+    cache.put("q", 2, unit(1, 0), response("new"))
+    assert cache.get("q", 2).answer == "new"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2, ttl_seconds=60, semantic_threshold=0.9)
+    cache.put("a", 1, None, response("a"))
+    cache.put("b", 1, None, response("b"))
+    cache.get("a", 1)
+    cache.put("c", 1, None, response("c"))
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None and cache.get("c", 1) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryCache(max_entries=0, ttl_seconds=60, semantic_threshold=0.9)
+    cache.put("q", 1, unit(1, 0), response("a"))
+    assert cache.get("q", 1) is None
+    assert cache.get_semantic(unit(1, 0), 1) is None
+
+
+def test_filter_scopes_are_cached_separately():
+    cache = QueryCache(max_entries=4, ttl_seconds=60, semantic_threshold=0.9)
+    cache.put("q", 1, unit(1, 0), response("all"))
+    cache.put("q", 1, unit(1, 0), response("manuals"), scope='{"source_glob":"manuals/*"}')
+    assert cache.get("q", 1).answer == "all"
+    assert cache.get("q", 1, '{"source_glob":"manuals/*"}').answer == "manuals"
+    assert cache.get_semantic(unit(1, 0.05), 1, '{"tags":["x"]}') is None
+    assert cache.get_semantic(unit(1, 0.05), 1, '{"source_glob":"manuals/*"}').answer == "manuals"
@@ -0,0 +1,73 @@
+import numpy as np
+
+from rag_service.chunk_store import ChunkStore
+from rag_service.index_store import IndexStore
+from rag_service.schemas import ChunkRecord
+
+CHUNKS = [
+    ChunkRecord(
+        chunk_id="a", source="one.txt", text="alpha", ingested_at=1, tags=["x"], digest=7, simhash=9
+    ),
+    ChunkRecord(chunk_id="b", source="one.txt", text="bêta ✓", ingested_at=1, tags=["x"]),
+    ChunkRecord(chunk_id="a", source="two.txt", text="alpha", ingested_at=2, tags=["y"]),
+    ChunkRecord(chunk_id="c", source="three.txt", text="", ingested_at=3),
+    ChunkRecord(chunk_id="a", source="two.txt", text="alpha", ingested_at=2, tags=["y"]),
+    ChunkRecord(chunk_id="b", source="three.txt", text="bêta ✓", ingested_at=3),
+]
+
+
+def write(tmp_path, chunks) -> ChunkStore:
+    path = tmp_path / "chunks.bin"
+    with path.open("wb") as handle:
+        ChunkStore.write(handle, chunks)
+    return ChunkStore.open(path)
+
+
+def test_round_trip(tmp_path):
+    store = write(tmp_path, CHUNKS)
+    assert len(store) == 3
+    assert list(store) == [CHUNKS[0], CHUNKS[1], CHUNKS[3]]
+    assert store.sources == ["one.txt", "two.txt", "three.txt"]
+    assert store.get("b") == CHUNKS[1]
+    assert store.get("missing") is None
+    assert "c" in store and "missing" not in store
+
+
+def test_duplicate_sources(tmp_path):
+    store = write(tmp_path, CHUNKS)
+    a, b, c = (store.row_of(cid) for cid in "abc")
+    assert store.source_indexes(a) == [0, 1]
+    assert store.source_indexes(b) == [0, 2]
+    assert store.source_indexes(c) == [2]
+    assert store.occurrence(a, 1) == CHUNKS[2].model_copy(update={"digest": 7, "simhash": 9})
+    np.testing.assert_array_equal(
+        store.rows_in(np.array([False, True, False])), [True, False, False]
+    )
+    np.testing.assert_array_equal(
+        store.rows_in(np.array([False, False, True])), [False, True, True]
+    )
+
+
+def test_index_store_generations(tmp_path):
+    index = IndexStore(tmp_path / "index")
+    index.save_chunks(CHUNKS, 1)
+    index.save_chunks(CHUNKS[3:4], 2)
+    assert len(index.load_chunks(1)) == 3
+    assert list(index.load_chunks(2)) == [CHUNKS[3]]
+    assert len(index.load_chunks(3)) == 0
+
+
+def test_writer_carries_rows_from_a_store(tmp_path):
+    store = write(tmp_path, CHUNKS)
+    path = tmp_path / "carried.bin"
+    with IndexStore(tmp_path / "index").chunk_writer() as writer:
+        writer.add(CHUNKS[3])
+        assert writer.carry(store, "two.txt", ["a"]) == [(store.row_of("a"), 1)]
+        assert writer.carry(store, "one.txt", ["a", "b"]) == [(store.row_of("b"), 2)]
+        with path.open("wb") as handle:
+            writer.write(handle)
+    carried = ChunkStore.open(path)
+    assert carried.sources == ["three.txt", "two.txt", "one.txt"]
+    assert carried.get("a") == store.occurrence(store.row_of("a"), 1)
+    assert carried.get("b") == store.get("b")
+    assert carried.source_indexes(carried.row_of("a")) == [1, 2]
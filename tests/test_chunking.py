@@ -0,0 +1,102 @@
+import re
+
+import pytest
+
+from rag_service import chunking
+from rag_service.chunking import TokenSplitter, chunk_document, split_text
+
+WORD = re.compile(r"\S+")
+
+
+class WordTokenizer:
+    model_max_length = 512
+
+    def num_special_tokens_to_add(self) -> int:
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        spans = [[m.span() for m in WORD.finditer(text)] for text in texts]
+        encoded = {"input_ids": [list(range(len(s))) for s in spans]}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = spans
+        return encoded
+
+
+def tokens(text: str) -> int:
+    return len(text.split())
+
+
+def test_split_text_windows_with_overlap():
+    words = " ".join(f"w{i}" for i in range(10))
+    assert split_text(words, 4, 1) == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    with pytest.raises(ValueError):
+        split_text(words, 2, 2)
+
+
+def test_token_chunks_fit_the_budget_and_keep_sentences_whole():
+    text = " ".join(f"Sentence {i} has exactly six words." for i in range(10))
+    chunks = TokenSplitter(WordTokenizer(), max_tokens=14, overlap=0)(text)
+    assert all(tokens(chunk) <= 14 for chunk in chunks)
+    assert all(chunk.endswith("words.") for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_overlap_carries_trailing_sentences():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+    chunks = TokenSplitter(WordTokenizer(), max_tokens=6, overlap=3)(text)
+    assert chunks == [
+        "One two three. Four five six.",
+        "Four five six. Seven eight nine.",
+        "Seven eight nine. Ten eleven twelve.",
+    ]
+
+
+def test_oversized_sentence_is_split_by_token_offsets():
+    text = " ".join(f"t{i}" for i in range(25))
+    chunks = TokenSplitter(WordTokenizer(), max_tokens=10, overlap=2)(text)
+    assert all(tokens(chunk) <= 10 for chunk in chunks)
+    assert chunks[0].split()[-2:] == chunks[1].split()[:2]
+    assert chunks[-1].split()[-1] == "t24"
+
+
+def test_headings_and_pages_start_new_chunks():
+    text = "# Pumps\nCheck oil.\n\n# Valves\nCheck seals.\fPage two text."
+    chunks = TokenSplitter(WordTokenizer(), max_tokens=50, overlap=0)(text)
+    assert chunks == ["# Pumps Check oil.", "# Valves Check seals.", "Page two text."]
+
+
+def test_token_budget_must_exceed_overlap():
+    with pytest.raises(ValueError):
+        TokenSplitter(WordTokenizer(), max_tokens=4, overlap=4)
+
+
+def test_chunk_ids_are_stable(tmp_path):
+    path = tmp_path / "doc.txt"
+    first = chunk_document(path, "alpha beta gamma", lambda text: [text])
+    again = chunk_document(path, "alpha beta gamma", lambda text: [text])
+    other = chunk_document(path, "alpha beta delta", lambda text: [text])
+    assert [c.chunk_id for c in first] == [c.chunk_id for c in again]
+    assert first[0].chunk_id != other[0].chunk_id
+
+
+def test_words_are_the_default_strategy():
+    assert chunking.chunking_strategy() == "words:900:180"
+    assert chunking.get_splitter()("a b c") == ["a b c"]
+
+
+def test_token_strategy_loads_only_the_tokenizer(configure, monkeypatch):
+    configure(CHUNK_STRATEGY="tokens", CHUNK_OVERLAP_TOKENS=8)
+    tokenizer = WordTokenizer()
+    monkeypatch.setattr(chunking, "get_tokenizer", lambda: tokenizer)
+    assert chunking.token_budget() == 510
+    splitter = chunking.get_splitter()
+    assert isinstance(splitter, TokenSplitter) and splitter.tokenizer is tokenizer
+    assert chunking.chunking_strategy().endswith(":510:8")
+
+    configure(CHUNK_STRATEGY="tokens", CHUNK_MAX_TOKENS=64)
+    assert chunking.token_budget() == 64
+    tokenizer.model_max_length = int(1e30)
+    assert chunking.token_budget() == 64
+    configure(CHUNK_STRATEGY="tokens", CHUNK_MAX_TOKENS=0)
+    with pytest.raises(ValueError, match="CHUNK_MAX_TOKENS"):
+        chunking.token_budget()
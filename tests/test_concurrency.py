@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from rag_service import context, generation
+from rag_service.concurrency import Overloaded, StageLimiter, get_limiter, run_inference
+
+
+def test_limiter_times_out_when_full():
+    async def scenario() -> None:
+        limiter = StageLimiter("rerank", limit=1, queue_timeout_ms=20, retry_after=3)
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as info:
+                async with limiter.slot():
+                    pass
+        assert (info.value.stage, info.value.retry_after) == ("rerank", 3)
+        async with limiter.slot():
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_limiter_queues_within_timeout():
+    async def scenario() -> list[int]:
+        limiter = StageLimiter("retrieval", limit=1, queue_timeout_ms=1000, retry_after=1)
+        order: list[int] = []
+
+        async def work(i: int) -> None:
+            async with limiter.slot():
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work(i) for i in range(3)))
+        return order
+
+    assert sorted(asyncio.run(scenario())) == [0, 1, 2]
+
+
+def test_run_inference_runs_on_the_inference_pool():
+    async def scenario() -> str:
+        return await run_inference(lambda: threading.current_thread().name)
+
+    assert asyncio.run(scenario()).startswith("inference")
+
+
+def test_get_limiter_reads_settings(configure):
+    configure(RERANK_CONCURRENCY=2, RETRY_AFTER_SECONDS=5)
+    limiter = get_limiter("rerank")
+    assert (limiter.limit, limiter.retry_after) == (2, 5)
+    assert get_limiter("rerank") is limiter
+
+
+def test_overloaded_query_returns_503_with_retry_after(monkeypatch, configure):
+    configure(WARMUP_ON_START="false")
+    from rag_service import api
+
+    async def busy(self, *args, **kwargs):
+        raise Overloaded("generation", 7)
+
+    monkeypatch.setattr(api.RAGService, "aquery", busy)
+    monkeypatch.setattr(api, "get_engine", lambda: type("E", (), {"reload": lambda self: None})())
+    with TestClient(api.app) as client:
+        response = client.post("/query", json={"query": "pump"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "generation" in response.json()["detail"]
+
+
+def test_completion_kwargs_are_built_off_the_event_loop(monkeypatch):
+    threads: list[str] = []
+
+    def count(text: str) -> int:
+        threads.append(threading.current_thread().name)
+        return len(text.split())
+
+    async def acompletion(**kwargs) -> SimpleNamespace:
+        message = SimpleNamespace(content=kwargs["messages"][1]["content"].split("\n")[2])
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(context, "count_tokens", count)
+    monkeypatch.setitem(sys.modules, "litellm", SimpleNamespace(acompletion=acompletion))
+    hits = [{"chunk_id": "1", "source": "a.txt", "text": "alpha beta"}]
+    assert asyncio.run(generation.acomplete_answer("why?", hits)) == "Question: why?"
+    assert threads and all(name.startswith("inference") for name in threads)
@@ -0,0 +1,93 @@
+import pytest
+
+from rag_service import context
+from rag_service.context import merge_hits, pack_context
+
+
+def hit(chunk_id: str, text: str, source: str = "a.txt") -> dict:
+    return {"chunk_id": chunk_id, "source": source, "text": text, "score": 0.0}
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context, "count_tokens", lambda text: len(text.split()))
+
+
+def test_overlapping_neighbours_merge_into_one_span():
+    hits = [
+        hit("2", "pressure drops below the limit. Replace the seal before restarting."),
+        hit("1", "Inspect the pump weekly. If the pressure drops below the limit."),
+    ]
+    spans = merge_hits(hits, minimum=10)
+    assert len(spans) == 1
+    assert spans[0].text == (
+        "Inspect the pump weekly. If the pressure drops below the limit. "
+        "Replace the seal before restarting."
+    )
+    assert spans[0].chunk_ids == ["2", "1"]
+    assert spans[0].rank == 0
+
+
+def test_contained_and_unrelated_hits():
+    hits = [
+        hit("1", "alpha beta gamma delta"),
+        hit("2", "beta gamma"),
+        hit("3", "alpha beta gamma delta", source="b.txt"),
+        hit("4", "something else entirely"),
+    ]
+    spans = merge_hits(hits, minimum=4)
+    assert [(s.source, s.chunk_ids) for s in spans] == [
+        ("a.txt", ["1", "2"]),
+        ("b.txt", ["3"]),
+        ("a.txt", ["4"]),
+    ]
+
+
+def test_merge_cascades_through_a_bridging_hit():
+    hits = [
+        hit("1", "one two three four"),
+        hit("3", "seven eight nine"),
+        hit("2", "three four five six seven eight"),
+    ]
+    spans = merge_hits(hits, minimum=5)
+    assert [s.text for s in spans] == ["one two three four five six seven eight nine"]
+    assert sorted(spans[0].chunk_ids) == ["1", "2", "3"]
+
+
+def test_pack_context_respects_the_budget(configure):
+    configure(CONTEXT_MAX_TOKENS=8, CONTEXT_MERGE_MIN_OVERLAP=40)
+    hits = [hit("1", "a b c d e"), hit("2", "f g h i j k"), hit("3", "l m")]
+    packed, retrieved, used = pack_context(hits)
+    assert [c["chunk_id"] for c in packed] == ["1", "3"]
+    assert (retrieved, used) == (13, 7)
+
+
+def test_pack_context_truncates_an_oversized_first_span(configure):
+    configure(CONTEXT_MAX_TOKENS=4, CONTEXT_MERGE_MIN_OVERLAP=40)
+    packed, retrieved, used = pack_context([hit("1", "a b c d e f g h"), hit("2", "x y")])
+    assert [c["text"] for c in packed] == ["a b c d"]
+    assert (retrieved, used) == (10, 4)
+
+
+def test_unlimited_budget_keeps_everything(configure):
+    configure(CONTEXT_MAX_TOKENS=0)
+    hits = [hit(str(i), f"text {i}", source=f"{i}.txt") for i in range(5)]
+    packed, retrieved, used = pack_context(hits)
+    assert len(packed) == 5
+    assert retrieved == used == 10
+
+
+def test_counts_each_hit_once_and_only_merged_spans_again(configure, monkeypatch):
+    configure(CONTEXT_MAX_TOKENS=0, CONTEXT_MERGE_MIN_OVERLAP=5)
+    counted: list[str] = []
+
+    def count(text: str) -> int:
+        counted.append(text)
+        return len(text.split())
+
+    monkeypatch.setattr(context, "count_tokens", count)
+    hits = [hit("1", "one two three four"), hit("2", "three four five"), hit("3", "x y", "b.txt")]
+    packed, retrieved, used = pack_context(hits)
+    assert [c["text"] for c in packed] == ["one two three four five", "x y"]
+    assert (retrieved, used) == (9, 7)
+    assert counted == [h["text"] for h in hits] + ["one two three four five"]
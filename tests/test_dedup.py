@@ -0,0 +1,63 @@
+from rag_service.chunk_store import ChunkStore
+from rag_service.dedup import Deduplicator, digest, simhash
+from rag_service.schemas import ChunkRecord
+
+PRESS = (
+    "Before starting the hydraulic press, the operator checks the oil level, inspects the hoses "
+    "for cracks, confirms that the guards are closed and that the emergency stop button resets "
+    "correctly. Any fault is logged in the maintenance register and reported to the shift "
+    "supervisor before work continues on the line."
+)
+BELTS = (
+    "Conveyor belts are cleaned at the end of every shift and the rollers are greased once a "
+    "month according to the lubrication plan posted next to the line."
+)
+
+
+def chunk(chunk_id: str, text: str, source: str = "a.txt") -> ChunkRecord:
+    return ChunkRecord(chunk_id=chunk_id, source=source, text=text)
+
+
+def test_exact_duplicates_fold():
+    dedup = Deduplicator(0, 3)
+    first = dedup.resolve(chunk("1", PRESS))
+    assert first.chunk_id == "1"
+    assert (first.digest, first.simhash) == (digest(PRESS), simhash(PRESS, 3))
+
+    again = dedup.resolve(chunk("2", "  " + PRESS.upper().replace(" ", "\n"), source="b.txt"))
+    assert (again.chunk_id, again.source) == ("1", "b.txt")
+    assert (again.digest, again.simhash) == (first.digest, first.simhash)
+
+    near = dedup.resolve(chunk("3", PRESS.replace("shift supervisor", "duty supervisor")))
+    assert near.chunk_id == "3"
+    assert dedup.duplicates == 1
+
+
+def test_near_duplicates_fold():
+    variant = PRESS.replace("shift supervisor", "duty supervisor")
+    distance = (simhash(PRESS, 3) ^ simhash(variant, 3)).bit_count()
+    assert distance > 0
+    dedup = Deduplicator(distance, 3)
+    dedup.resolve(chunk("1", PRESS))
+    assert dedup.resolve(chunk("2", variant, source="b.txt")).chunk_id == "1"
+    assert dedup.resolve(chunk("3", BELTS)).chunk_id == "3"
+    assert dedup.duplicates == 1
+
+
+def test_store_chunks_are_canonical(tmp_path):
+    seed = Deduplicator(3, 3)
+    path = tmp_path / "chunks.bin"
+    with path.open("wb") as handle:
+        ChunkStore.write(handle, [seed.resolve(chunk("1", PRESS)), seed.resolve(chunk("2", BELTS))])
+
+    dedup = Deduplicator(3, 3, ChunkStore.open(path))
+    resolved = dedup.resolve(chunk("9", BELTS.lower(), source="c.txt"))
+    assert (resolved.chunk_id, resolved.text, resolved.source) == ("2", BELTS, "c.txt")
+    assert dedup.resolve(chunk("10", "Something else entirely.")).chunk_id == "10"
+
+
+def test_near_folding_is_opt_in(settings):
+    dedup = Deduplicator(settings.dedup_near_distance, settings.dedup_shingle_size)
+    dedup.resolve(chunk("1", PRESS))
+    near = dedup.resolve(chunk("2", PRESS.replace("shift supervisor", "duty supervisor")))
+    assert near.chunk_id == "2" and dedup.duplicates == 0
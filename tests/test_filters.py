@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from datetime import UTC, datetime
+
+import numpy as np
+
+from rag_service import retrieval
+from rag_service.chunk_store import ChunkStore
+from rag_service.filters import build_scope, filters_key, is_active
+from rag_service.lexical import SparseBM25, tokenize
+from rag_service.schemas import ChunkRecord, QueryFilters
+from rag_service.vector_store import get_vector_store
+
+SOURCES = {
+    "manuals/pump.pdf": (1_700_000_000, ["hydraulics"]),
+    "manuals/valve.md": (1_700_000_100, ["hydraulics", "safety"]),
+    "notes/shift.txt": (1_700_000_200, []),
+    "notes/belts.txt": (1_700_000_300, ["conveyors"]),
+}
+
+
+def store(tmp_path) -> ChunkStore:
+    chunks = [
+        ChunkRecord(
+            chunk_id=f"{i}-{n}", source=source, text=f"{source} {n}", ingested_at=at, tags=tags
+        )
+        for i, (source, (at, tags)) in enumerate(SOURCES.items())
+        for n in range(5)
+    ]
+    path = tmp_path / "chunks.bin"
+    with path.open("wb") as handle:
+        ChunkStore.write(handle, chunks)
+    return ChunkStore.open(path)
+
+
+def test_filters_key_ignores_defaults():
+    assert not is_active(None) and not is_active(QueryFilters())
+    assert filters_key(QueryFilters()) == ""
+    assert filters_key(QueryFilters(tags=["a"])) == filters_key(QueryFilters(tags=["a"]))
+    assert filters_key(QueryFilters(tags=["a"])) != filters_key(QueryFilters(tags=["b"]))
+
+
+def test_scope_masks_each_filter(tmp_path):
+    chunks = store(tmp_path)
+
+    def sources(filters: QueryFilters) -> set[str]:
+        scope = build_scope(chunks, filters)
+        return {chunks.source(row) for row in np.flatnonzero(scope.mask)}
+
+    assert sources(QueryFilters(source_glob="manuals/*")) == {
+        "manuals/pump.pdf",
+        "manuals/valve.md",
+    }
+    assert sources(QueryFilters(file_types=[".TXT"])) == {"notes/shift.txt", "notes/belts.txt"}
+    assert sources(QueryFilters(tags=["safety", "conveyors"])) == {
+        "manuals/valve.md",
+        "notes/belts.txt",
+    }
+    after = datetime.fromtimestamp(1_700_000_100, UTC)
+    before = datetime.fromtimestamp(1_700_000_200, UTC)
+    window = QueryFilters(ingested_after=after, ingested_before=before)
+    assert sources(window) == {"manuals/valve.md", "notes/shift.txt"}
+
+
+def test_narrow_scope_is_pushed_down(tmp_path, configure):
+    configure(FILTER_PUSHDOWN_MAX_FRACTION=0.3)
+    chunks = store(tmp_path)
+    scope = build_scope(chunks, QueryFilters(source_glob="*/pump.pdf"))
+    assert scope.fraction == 0.25
+    assert scope.where == {"source": {"$in": ["manuals/pump.pdf"]}}
+    assert scope.mask.sum() == 5
+
+
+def test_broad_scope_is_post_filtered(tmp_path, configure):
+    configure(FILTER_PUSHDOWN_MAX_FRACTION=0.3)
+    chunks = store(tmp_path)
+    scope = build_scope(chunks, QueryFilters(source_glob="manuals/*"))
+    assert scope.fraction == 0.5
+    assert scope.where is None
+    assert scope.sources == ["manuals/pump.pdf", "manuals/valve.md"]
+
+
+def test_async_retrieval_builds_the_scope_off_the_event_loop(tmp_path, fake_models, monkeypatch):
+    chunks = store(tmp_path)
+    vectors = get_vector_store("filters", "numpy")
+    vectors.upsert(list(chunks), fake_models.encode([c.text for c in chunks]))
+    vectors.commit()
+    bm25 = SparseBM25.build([tokenize(c.text) for c in chunks])
+    retriever = retrieval.HybridRetriever(chunks, bm25, vectors)
+    threads: list[str] = []
+
+    def scoped(*args) -> retrieval.FilterScope:
+        threads.append(threading.current_thread().name)
+        return build_scope(*args)
+
+    monkeypatch.setattr(retrieval, "build_scope", scoped)
+    qvec = fake_models.encode("notes shift").tolist()
+    hits = asyncio.run(
+        retriever.aretrieve("notes shift", qvec, QueryFilters(source_glob="notes/*"))
+    )
+    assert len(threads) == 1 and threads[0].startswith("inference")
+    assert hits and {h["source"] for h in hits} <= {"notes/shift.txt", "notes/belts.txt"}
@@ -0,0 +1,169 @@
+import random
+import threading
+
+import numpy as np
+import pytest
+
+from rag_service.index_store import IndexStore
+from rag_service.ingest import IngestionService
+from rag_service.lexical import SparseBM25, tokenize
+from rag_service.vector_store import get_vector_store
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+
+class Cancelled(Exception):
+    pass
+
+
+def write_docs(root, prefix: str, count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for i in range(count):
+        text = " ".join(rng.choice(WORDS) for _ in range(400))
+        (root / f"{prefix}{i}.txt").write_text(text, encoding="utf-8")
+
+
+def served(index: IndexStore) -> tuple[int, set[str], set[str]]:
+    state = index.load_state()
+    vectors = {cid for ids, _ in get_vector_store(state.collection).export() for cid in ids}
+    return state.generation, vectors, set(index.load_chunks(state.generation).chunk_ids())
+
+
+@pytest.fixture(params=["numpy", "qdrant", "chroma"])
+def backend(request, configure, fake_models):
+    configure(
+        VECTOR_BACKEND=request.param,
+        QDRANT_URL=":memory:",
+        EMBED_BATCH_SIZE=4,
+        EMBED_WINDOW=4,
+        CHUNK_SIZE=40,
+        CHUNK_OVERLAP=0,
+        DEDUP_ENABLED="false",
+    )
+    return request.param
+
+
+def ranked(bm25: SparseBM25) -> list[tuple[list[int], list[float]]]:
+    queries = [[WORDS[i], WORDS[i + 1]] for i in range(0, 200, 2)]
+    return [(d.tolist(), np.round(s, 4).tolist()) for d, s in bm25.top_k_many(queries, 5)]
+
+
+@pytest.mark.parametrize("resume", [True, False])
+def test_cancelled_incremental_ingest_leaves_served_index(backend, settings, tmp_path, resume):
+    source = tmp_path / "docs"
+    source.mkdir()
+    index = IndexStore(settings.index_dir)
+    write_docs(source, "base", 3, seed=1)
+    IngestionService().ingest(source)
+    before = served(index)
+    assert before[0] == 1 and before[1] == before[2] and before[1]
+
+    write_docs(source, "new", 3, seed=2)
+
+    def cancel(progress) -> None:
+        if progress.embedded >= 4:
+            raise Cancelled
+
+    with pytest.raises(Cancelled):
+        IngestionService().ingest(source, incremental=True, progress=cancel)
+    generation, vectors, chunks = served(index)
+    assert (generation, chunks) == (before[0], before[2])
+    assert before[1] <= vectors
+    assert vectors - before[1] <= set(index.load_journal())
+
+    for path in source.glob("new*.txt"):
+        path.unlink()
+    (source / "base0.txt").unlink()
+    IngestionService().ingest(source, incremental=True, resume=resume)
+    generation, vectors, chunks = served(index)
+    assert generation == 2
+    assert vectors == chunks
+    assert chunks < before[2]
+    assert index.load_checkpoint() is None and not index.load_journal()
+
+
+def test_incremental_ingest_carries_unchanged_chunks(configure, fake_models, settings, tmp_path):
+    configure(VECTOR_BACKEND="numpy", CHUNK_SIZE=40, CHUNK_OVERLAP=0, DEDUP_ENABLED="false")
+    source = tmp_path / "docs"
+    source.mkdir()
+    write_docs(source, "base", 3, seed=1)
+    IngestionService().ingest(source)
+    index = IndexStore(settings.index_dir)
+    base = index.load_chunks(1)
+
+    write_docs(source, "new", 2, seed=2)
+    (source / "base1.txt").unlink()
+    IngestionService().ingest(source, incremental=True)
+    chunks = index.load_chunks(2)
+    kept = [cid for cid in base.chunk_ids() if not base.get(cid).source.endswith("base1.txt")]
+    assert all(chunks.get(cid) == base.get(cid) for cid in kept)
+    rebuilt = SparseBM25.build(tokenize(chunks.text(row)) for row in range(len(chunks)))
+    assert ranked(index.load_bm25(2)) == ranked(rebuilt)
+
+
+def test_interrupted_commit_is_finished_by_the_next_ingest(
+    configure, fake_models, settings, tmp_path, monkeypatch
+):
+    configure(VECTOR_BACKEND="numpy", CHUNK_SIZE=40, CHUNK_OVERLAP=0, DEDUP_ENABLED="false")
+    source = tmp_path / "docs"
+    source.mkdir()
+    write_docs(source, "base", 3, seed=1)
+    IngestionService().ingest(source)
+    index = IndexStore(settings.index_dir)
+    (source / "base0.txt").unlink()
+    write_docs(source, "new", 1, seed=2)
+
+    settle = IngestionService._settle
+
+    def crash(self, checkpoint, state) -> None:
+        raise Cancelled
+
+    monkeypatch.setattr(IngestionService, "_settle", crash)
+    with pytest.raises(Cancelled):
+        IngestionService().ingest(source, incremental=True)
+    generation, vectors, chunks = served(index)
+    assert generation == 2 and chunks < vectors
+
+    monkeypatch.setattr(IngestionService, "_settle", settle)
+    IngestionService().ingest(source, incremental=True)
+    generation, vectors, chunks = served(index)
+    assert generation == 3 and vectors == chunks
+
+
+def test_duplicate_occurrences_are_not_re_embedded(configure, fake_models, tmp_path):
+    configure(VECTOR_BACKEND="numpy", CHUNK_SIZE=40, CHUNK_OVERLAP=0)
+    source = tmp_path / "docs"
+    source.mkdir()
+    write_docs(source, "base", 2, seed=1)
+    IngestionService().ingest(source)
+
+    (source / "copy.txt").write_text((source / "base0.txt").read_text(), encoding="utf-8")
+    runs = []
+    IngestionService().ingest(source, incremental=True, progress=runs.append)
+    assert (runs[-1].duplicates, runs[-1].embedded) == (10, 0)
+
+
+def test_second_writer_waits_for_the_index_lock(configure, fake_models, settings, tmp_path):
+    configure(VECTOR_BACKEND="numpy", CHUNK_SIZE=40, CHUNK_OVERLAP=0)
+    source = tmp_path / "docs"
+    source.mkdir()
+    write_docs(source, "base", 2, seed=1)
+    waiting = threading.Event()
+    phases = []
+
+    def progress(p) -> None:
+        phases.append(p.phase)
+        if p.phase == "waiting":
+            waiting.set()
+
+    with IndexStore(settings.index_dir).lock():
+        worker = threading.Thread(
+            target=IngestionService().ingest, args=(source,), kwargs={"progress": progress}
+        )
+        worker.start()
+        assert waiting.wait(5)
+        assert IndexStore(settings.index_dir).load_state() is None
+    worker.join(10)
+    assert not worker.is_alive()
+    assert phases[0] == "waiting" and phases[-1] == "done"
+    assert {"chunking", "loading", "embedding", "indexing"} <= set(phases)
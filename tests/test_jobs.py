@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from rag_service import engine, ingest
+from rag_service.jobs import JobManager
+from rag_service.schemas import IngestProgress, IngestRequest
+
+
+class FakeEngine:
+    reloads = 0
+
+    def reload(self) -> None:
+        FakeEngine.reloads += 1
+
+
+class FakeIngestion:
+    started = threading.Event()
+    release = threading.Event()
+    fail = False
+
+    def ingest(self, source_dir, glob_pattern, incremental, progress, tags):
+        FakeIngestion.started.set()
+        for documents in range(1, 4):
+            progress(IngestProgress(phase="loading", documents=documents, chunks=documents * 2))
+            FakeIngestion.release.wait(2)
+        if FakeIngestion.fail:
+            raise RuntimeError("disk full")
+        progress(IngestProgress(phase="done", documents=3, chunks=6, embedded=6))
+        return 3, 6
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    FakeIngestion.started.clear()
+    FakeIngestion.release.clear()
+    FakeIngestion.fail = False
+    monkeypatch.setattr(ingest, "IngestionService", FakeIngestion)
+    monkeypatch.setattr(engine, "get_engine", FakeEngine)
+    for i in range(3):
+        (tmp_path / f"{i}.txt").write_text("text", encoding="utf-8")
+    return JobManager(history=10)
+
+
+def wait(manager: JobManager, job_id: str, statuses: set[str]) -> None:
+    deadline = time.monotonic() + 5
+    while manager.get(job_id).status not in statuses:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def request(tmp_path) -> IngestRequest:
+    return IngestRequest(source_dir=str(tmp_path))
+
+
+def test_job_runs_to_completion(manager, tmp_path):
+    FakeIngestion.release.set()
+    job = manager.submit(request(tmp_path))
+    assert job.status == "queued"
+    wait(manager, job.id, {"succeeded"})
+    done = manager.get(job.id)
+    assert done.total_documents == 3
+    assert (done.result.documents, done.result.chunks) == (3, 6)
+    assert done.eta_seconds == 0.0 and done.progress.phase == "done"
+
+
+def test_cancel_running_job_stops_at_next_progress(manager, tmp_path):
+    job = manager.submit(request(tmp_path))
+    assert FakeIngestion.started.wait(2)
+    assert manager.cancel(job.id).cancel_requested
+    FakeIngestion.release.set()
+    wait(manager, job.id, {"cancelled"})
+    assert manager.get(job.id).result is None
+
+
+def test_cancel_queued_job_never_runs(manager, tmp_path):
+    running = manager.submit(request(tmp_path))
+    assert FakeIngestion.started.wait(2)
+    queued = manager.submit(request(tmp_path))
+    assert manager.cancel(queued.id).status == "cancelled"
+    FakeIngestion.release.set()
+    wait(manager, running.id, {"succeeded"})
+    assert manager.get(queued.id).started_at is None
+
+
+def test_failed_job_reports_the_error(manager, tmp_path):
+    FakeIngestion.fail = True
+    FakeIngestion.release.set()
+    job = manager.submit(request(tmp_path))
+    wait(manager, job.id, {"failed"})
+    assert manager.get(job.id).error == "RuntimeError: disk full"
+
+
+def test_history_keeps_recent_finished_jobs(manager, tmp_path):
+    FakeIngestion.release.set()
+    manager.history = 2
+    jobs = [manager.submit(request(tmp_path)) for _ in range(4)]
+    wait(manager, jobs[-1].id, {"succeeded"})
+    manager.submit(request(tmp_path))
+    assert manager.get(jobs[0].id) is None
+    assert len(manager.list()) <= 3
+
+
+def test_eta_follows_the_embedding_rate_once_all_documents_are_chunked(
+    manager, monkeypatch, tmp_path
+):
+    class Embedding(FakeIngestion):
+        def ingest(self, source_dir, glob_pattern, incremental, progress, tags):
+            progress(IngestProgress(phase="chunking", documents=2, chunks=20, queued=20))
+            progress(
+                IngestProgress(phase="embedding", documents=3, chunks=30, queued=30, embedded=10)
+            )
+            FakeIngestion.started.set()
+            FakeIngestion.release.wait(2)
+            progress(IngestProgress(phase="done", documents=3, chunks=30, embedded=30))
+            return 3, 30
+
+    monkeypatch.setattr(ingest, "IngestionService", Embedding)
+    job = manager.submit(request(tmp_path))
+    assert FakeIngestion.started.wait(2)
+    running = manager.get(job.id)
+    assert running.progress.phase == "embedding"
+    assert running.eta_seconds == pytest.approx(20 / running.embedded_per_second)
+    FakeIngestion.release.set()
+    wait(manager, job.id, {"succeeded"})
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from rag_service.lexical import BM25Builder, SparseBM25, tokenize
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+CORPUS = [
+    "The hydraulic pump must be inspected every week.",
+    "Replace the pump seal when the pressure drops below the limit.",
+    "Conveyor belts are inspected monthly for wear and alignment.",
+    "Pressure relief valves protect the hydraulic circuit.",
+    "The control cabinet must stay locked during maintenance.",
+    "Weekly inspection covers the pump, the valves and the belts.",
+]
+QUERIES = ["hydraulic pump", "pressure pressure valves", "inspected weekly", "the", "turbine"]
+
+
+def dense_scores(bm25: SparseBM25, tokens: list[str]) -> np.ndarray:
+    docs, scores = bm25.top_k(tokens, bm25.n_docs)
+    out = np.zeros(bm25.n_docs)
+    out[docs] = scores
+    return out
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_scores_match_rank_bm25(query):
+    corpus = [tokenize(text) for text in CORPUS]
+    expected = rank_bm25.BM25Okapi(corpus).get_scores(tokenize(query))
+    bm25 = SparseBM25.build(corpus)
+    np.testing.assert_allclose(dense_scores(bm25, tokenize(query)), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_top_k_many_matches_top_k():
+    bm25 = SparseBM25.build([tokenize(text) for text in CORPUS])
+    queries = [tokenize(q) for q in QUERIES]
+    mask = np.array([True, False, True, True, False, True])
+    for k in (1, 3, len(CORPUS)):
+        for m in (None, mask):
+            batched = bm25.top_k_many(queries, k, m)
+            for tokens, (docs, scores) in zip(queries, batched, strict=True):
+                expected_docs, expected_scores = bm25.top_k(tokens, k, m)
+                np.testing.assert_array_equal(docs, expected_docs)
+                np.testing.assert_allclose(scores, expected_scores)
+                if m is not None:
+                    assert m[docs].all()
+
+
+def test_round_trip(tmp_path):
+    bm25 = SparseBM25.build([tokenize(text) for text in CORPUS])
+    path = tmp_path / "bm25.npz"
+    path.write_bytes(bm25.to_bytes())
+    loaded = SparseBM25.load(path)
+    assert loaded.vocab == bm25.vocab
+    for query in QUERIES:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(dense_scores(loaded, tokens), dense_scores(bm25, tokens))
+
+
+@pytest.mark.parametrize("postings", [True, False])
+def test_builder_carries_postings_from_a_saved_index(tmp_path, postings):
+    corpus = [tokenize(text) for text in CORPUS]
+    old = SparseBM25.build(corpus[:4])
+    if not postings:
+        old.tf = old.doc_len = None
+    path = tmp_path / "bm25.npz"
+    path.write_bytes(old.to_bytes())
+
+    builder = BM25Builder()
+    builder.add(corpus[4])
+    rows, docs = np.array([3, 0, 2]), np.array([builder.reserve() for _ in range(3)])
+    builder.add(corpus[5])
+    assert builder.carry(path, rows, docs) is postings
+    if not postings:
+        for row, doc in zip(rows, docs, strict=True):
+            builder.add(corpus[row], int(doc))
+    bm25 = builder.build()
+    expected = SparseBM25.build([corpus[i] for i in (4, 3, 0, 2, 5)])
+    for query in QUERIES:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(dense_scores(bm25, tokens), dense_scores(expected, tokens))
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from rag_service.numpy_store import NumpyVectorStore
+from rag_service.schemas import ChunkRecord
+
+
+def clustered(n: int, dim: int = 32, clusters: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def records(n: int) -> list[ChunkRecord]:
+    return [ChunkRecord(chunk_id=f"c{i}", source=f"s{i % 3}.txt", text="") for i in range(n)]
+
+
+def ids(hits: list[dict]) -> list[str]:
+    return [hit["chunk_id"] for hit in hits]
+
+
+def test_flat_search_is_exact():
+    vectors = clustered(300)
+    store = NumpyVectorStore("flat", dtype="float32", ivf_min_rows=10**9)
+    store.upsert(records(300), vectors)
+    store.commit()
+    query = vectors[17]
+    expected = [f"c{i}" for i in np.argsort(-(vectors @ query), kind="stable")[:5]]
+    hits = store.search(query.tolist(), 5)
+    assert ids(hits) == expected
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_ivf_recall(configure, dtype):
+    configure(VECTOR_IVF_LISTS=16, VECTOR_IVF_PROBE=4)
+    vectors = clustered(4000)
+    store = NumpyVectorStore(f"ivf-{dtype}", dtype=dtype, ivf_min_rows=1000)
+    store.upsert(records(4000), vectors)
+    store.commit()
+    queries = clustered(50, seed=1)
+    recall = []
+    for query in queries:
+        exact = {f"c{i}" for i in np.argsort(-(vectors @ query))[:10]}
+        recall.append(len(exact & set(ids(store.search(query.tolist(), 10)))) / 10)
+    assert np.mean(recall) >= 0.9
+
+
+def test_commit_applies_upserts_and_deletes():
+    vectors = clustered(6)
+    store = NumpyVectorStore("staged", dtype="float32", ivf_min_rows=10**9)
+    store.upsert(records(4), vectors[:4])
+    store.commit()
+    store.upsert(records(6)[4:], vectors[4:])
+    store.delete(["c1"])
+    assert len(ids(store.search(vectors[4].tolist(), 10))) == 4
+    store.commit()
+    assert set(ids(store.search(vectors[4].tolist(), 10))) == {"c0", "c2", "c3", "c4", "c5"}
+    exported = {cid for batch, _ in store.export(2) for cid in batch}
+    assert exported == {"c0", "c2", "c3", "c4", "c5"}
+
+
+def test_upsert_after_delete_restores_the_id():
+    vectors = clustered(3)
+    store = NumpyVectorStore("redo", dtype="float32", ivf_min_rows=10**9)
+    store.upsert(records(3), vectors)
+    store.commit()
+    store.delete(["c0", "c1"])
+    store.upsert(records(1), vectors[2:])
+    store.delete(["c2"])
+    store.commit()
+    assert {cid for batch, _ in store.export() for cid in batch} == {"c0"}
+    hits = store.search(vectors[2].tolist(), 3)
+    assert ids(hits) == ["c0"]
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
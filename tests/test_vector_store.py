@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from rag_service.schemas import ChunkRecord
+from rag_service.vector_store import generation_collection, get_vector_store
+
+pytest.importorskip("qdrant_client")
+
+
+@pytest.fixture
+def qdrant(settings, configure):
+    configure(QDRANT_URL=":memory:")
+    from rag_service.qdrant_store import QdrantVectorStore
+
+    store = get_vector_store(generation_collection(settings.chroma_collection, 1), "qdrant")
+    assert isinstance(store, QdrantVectorStore)
+    return store
+
+
+def records(n: int) -> tuple[list[ChunkRecord], np.ndarray]:
+    chunks = [ChunkRecord(chunk_id=f"c{i}", source=f"s{i % 2}.txt", text=f"t{i}") for i in range(n)]
+    return chunks, np.eye(n, dtype=np.float32)
+
+
+def exported(store) -> dict[str, np.ndarray]:
+    return {cid: vec for ids, vecs in store.export(3) for cid, vec in zip(ids, vecs, strict=True)}
+
+
+def test_upsert_search_and_delete(qdrant):
+    chunks, vectors = records(4)
+    qdrant.reset()
+    qdrant.upsert(chunks, vectors)
+    qdrant.commit()
+    assert set(exported(qdrant)) == {"c0", "c1", "c2", "c3"}
+    assert qdrant.existing_ids(["c1", "c9"]) == {"c1"}
+
+    hits = qdrant.search(vectors[2].tolist(), 2)
+    assert hits[0]["chunk_id"] == "c2"
+    assert hits[0]["score"] == pytest.approx(1.0)
+    filtered = qdrant.search(vectors[2].tolist(), 4, {"source": {"$in": ["s1.txt"]}})
+    assert {h["chunk_id"] for h in filtered} == {"c1", "c3"}
+
+    qdrant.delete(["c0", "c9"])
+    remaining = exported(qdrant)
+    assert set(remaining) == {"c1", "c2", "c3"}
+    np.testing.assert_allclose(remaining["c3"], vectors[3])
+
+
+def test_prune_generations(qdrant, settings):
+    chunks, vectors = records(2)
+    qdrant.upsert(chunks, vectors)
+    qdrant.commit()
+    newer = get_vector_store(generation_collection(settings.chroma_collection, 2), "qdrant")
+    newer.upsert(chunks[:1], vectors[:1])
+    newer.commit()
+
+    newer.prune_generations({newer.collection_name})
+    assert set(exported(newer)) == {"c0"}
+    assert qdrant.client.collection_exists(newer.collection_name)
+    assert not qdrant.client.collection_exists(qdrant.collection_name)